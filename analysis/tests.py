@@ -1,3 +1,11 @@
 from django.test import TestCase
 
-# Create your tests here.
+from .utils import build_file_tree, filter_paths
+
+
+class BuildFileTreeTests(TestCase):
+    def test_tree_order_and_directory_markers(self):
+        paths = filter_paths(["setup.py", "pkg/core.py", "pkg.txt", "pkg/sub/mod.py", "a/b/c/d/too_deep.py"])
+        self.assertEqual(build_file_tree(paths), [
+            "a/", "a/b/", "a/b/c/", "a/b/c/d/", "pkg/", "pkg/core.py", "pkg/sub/", "pkg/sub/mod.py", "pkg.txt", "setup.py",
+        ])
@@ -18,56 +18,121 @@ IGNORE_FILES = {
 }
 
 
-def analyze_repo(repo_path: str) -> dict:
+def analyze_repo(repo_path: str, file_paths: list[str] | None = None) -> dict:
     """
     Analyze a repository and return structured, deterministic data.
+
+    file_paths lists every file in the repository (relative, "/"-separated).
+    Pass it when only some files were written to repo_path (archive fetch);
+    otherwise the paths are collected by walking repo_path.
     """
+    if file_paths is None:
+        file_paths = list_repo_files(repo_path)
+    paths = filter_paths(file_paths)
+
     return {
         "project_name": os.path.basename(repo_path),
-        "llm_context": build_llm_context(repo_path),
+        "llm_context": build_llm_context(paths),
         "readme_assets": {
-            "file_tree": build_file_tree(repo_path),
+            "file_tree": build_file_tree(paths),
         },
     }
 
 
+def list_repo_files(repo_path: str) -> list[str]:
+    """
+    Relative, "/"-separated paths of every file under repo_path, skipping
+    ignored directories.
+    """
+    paths = []
+
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if d not in IGNORE_DIRS]
+        rel_root = os.path.relpath(root, repo_path)
+
+        for file in files:
+            rel_path = file if rel_root == "." else os.path.join(rel_root, file)
+            paths.append(rel_path.replace(os.sep, "/"))
+
+    return paths
+
+
+def filter_paths(file_paths: list[str]) -> list[tuple[str, ...]]:
+    """
+    Split paths into components, dropping anything inside an ignored
+    directory. Sorted, so results do not depend on listing order.
+    """
+    paths = []
+
+    for path in file_paths:
+        parts = tuple(part for part in path.split("/") if part)
+        if not parts:
+            continue
+        if any(part in IGNORE_DIRS for part in parts[:-1]):
+            continue
+        paths.append(parts)
+
+    return sorted(set(paths))
+
+
+def measure_repo(repo_path: str) -> dict:
+    """
+    Count working-tree files and total bytes on disk (including .git,
+    i.e. everything that was fetched).
+    """
+    files = 0
+    total_bytes = 0
+
+    for root, dirs, filenames in os.walk(repo_path):
+        in_git_dir = os.path.relpath(root, repo_path).split(os.sep)[0] == ".git"
+
+        for name in filenames:
+            try:
+                total_bytes += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+            if not in_git_dir:
+                files += 1
+
+    return {"files": files, "bytes": total_bytes}
+
+
 # =========================
 # LLM CONTEXT (SAFE PAYLOAD)
 # =========================
 
-def build_llm_context(repo_path: str) -> dict:
+def build_llm_context(paths: list[tuple[str, ...]]) -> dict:
     files_by_dir = defaultdict(list)
     top_level_dirs = set()
     dependency_files = []
     infra_files = []
 
-    for root, dirs, files in os.walk(repo_path):
-        dirs[:] = [d for d in dirs if d not in IGNORE_DIRS]
-
-        rel_root = os.path.relpath(root, repo_path)
-        depth = rel_root.count(os.sep)
+    for parts in paths:
+        dirs = parts[:-1]
+        # Depth of the containing directory, counted as the os.walk version
+        # did: the root and its immediate subdirectories are both depth 0.
+        depth = max(len(dirs) - 1, 0)
 
-        if depth == 0:
-            top_level_dirs.update(dirs)
+        top_level_dirs.update(dirs[:2])
 
         if depth > 1:
             continue  # keep payload shallow
 
-        for file in files:
-            if file in IGNORE_FILES:
-                continue
+        file = parts[-1]
+        if file in IGNORE_FILES:
+            continue
 
-            if file in {"requirements.txt", "package.json"}:
-                dependency_files.append(file)
+        if file in {"requirements.txt", "package.json"}:
+            dependency_files.append(file)
 
-            if file in {"Dockerfile", "docker-compose.yml"}:
-                infra_files.append(file)
+        if file in {"Dockerfile", "docker-compose.yml"}:
+            infra_files.append(file)
 
-            if depth == 1:
-                files_by_dir[os.path.basename(root)].append(file)
+        if depth == 1:
+            files_by_dir[dirs[-1]].append(file)
 
     return {
-        "languages": detect_languages(repo_path),
+        "languages": detect_languages(paths),
         "dependency_files": sorted(set(dependency_files)),
         "top_level_dirs": sorted(top_level_dirs),
         "files_by_dir": dict(files_by_dir),
@@ -75,13 +140,14 @@ def build_llm_context(repo_path: str) -> dict:
     }
 
 
-def detect_languages(repo_path: str) -> list[str]:
+def detect_languages(paths: list[tuple[str, ...]]) -> list[str]:
     languages = []
+    root_files = {parts[0] for parts in paths if len(parts) == 1}
 
-    if os.path.exists(os.path.join(repo_path, "requirements.txt")):
+    if "requirements.txt" in root_files:
         languages.append("Python")
 
-    if os.path.exists(os.path.join(repo_path, "package.json")):
+    if "package.json" in root_files:
         languages.append("JavaScript")
 
     return languages
@@ -91,21 +157,21 @@ def detect_languages(repo_path: str) -> list[str]:
 # README ASSETS (LOCAL ONLY)
 # =========================
 
-def build_file_tree(repo_path: str, max_depth: int = 3) -> list[str]:
-    tree = []
-
-    for root, dirs, files in os.walk(repo_path):
-        dirs[:] = [d for d in dirs if d not in IGNORE_DIRS]
-
-        depth = root.replace(repo_path, "").count(os.sep)
-        if depth > max_depth:
-            continue
+def build_file_tree(paths: list[tuple[str, ...]], max_depth: int = 3) -> list[str]:
+    """
+    Directories (ending in "/") and files down to max_depth + 1 path
+    components.
+    """
+    tree = set()
 
-        for d in dirs:
-            tree.append(os.path.relpath(os.path.join(root, d), repo_path))
+    for parts in paths:
+        # Parent directories are listed even if all their files are ignored
+        # or too deep; the "/" keeps them directories in the rendered tree.
+        for i in range(1, min(len(parts) - 1, max_depth + 1) + 1):
+            tree.add("/".join(parts[:i]) + "/")
 
-        for f in files:
-            if f not in IGNORE_FILES:
-                tree.append(os.path.relpath(os.path.join(root, f), repo_path))
+        if len(parts) <= max_depth + 1 and parts[-1] not in IGNORE_FILES:
+            tree.add("/".join(parts))
 
-    return sorted(tree)
+    # Tree order: a directory's entries directly follow it (see readme.generator.iter_tree).
+    return sorted(tree, key=lambda path: path.split("/"))
@@ -0,0 +1,131 @@
+"""
+Connection-capacity benchmark for the async read endpoints: ASGI vs WSGI.
+
+Runs the same stepped load against two deployments of the same code and
+database. At each step, --concurrency clients issue requests back to back for
+--step-seconds, cycling through GET /api/jobs/<id>/, /download/, /preview/
+and /api/health/. Reports throughput, p50/p99 latency and errors per step,
+and the highest concurrency each deployment sustained with p99 under --p99-ms
+and an error rate under --max-error-rate.
+
+Start both servers against the compose Postgres and Redis, e.g.:
+
+    uvicorn config.asgi:application --port 8001 --workers 4
+    gunicorn config.wsgi --bind :8002 --workers 4 --threads 8
+
+then:
+
+    python benchmarks/async_views.py --jobs 1 2 3 \
+        --target asgi=http://localhost:8001 --target wsgi=http://localhost:8002 \
+        --concurrency 50 100 200 400 800 1600
+
+Use job IDs of completed jobs so every endpoint returns 200. --endpoints
+restricts the mix (e.g. --endpoints "/api/jobs/{id}/" for status polling
+only). --slow-client adds a delay before each response body is read, to
+model slow readers that hold a connection open.
+"""
+import time
+import asyncio
+import argparse
+import itertools
+
+import httpx
+
+ENDPOINTS = ("/api/jobs/{id}/", "/api/jobs/{id}/download/", "/api/jobs/{id}/preview/", "/api/health/")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+
+async def client_loop(client: httpx.AsyncClient, urls, deadline: float, slow_client: float, latencies: list, errors: list):
+    while time.monotonic() < deadline:
+        url = next(urls)
+        started = time.perf_counter()
+        try:
+            async with client.stream("GET", url) as response:
+                if slow_client:
+                    await asyncio.sleep(slow_client)
+                await response.aread()
+                response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+
+
+async def run_step(base_url: str, jobs: list[int], concurrency: int, args) -> dict:
+    latencies, errors = [], []
+    urls = itertools.cycle([endpoint.format(id=job) for job in jobs for endpoint in args.endpoints])
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    started = time.monotonic()
+    deadline = started + args.step_seconds
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        await asyncio.gather(*(
+            client_loop(client, urls, deadline, args.slow_client, latencies, errors)
+            for _ in range(concurrency)
+        ))
+    elapsed = time.monotonic() - started
+
+    total = len(latencies) + len(errors)
+    return {
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "error_rate": len(errors) / total if total else 1.0,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 99) * 1000 if latencies else None,
+    }
+
+
+def sustained(step: dict, args) -> bool:
+    return step["p99_ms"] is not None and step["p99_ms"] <= args.p99_ms and step["error_rate"] <= args.max_error_rate
+
+
+def format_ms(value: float | None) -> str:
+    return f"{value:.1f}ms" if value is not None else "-"
+
+
+async def run(args):
+    targets = [target.split("=", 1) for target in args.target]
+    capacity = {}
+
+    for name, base_url in targets:
+        print(f"== {name} ({base_url})")
+        capacity[name] = 0
+        for concurrency in args.concurrency:
+            step = await run_step(base_url, args.jobs, concurrency, args)
+            print(
+                f"  c={concurrency:<5} {step['rps']:8.1f} req/s  p50={format_ms(step['p50_ms'])}  "
+                f"p99={format_ms(step['p99_ms'])}  errors={step['errors']} ({step['error_rate']:.1%})"
+            )
+            if not sustained(step, args):
+                break
+            capacity[name] = concurrency
+            await asyncio.sleep(args.pause)
+
+    print(f"\nMax concurrency with p99 <= {args.p99_ms:.0f}ms and errors <= {args.max_error_rate:.1%}:")
+    for name, value in capacity.items():
+        print(f"  {name}: {value or 'below the first step'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", action="append", required=True, help="name=base_url; repeat per deployment")
+    parser.add_argument("--jobs", type=int, nargs="+", required=True, help="Completed job IDs to request")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), help="URL templates with {id} to cycle through")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 100, 200, 400, 800])
+    parser.add_argument("--step-seconds", type=float, default=20.0)
+    parser.add_argument("--pause", type=float, default=2.0, help="Seconds between steps")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--slow-client", type=float, default=0.0, help="Seconds to wait before reading each body")
+    parser.add_argument("--p99-ms", type=float, default=500.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Cold-start benchmark: how long a fresh web or worker process takes to be
+ready, and what the first job pays compared with the second.
+
+Every measurement runs in a new interpreter, repeated --repeat times:
+
+- web:    django.setup() and loading the URLconf (all views imported).
+- worker: django.setup(), the task modules, and the worker_init /
+          worker_process_init preload (generator.preload).
+- job:    the local part of a job run twice in one process (resolve HEAD,
+          fetch into scratch, analyze, render, create the LLM client; no
+          model call), with and without the preload.
+
+Usage (from the repository root, with the app's environment set):
+
+    python benchmarks/cold_start.py --repo /path/to/some/git/checkout
+
+--importtime also prints the slowest imports of the web process.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(mode: str, repo: str | None, preload: bool):
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    started = time.perf_counter()
+
+    import django
+    django.setup()
+
+    if mode == "web":
+        from django.urls import get_resolver
+        get_resolver().url_patterns
+        print(json.dumps({"ready": time.perf_counter() - started}))
+        return
+
+    import generator.tasks  # noqa: F401
+    if preload:
+        from generator.preload import import_worker_modules, preload_worker
+        import_worker_modules()
+        preload_worker()
+    ready = time.perf_counter() - started
+
+    if mode == "worker":
+        print(json.dumps({"ready": ready}))
+        return
+
+    jobs = []
+    for _ in range(2):
+        job_started = time.perf_counter()
+        run_job(repo)
+        jobs.append(time.perf_counter() - job_started)
+    print(json.dumps({"ready": ready, "first_job": jobs[0], "second_job": jobs[1]}))
+
+
+def run_job(repo: str):
+    from analysis.utils import analyze_repo
+    from generator.fetchers import fetch_repo
+    from generator.repos import resolve_head
+    from generator.scratch import scratch_dir
+    from readme.llm import GeminiClient
+    from readme.utils import generate_readme_markdown
+
+    commit_sha = resolve_head(repo)
+    with scratch_dir(0) as work_dir:
+        fetched = fetch_repo(repo, commit_sha, work_dir)
+        analysis_data = analyze_repo(work_dir, file_paths=fetched["paths"])
+    analysis_data["project_name"] = os.path.basename(repo)
+    generate_readme_markdown(analysis_data)
+    GeminiClient()
+
+
+def measure(args, mode: str, preload: bool = False) -> list[dict]:
+    command = [sys.executable, __file__, "--child", mode, "--repo", args.repo or ""]
+    if preload:
+        command.append("--preload")
+
+    runs = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result["process"] = time.perf_counter() - started
+        runs.append(result)
+    return runs
+
+
+def report(label: str, runs: list[dict]):
+    fields = [field for field in ("process", "ready", "first_job", "second_job") if field in runs[0]]
+    summary = "  ".join(f"{field}={statistics.median(run[field] for run in runs) * 1000:.0f}ms" for field in fields)
+    print(f"{label:<22} {summary}")
+
+
+def slowest_imports(limit: int):
+    command = [sys.executable, "-X", "importtime", __file__, "--child", "web"]
+    stderr = subprocess.run(command, check=True, capture_output=True, text=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    print("\nSlowest imports (web, cumulative):")
+    for cumulative, name in sorted(rows, reverse=True)[:limit]:
+        print(f"  {cumulative / 1000:8.1f}ms {name}")
+
+
+def timed(call) -> float:
+    started = time.perf_counter()
+    call()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo", help="Local git checkout used for the job measurement")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--importtime", type=int, nargs="?", const=20, help="Show the N slowest web imports")
+    parser.add_argument("--child", choices=("web", "worker", "job"), help=argparse.SUPPRESS)
+    parser.add_argument("--preload", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.repo, args.preload)
+        return
+
+    print(f"median of {args.repeat} fresh processes")
+    report("python (baseline)", [
+        {"process": run} for run in (
+            timed(lambda: subprocess.run([sys.executable, "-c", "pass"], check=True))
+            for _ in range(args.repeat)
+        )
+    ])
+    report("web", measure(args, "web"))
+    report("worker (preloaded)", measure(args, "worker", preload=True))
+    if args.repo:
+        report("job, lazy clients", measure(args, "job"))
+        report("job, preloaded", measure(args, "job", preload=True))
+    if args.importtime:
+        slowest_imports(args.importtime)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,42 @@
 import os
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_ready, worker_process_shutdown
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 app = Celery('config')
 app.config_from_object('django.conf:settings', namespace='CELERY')
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+
+@worker_init.connect
+def import_worker_modules(**kwargs):
+    from generator.preload import import_worker_modules
+    import_worker_modules()
+
+
+@worker_process_init.connect
+def preload_worker_clients(**kwargs):
+    from generator.preload import preload_worker
+    preload_worker()
+
+
+@worker_ready.connect
+def start_metrics_server(**kwargs):
+    from generator.metrics import start_worker_metrics_server
+    start_worker_metrics_server()
+
+
+@worker_ready.connect
+@worker_process_init.connect
+def sweep_scratch(**kwargs):
+    # Also on every pool process start: a replaced child (OOM, max tasks)
+    # leaves its predecessor's directory behind.
+    from generator.scratch import sweep_orphans
+    sweep_orphans()
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    from generator.metrics import mark_process_dead
+    mark_process_dead(pid or os.getpid())
@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 import dj_database_url
 
@@ -15,6 +16,68 @@ REDIS_URL = os.getenv("REDIS_URL")
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
 
+CELERY_BEAT_SCHEDULE = {
+    "reclaim-stale-jobs": {
+        "task": "generator.tasks.reclaim_stale_jobs",
+        "schedule": 60.0,
+    },
+    "dispatch-pending-jobs": {
+        "task": "generator.tasks.dispatch_pending_jobs",
+        "schedule": 10.0,
+    },
+    "warm-popular-repos": {
+        "task": "generator.tasks.warm_popular_repos",
+        "schedule": float(os.getenv("WARMUP_INTERVAL_SECONDS", "600")),
+    },
+    "sweep-scratch": {
+        "task": "generator.tasks.sweep_scratch",
+        "schedule": float(os.getenv("SCRATCH_SWEEP_INTERVAL_SECONDS", "900")),
+    },
+    "purge-expired-jobs": {
+        "task": "generator.tasks.purge_expired_jobs",
+        "schedule": float(os.getenv("JOB_RETENTION_INTERVAL_SECONDS", "3600")),
+    },
+}
+
+# Priority lanes (generator.scheduling). Each lane has its own Celery queue and
+# a cap on dispatched-but-unfinished jobs; the caps weight how worker slots are
+# shared between lanes. Fair per-client ordering applies within a lane.
+JOB_LANES = {
+    "interactive": {"queue": "interactive", "capacity": int(os.getenv("LANE_INTERACTIVE_CAPACITY", "16"))},
+    "bulk": {"queue": "bulk", "capacity": int(os.getenv("LANE_BULK_CAPACITY", "4"))},
+    "warmup": {"queue": "warmup", "capacity": int(os.getenv("LANE_WARMUP_CAPACITY", "2"))},
+}
+# Used for wait estimates until a lane has completed jobs to average.
+JOB_DEFAULT_SECONDS = 60
+
+# A worker must heartbeat within this many seconds or its job is reclaimed.
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "600"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# A dispatched job not claimed within this many seconds (lost broker message,
+# worker killed before claiming) is handed back to the scheduler.
+JOB_DISPATCH_TIMEOUT = int(os.getenv("JOB_DISPATCH_TIMEOUT", "600"))
+
+# Retention (generator.retention): jobs whose status is listed here are purged
+# once they have not changed for that many days. Unlisted statuses (pending,
+# processing) are never purged. Purged rows are first written to gzip JSONL
+# files under JOB_ARCHIVE_ROOT (empty: delete without archiving), a batch at
+# a time; each run stops after JOB_RETENTION_MAX_BATCHES batches.
+JOB_RETENTION_DAYS = {
+    "completed": int(os.getenv("JOB_RETENTION_COMPLETED_DAYS", "30")),
+    "failed": int(os.getenv("JOB_RETENTION_FAILED_DAYS", "14")),
+}
+JOB_ARCHIVE_ROOT = os.getenv("JOB_ARCHIVE_ROOT", str(BASE_DIR / "archive"))
+JOB_RETENTION_BATCH_SIZE = int(os.getenv("JOB_RETENTION_BATCH_SIZE", "500"))
+JOB_RETENTION_MAX_BATCHES = int(os.getenv("JOB_RETENTION_MAX_BATCHES", "200"))
+# Snapshots no job references any more are deleted (not archived: they can be
+# rebuilt from the repository) once older than this many days.
+SNAPSHOT_RETENTION_DAYS = int(os.getenv("SNAPSHOT_RETENTION_DAYS", "7"))
+
+# Prometheus: set PROMETHEUS_MULTIPROC_DIR in the environment to aggregate
+# metrics across web and Celery prefork processes.
+CELERY_METRICS_PORT = int(os.getenv("CELERY_METRICS_PORT", "9808"))
+METRICS_CELERY_QUEUES = ["interactive", "bulk", "warmup", "celery"]
+
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
@@ -25,8 +88,85 @@ CACHES = {
     }
 }
 
+# Job status is mirrored into the cache on every transition (generator.job_state).
+JOB_STATE_TTL = int(os.getenv("JOB_STATE_TTL", str(60 * 60 * 24)))
+# WebSocket status streams (generator.realtime) wait this long for the Redis
+# subscription before closing with 1011.
+JOB_STATUS_SUBSCRIBE_TIMEOUT = float(os.getenv("JOB_STATUS_SUBSCRIBE_TIMEOUT", "5"))
+
+# Final READMEs are cached per (normalized repo URL, HEAD commit); HEAD lookups
+# are cached briefly so the generate/ fast path avoids a network round-trip.
+REPO_README_CACHE_TTL = int(os.getenv("REPO_README_CACHE_TTL", str(60 * 60 * 24 * 7)))
+REPO_HEAD_CACHE_TTL = int(os.getenv("REPO_HEAD_CACHE_TTL", "60"))
+# git ls-remote is killed after this many seconds. The generate/ request path
+# gives up much sooner on a cold HEAD lookup and queues the job, which
+# resolves HEAD itself.
+REPO_RESOLVE_TIMEOUT = float(os.getenv("REPO_RESOLVE_TIMEOUT", "5"))
+REPO_RESOLVE_INLINE_TIMEOUT = float(os.getenv("REPO_RESOLVE_INLINE_TIMEOUT", "1"))
+
+# Repository fetch: "archive" streams the host's tar.gz and extracts only
+# manifests, falling back to git clone for hosts not listed here; "clone"
+# always clones. Templates get {path} (owner/repo), {name} and {ref}.
+REPO_FETCH_MODE = os.getenv("REPO_FETCH_MODE", "archive")
+REPO_ARCHIVE_URLS = {
+    "github.com": "https://codeload.github.com/{path}/tar.gz/{ref}",
+    "gitlab.com": "https://gitlab.com/{path}/-/archive/{ref}/{name}-{ref}.tar.gz",
+}
+REPO_ARCHIVE_TIMEOUT = int(os.getenv("REPO_ARCHIVE_TIMEOUT", "60"))
+REPO_ARCHIVE_POOL_SIZE = int(os.getenv("REPO_ARCHIVE_POOL_SIZE", "10"))
+
+# Per-job working directories (generator.scratch). Point SCRATCH_ROOT at a
+# dedicated volume (tmpfs works: archive fetches barely touch disk). A job is
+# aborted if its repo outgrows SCRATCH_JOB_QUOTA_BYTES, and only starts while
+# the space in use leaves room for one more such job in the total budget;
+# otherwise it is requeued after SCRATCH_FULL_RETRY_SECONDS, without failing.
+SCRATCH_ROOT = os.getenv("SCRATCH_ROOT", os.path.join(tempfile.gettempdir(), "readme-scratch"))
+SCRATCH_JOB_QUOTA_BYTES = int(os.getenv("SCRATCH_JOB_QUOTA_BYTES", str(512 * 1024 * 1024)))
+SCRATCH_TOTAL_QUOTA_BYTES = int(os.getenv("SCRATCH_TOTAL_QUOTA_BYTES", str(4 * 1024 * 1024 * 1024)))
+SCRATCH_FULL_RETRY_SECONDS = int(os.getenv("SCRATCH_FULL_RETRY_SECONDS", "30"))
+# Directories from other hosts are treated as orphans after this long.
+SCRATCH_ORPHAN_SECONDS = int(os.getenv("SCRATCH_ORPHAN_SECONDS", str(60 * 60)))
+
+# Deterministic README: directories with more entries than this are collapsed
+# to "... (N more)" in the file structure section (0 shows everything).
+README_TREE_MAX_DIR_ENTRIES = int(os.getenv("README_TREE_MAX_DIR_ENTRIES", "50"))
+
+# Deep mode (readme.summarize): entry points and other high-signal files, up
+# to DEEP_SUMMARY_BUDGET_BYTES, are summarized in parallel LLM calls of up to
+# DEEP_SUMMARY_CHUNK_BYTES each. Summaries are cached per git blob hash.
+DEEP_SUMMARY_BUDGET_BYTES = int(os.getenv("DEEP_SUMMARY_BUDGET_BYTES", str(96 * 1024)))
+DEEP_SUMMARY_CHUNK_BYTES = int(os.getenv("DEEP_SUMMARY_CHUNK_BYTES", str(24 * 1024)))
+DEEP_SUMMARY_MAX_FILE_BYTES = int(os.getenv("DEEP_SUMMARY_MAX_FILE_BYTES", str(16 * 1024)))
+DEEP_SUMMARY_CONCURRENCY = int(os.getenv("DEEP_SUMMARY_CONCURRENCY", "4"))
+SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", str(60 * 60 * 24 * 30)))
+
+# Cache warming: decaying request counts per repo, refreshed by
+# warm_popular_repos and GitHub push webhooks in the warmup lane.
+POPULARITY_HALF_LIFE_SECONDS = int(os.getenv("POPULARITY_HALF_LIFE_SECONDS", str(60 * 60 * 24)))
+POPULARITY_MAX_TRACKED = int(os.getenv("POPULARITY_MAX_TRACKED", "10000"))
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", "50"))
+GITHUB_WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET", "")
+
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Model cascade (readme.routing), cheapest first. A request starts at the
+# first tier whose limits it fits (files in the repo, estimated prompt tokens,
+# detected languages) and escalates a tier at a time while the README fails
+# validation. The last tier has no limits.
+LLM_MODEL_TIERS = [
+    {"name": "fast", "model": os.getenv("LLM_FAST_MODEL", "gemini-2.5-flash-lite"),
+     "max_files": 2000, "max_prompt_tokens": 8000, "max_languages": 3},
+    {"name": "standard", "model": os.getenv("LLM_STANDARD_MODEL", "gemini-2.5-flash"),
+     "max_files": 20000, "max_prompt_tokens": 32000},
+    {"name": "strong", "model": os.getenv("LLM_STRONG_MODEL", "gemini-2.5-pro")},
+]
+# Required README sections a response may omit before it counts as invalid.
+LLM_MAX_MISSING_SECTIONS = int(os.getenv("LLM_MAX_MISSING_SECTIONS", "1"))
+
+# Artifacts for jobs submitted with profile=true. Must be shared by web and workers.
+PROFILE_ROOT = os.getenv("PROFILE_ROOT", str(BASE_DIR / "profiles"))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+
 
 ALLOWED_HOSTS = []
 
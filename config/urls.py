@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from generator.views import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -8,6 +9,8 @@ urlpatterns = [
   
     path('api/', include('generator.urls')),
 
+    path('metrics', MetricsView.as_view(), name='metrics'),
+
 
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
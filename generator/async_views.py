@@ -0,0 +1,94 @@
+"""
+Async views for the read-heavy endpoints (status, download, preview, health).
+
+Under ASGI these run on the event loop, reading job state with redis.asyncio
+and the async ORM, so slow clients and pollers do not hold a worker thread
+each. Only the remaining sync work (queue estimates, Markdown rendering) is
+handed to threads. Under WSGI they still work (Django runs each on its own
+short-lived loop), with job state read through the sync Redis client.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+
+from .models import GenerationJob
+from .serializers import GenerationJobSerializer
+from .scheduling import queue_estimate
+from .job_state import aget_job_state, get_job_state
+
+TRUE_VALUES = ("1", "true", "yes")
+
+
+@require_GET
+async def job_status(request, job_id):
+    """
+    Status of a generation job, served from the Redis job-state cache; pass
+    include_result=true for the README. Pending jobs also report
+    queue_position and estimated_wait_seconds.
+    """
+    if request.GET.get("include_result", "").lower() in TRUE_VALUES:
+        try:
+            job = await GenerationJob.objects.aget(id=job_id)
+        except GenerationJob.DoesNotExist:
+            return JsonResponse({"error": "Job not found"}, status=404)
+        return JsonResponse(GenerationJobSerializer(job).data)
+
+    state = await read_job_state(request, job_id)
+    if state is None:
+        return JsonResponse({"error": "Job not found"}, status=404)
+    if state["status"] == "pending":
+        state = {**state, **await sync_to_async(queue_estimate)(state)}
+    return JsonResponse(state)
+
+
+async def read_job_state(request, job_id) -> dict | None:
+    if isinstance(request, ASGIRequest):
+        return await aget_job_state(job_id)
+    # Under WSGI every request runs on a new event loop (async_to_sync); the
+    # process-wide sync client keeps its pooled connections across requests.
+    return await sync_to_async(get_job_state)(job_id)
+
+
+async def completed_result(job_id) -> str | None:
+    job = await GenerationJob.objects.only("result").filter(id=job_id, status="completed").afirst()
+    return job.result if job else None
+
+
+@require_GET
+async def download_readme(request, job_id):
+    """
+    Download the generated README.md file for a completed job.
+    """
+    result = await completed_result(job_id)
+    if result is None:
+        return JsonResponse({"error": "README not available"}, status=404)
+
+    response = HttpResponse(result, content_type="text/markdown")
+    response["Content-Disposition"] = f'attachment; filename="README_{job_id}.md"'
+    return response
+
+
+@require_GET
+async def preview_readme(request, job_id):
+    """
+    Render the generated README as HTML for preview.
+    """
+    result = await completed_result(job_id)
+    if result is None:
+        return JsonResponse({"error": "README not available"}, status=404)
+
+    import markdown2  # only needed by this endpoint
+
+    html = await asyncio.to_thread(markdown2.markdown, result, extras=["fenced-code-blocks", "tables", "toc"])
+    return HttpResponse(html, content_type="text/html")
+
+
+@require_GET
+async def health(request):
+    """
+    Health check endpoint to confirm the API is running.
+    """
+    return JsonResponse({"status": "ok"})
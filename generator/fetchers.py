@@ -0,0 +1,183 @@
+import os
+import shutil
+import logging
+import tarfile
+from typing import Callable
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from analysis.utils import measure_repo
+from .repos import clone_at
+from .scratch import QuotaExceeded
+
+logger = logging.getLogger(__name__)
+
+# Files analysis reads from disk; everything else is only listed.
+EXTRACT_FILES = {
+    "requirements.txt",
+    "package.json",
+    "pyproject.toml",
+    "setup.py",
+    "Pipfile",
+    "Dockerfile",
+    "docker-compose.yml",
+    "docker-compose.yaml",
+}
+
+# Larger "manifests" are skipped rather than written to disk.
+MAX_EXTRACT_BYTES = 1024 * 1024
+
+_session = None
+
+
+class ArchiveUnavailable(Exception):
+    """No archive endpoint for this repository; fall back to git clone."""
+
+
+def get_session() -> requests.Session:
+    """
+    One pooled HTTP session per process, so archive downloads to the same
+    host reuse TCP/TLS connections.
+    """
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.REPO_ARCHIVE_POOL_SIZE)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
+
+def archive_url(repo_url: str, ref: str) -> str:
+    """
+    Archive download URL for a normalized repository URL, from the host's
+    template in REPO_ARCHIVE_URLS.
+    Example: https://github.com/user/repo -> https://codeload.github.com/user/repo/tar.gz/<ref>
+    """
+    parts = urlsplit(repo_url)
+    template = settings.REPO_ARCHIVE_URLS.get(parts.netloc)
+    if template is None:
+        raise ArchiveUnavailable(f"No archive endpoint for host {parts.netloc!r}")
+
+    path = parts.path.strip("/")
+    return template.format(path=path, name=path.rsplit("/", 1)[-1], ref=ref or "HEAD")
+
+
+class CountingReader:
+    """
+    File-like wrapper counting the bytes read from the network.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def _member_path(name: str) -> str | None:
+    """
+    Path of an archive member relative to the repository root (archives wrap
+    everything in one "<repo>-<ref>/" directory), or None if unsafe.
+    """
+    parts = name.split("/")[1:]
+    if not parts or any(part in ("", ".", "..") for part in parts):
+        return None
+    return "/".join(parts)
+
+
+def fetch_archive(
+    repo_url: str,
+    commit_sha: str,
+    dest: str,
+    max_bytes: int | None = None,
+    extract: Callable[[str], bool] | None = None,
+) -> dict:
+    """
+    Stream the repository's tar.gz archive, recording every file path and
+    writing only EXTRACT_FILES (and paths accepted by extract) under dest.
+    Nothing else touches the disk.
+
+    Returns {"paths", "files", "bytes"}; bytes is the compressed size
+    downloaded. Raises ArchiveUnavailable when there is no archive to fetch,
+    and QuotaExceeded once the unpacked size passes max_bytes, the same
+    limit a clone of the repository would hit.
+    """
+    url = archive_url(repo_url, commit_sha)
+    try:
+        response = get_session().get(url, stream=True, timeout=settings.REPO_ARCHIVE_TIMEOUT)
+    except requests.RequestException as e:
+        raise ArchiveUnavailable(f"Archive request to {url} failed: {e}") from e
+
+    with response:
+        if response.status_code != 200:
+            raise ArchiveUnavailable(f"Archive request to {url} returned {response.status_code}")
+
+        reader = CountingReader(response.raw)
+        paths = []
+        unpacked_bytes = 0
+        try:
+            # "r|gz" reads strictly forward, one member at a time.
+            with tarfile.open(fileobj=reader, mode="r|gz") as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    path = _member_path(member.name)
+                    if path is None:
+                        continue
+                    paths.append(path)
+
+                    unpacked_bytes += member.size
+                    if max_bytes is not None and unpacked_bytes > max_bytes:
+                        raise QuotaExceeded(f"Repository exceeds the {max_bytes} byte scratch quota")
+
+                    wanted = os.path.basename(path) in EXTRACT_FILES or (extract is not None and extract(path))
+                    if wanted and member.size <= MAX_EXTRACT_BYTES:
+                        target = os.path.join(dest, *path.split("/"))
+                        os.makedirs(os.path.dirname(target), exist_ok=True)
+                        with archive.extractfile(member) as source, open(target, "wb") as out:
+                            out.write(source.read())
+
+        except (tarfile.TarError, EOFError, requests.RequestException) as e:
+            raise ArchiveUnavailable(f"Could not read archive from {url}: {e}") from e
+
+    return {"paths": paths, "files": len(paths), "bytes": reader.bytes_read}
+
+
+def fetch_repo(
+    repo_url: str,
+    commit_sha: str,
+    dest: str,
+    max_bytes: int | None = None,
+    extract: Callable[[str], bool] | None = None,
+) -> dict:
+    """
+    Fetch repo_url at commit_sha into dest for analysis.
+
+    Archive mode (REPO_FETCH_MODE="archive") streams the host's archive and
+    only extracts manifests (plus files accepted by extract); hosts without an archive endpoint, or a failed
+    download, fall back to a full git clone.
+
+    Returns {"mode", "paths", "files", "bytes"}; paths is None after a clone
+    (the working tree is complete, so analysis walks dest). Either way,
+    repositories larger than max_bytes raise QuotaExceeded.
+    """
+    if settings.REPO_FETCH_MODE == "archive":
+        try:
+            fetched = fetch_archive(repo_url, commit_sha, dest, max_bytes, extract)
+            return {"mode": "archive", **fetched}
+        except ArchiveUnavailable as e:
+            logger.info(f"{e}; falling back to git clone.")
+            # git clone needs an empty directory; drop any partial extraction.
+            shutil.rmtree(dest)
+            os.makedirs(dest)
+
+    clone_at(repo_url, commit_sha, dest, max_bytes)
+    repo_stats = measure_repo(dest)
+    return {"mode": "clone", "paths": None, **repo_stats}
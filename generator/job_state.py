@@ -0,0 +1,171 @@
+import json
+import asyncio
+import logging
+import weakref
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+
+from .models import GenerationJob
+from .serializers import JobStateSerializer
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "jobs:"
+
+_redis_client = None
+# redis.asyncio connections belong to the loop that opened them.
+_async_redis_clients = weakref.WeakKeyDictionary()
+
+
+def job_state_key(job_id: int) -> str:
+    return f"jobs:state:{job_id}"
+
+
+def job_channel(job_id: int) -> str:
+    return f"{CHANNEL_PREFIX}{job_id}"
+
+
+def get_redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+def get_async_redis():
+    """
+    redis.asyncio client for the running event loop: under ASGI one per
+    server loop, reused for the life of the process. A client (and its pool)
+    is dropped with its loop, so callers on a fresh loop (async_to_sync,
+    tests) never reuse connections of a closed one.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_redis_clients.get(loop)
+    if client is None:
+        client = _async_redis_clients[loop] = aioredis.Redis.from_url(settings.REDIS_URL)
+    return client
+
+
+def build_job_state(job: GenerationJob, progress: str | None = None) -> dict:
+    """
+    Everything a status poll needs except the README itself.
+    """
+    state = JobStateSerializer(job).data
+    state["progress"] = progress
+    return state
+
+
+def sync_job_state(job: GenerationJob, progress: str | None = None) -> dict:
+    """
+    Write-through: mirror the job's state into Redis (as JSON, so sync and
+    async readers share it) and publish it to WebSocket subscribers. Call
+    after every transition that was saved. Never raises; the database stays
+    the source of truth.
+    """
+    state = build_job_state(job, progress)
+
+    try:
+        get_redis().set(job_state_key(job.id), json.dumps(state), ex=settings.JOB_STATE_TTL)
+    except redis.RedisError as e:
+        logger.warning(f"Could not cache state for job {job.id}: {e}")
+
+    publish_job_state(job.id, state)
+    return state
+
+
+def sync_job_states(job_ids: list[int], progress: str | None = None):
+    """
+    sync_job_state for jobs changed by a bulk or conditional UPDATE that
+    bypassed their instances: reloads them (without `result`) in one query.
+    """
+    if not job_ids:
+        return
+    for job in GenerationJob.objects.defer("result").filter(id__in=job_ids):
+        sync_job_state(job, progress)
+
+
+def publish_job_state(job_id: int, state: dict):
+    try:
+        get_redis().publish(job_channel(job_id), json.dumps(state))
+    except redis.RedisError as e:
+        logger.warning(f"Could not publish state for job {job_id}: {e}")
+
+
+def get_job_state(job_id: int) -> dict | None:
+    """
+    Read a job's state from Redis, falling back to the database (without
+    loading `result`) and re-populating the cache on a miss.
+    """
+    try:
+        cached = get_redis().get(job_state_key(job_id))
+    except redis.RedisError as e:
+        logger.warning(f"Could not read cached state for job {job_id}: {e}")
+        cached = None
+
+    if cached is not None:
+        return json.loads(cached)
+
+    job = GenerationJob.objects.defer("result").filter(id=job_id).first()
+    if job is None:
+        return None
+
+    state = build_job_state(job)
+    try:
+        get_redis().set(job_state_key(job_id), json.dumps(state), ex=settings.JOB_STATE_TTL)
+    except redis.RedisError as e:
+        logger.warning(f"Could not cache state for job {job_id}: {e}")
+    return state
+
+
+async def aget_job_state(job_id: int) -> dict | None:
+    """
+    get_job_state for async views: redis.asyncio and the async ORM, so a
+    status read never occupies a worker thread.
+    """
+    client = get_async_redis()
+    try:
+        cached = await client.get(job_state_key(job_id))
+    except redis.RedisError as e:
+        logger.warning(f"Could not read cached state for job {job_id}: {e}")
+        cached = None
+
+    if cached is not None:
+        return json.loads(cached)
+
+    job = await GenerationJob.objects.defer("result").filter(id=job_id).afirst()
+    if job is None:
+        return None
+
+    state = build_job_state(job)
+    try:
+        await client.set(job_state_key(job_id), json.dumps(state), ex=settings.JOB_STATE_TTL)
+    except redis.RedisError as e:
+        logger.warning(f"Could not cache state for job {job_id}: {e}")
+    return state
+
+
+def clear_job_state(job_id: int):
+    """
+    Drop a deleted job's cached state and tell subscribers it is gone.
+    """
+    try:
+        get_redis().delete(job_state_key(job_id))
+    except redis.RedisError as e:
+        logger.warning(f"Could not clear cached state for job {job_id}: {e}")
+
+    publish_job_state(job_id, {"id": job_id, "status": "deleted"})
+
+
+def clear_job_states(job_ids: list[int]):
+    """
+    Drop cached state for jobs deleted in bulk (retention). Nothing is
+    published: expired jobs have no subscribers.
+    """
+    if not job_ids:
+        return
+    try:
+        get_redis().delete(*(job_state_key(job_id) for job_id in job_ids))
+    except redis.RedisError as e:
+        logger.warning(f"Could not clear cached state for {len(job_ids)} jobs: {e}")
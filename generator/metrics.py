@@ -0,0 +1,187 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+
+import redis
+from django.conf import settings
+from django.utils import timezone
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+# Metrics are process-local unless PROMETHEUS_MULTIPROC_DIR is set before this
+# module is imported. Web and Celery prefork children then write to shared
+# mmap files and every scrape aggregates them (see build_registry).
+
+STAGE_DURATION = Histogram(
+    "readme_stage_duration_seconds",
+    "Time spent in each README generation pipeline stage.",
+    ["stage"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+)
+
+CACHE_REQUESTS = Counter(
+    "readme_cache_requests_total",
+    "README cache lookups by cache (llm, repo or summary) and result (hit or miss).",
+    ["cache", "result"],
+)
+
+LLM_ERRORS = Counter(
+    "readme_llm_errors_total",
+    "LLM generation failures by exception class.",
+    ["error"],
+)
+
+LLM_TIER_LATENCY = Histogram(
+    "readme_llm_tier_duration_seconds",
+    "Latency of each LLM call by model tier (readme.routing).",
+    ["tier"],
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120),
+)
+
+LLM_TIER_REQUESTS = Counter(
+    "readme_llm_tier_requests_total",
+    "LLM calls by model tier and outcome (accepted, escalated, accepted_invalid, failed).",
+    ["tier", "outcome"],
+)
+
+TASK_RETRIES = Counter(
+    "readme_task_retries_total",
+    "Celery task retries by reason.",
+    ["reason"],
+)
+
+JOBS_PURGED = Counter(
+    "readme_jobs_purged_total",
+    "Jobs archived and deleted by the retention task, by status.",
+    ["status"],
+)
+
+JOB_BYTES_PURGED = Counter(
+    "readme_job_bytes_purged_total",
+    "Serialized size of the job rows deleted by the retention task.",
+)
+
+SNAPSHOTS_PURGED = Counter(
+    "readme_snapshots_purged_total",
+    "Repository snapshots no job referenced, deleted by the retention task.",
+)
+
+SNAPSHOT_BYTES_PURGED = Counter(
+    "readme_snapshot_bytes_purged_total",
+    "Serialized size of the snapshot rows deleted by the retention task.",
+)
+
+JOBS_IN_FLIGHT = Gauge(
+    "readme_jobs_in_flight",
+    "README generation jobs currently being processed by workers.",
+    multiprocess_mode="livesum",
+)
+
+
+@contextmanager
+def track_stage(stage: str, timings: dict | None = None):
+    """
+    Time a pipeline stage into the stage duration histogram.
+
+    When a timings dict is given (e.g. GenerationJob.stage_timings), the
+    stage's start, end and duration are recorded into it as well.
+    """
+    started_at = timezone.now()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_DURATION.labels(stage=stage).observe(duration)
+        if timings is not None:
+            timings[stage] = {
+                "started_at": started_at.isoformat(),
+                "finished_at": timezone.now().isoformat(),
+                "duration": round(duration, 3),
+            }
+
+
+class CeleryQueueCollector:
+    """
+    Report broker queue depth at scrape time.
+
+    Queue depth is a property of the broker, not of any one process, so it is
+    read on demand instead of being stored in the multiprocess files.
+    """
+
+    def describe(self):
+        yield self._family()
+
+    def collect(self):
+        gauge = self._family()
+
+        try:
+            client = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+            for queue in settings.METRICS_CELERY_QUEUES:
+                gauge.add_metric([queue], client.llen(queue))
+        except Exception as e:
+            logger.warning(f"Could not read Celery queue depth: {e}")
+            return
+
+        yield gauge
+
+    def _family(self) -> GaugeMetricFamily:
+        return GaugeMetricFamily(
+            "readme_celery_queue_depth",
+            "Messages waiting in each Celery broker queue.",
+            labels=["queue"],
+        )
+
+
+def build_registry() -> CollectorRegistry:
+    """
+    Build the registry served on a scrape.
+
+    In multiprocess mode a fresh registry aggregates the files written by every
+    process; otherwise the default process registry is used as-is.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(CeleryQueueCollector())
+    return registry
+
+
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    REGISTRY.register(CeleryQueueCollector())
+
+
+def render_metrics() -> bytes:
+    return generate_latest(build_registry())
+
+
+def start_worker_metrics_server():
+    """
+    Expose metrics from the Celery main process so each worker pod can be
+    scraped for its prefork children.
+    """
+    port = settings.CELERY_METRICS_PORT
+    if not port:
+        return
+
+    start_http_server(port, registry=build_registry())
+    logger.info(f"Serving worker metrics on port {port}")
+
+
+def mark_process_dead(pid: int):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
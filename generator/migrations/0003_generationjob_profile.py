@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 09:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0002_generationjob_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='profile',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='profiled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
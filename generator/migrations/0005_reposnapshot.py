@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-19 09:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0004_generationjob_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='commit_sha',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.CreateModel(
+            name='RepoSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('repo_url', models.URLField()),
+                ('commit_sha', models.CharField(max_length=64)),
+                ('analysis', models.JSONField()),
+                ('base_readme', models.TextField()),
+                ('files_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('bytes_fetched', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('repo_url', 'commit_sha'), name='unique_repo_snapshot')],
+            },
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='snapshot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='generator.reposnapshot'),
+        ),
+    ]
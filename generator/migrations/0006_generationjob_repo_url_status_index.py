@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-19 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0005_reposnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='generationjob',
+            index=models.Index(fields=['repo_url', 'status'], name='generator_g_repo_ur_238e6a_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0007_generationjob_scheduling'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='deep',
+            field=models.BooleanField(default=False),
+        ),
+    ]
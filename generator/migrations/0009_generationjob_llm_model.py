@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 09:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0008_generationjob_deep'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='llm_escalations',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='llm_model',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-19 09:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0009_generationjob_llm_model'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='generationjob',
+            index=models.Index(fields=['status', 'updated_at'], name='generator_g_status_410e93_idx'),
+        ),
+    ]
@@ -1,4 +1,32 @@
+from datetime import timedelta
+
 from django.db import models
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+class RepoSnapshot(models.Model):
+    """
+    Checkpoint of the clone + analysis + render stages for one commit.
+    Jobs resume from it instead of re-cloning, and jobs for the same commit share it.
+    """
+
+    repo_url = models.URLField()
+    commit_sha = models.CharField(max_length=64)
+    analysis = models.JSONField()
+    base_readme = models.TextField()
+    files_count = models.PositiveIntegerField(blank=True, null=True)
+    bytes_fetched = models.PositiveBigIntegerField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['repo_url', 'commit_sha'], name='unique_repo_snapshot'),
+        ]
+
+    def __str__(self):
+        return f"{self.repo_url}@{self.commit_sha[:12]}"
+
 
 class GenerationJob(models.Model):
     STATUS_CHOICES = [
@@ -8,11 +36,145 @@ class GenerationJob(models.Model):
         ('failed', 'Failed'),
     ]
 
+    PRIORITY_CHOICES = [
+        ('interactive', 'Interactive'),
+        ('bulk', 'Bulk'),
+        ('warmup', 'Warmup'),
+    ]
+
     repo_url = models.URLField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     result = models.TextField(blank=True, null=True) 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Timing breakdown, filled in by process_repo_task.
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    stage_timings = models.JSONField(default=dict, blank=True)
+    files_count = models.PositiveIntegerField(blank=True, null=True)
+    bytes_fetched = models.PositiveBigIntegerField(blank=True, null=True)
+    prompt_tokens = models.PositiveIntegerField(blank=True, null=True)
+    response_tokens = models.PositiveIntegerField(blank=True, null=True)
+    cache_hit = models.BooleanField(blank=True, null=True)
+    # Model that produced the README and how many tiers it escalated through.
+    llm_model = models.CharField(max_length=100, blank=True, default='')
+    llm_escalations = models.PositiveSmallIntegerField(blank=True, null=True)
+
+    # Opt-in profiling (see generator.profiling).
+    profile = models.BooleanField(default=False)
+    profiled_at = models.DateTimeField(blank=True, null=True)
+
+    # Deep mode: high-signal source files are summarized and fed to the prompt.
+    deep = models.BooleanField(default=False)
+
+    # Worker lease: the claiming worker must finish or heartbeat before
+    # lease_expires_at, otherwise the job is reclaimed (see reclaim_stale_jobs).
+    claimed_by = models.CharField(max_length=255, blank=True, default='')
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    # Scheduling (see generator.scheduling): lane, fairness key, and when the
+    # job was handed to Celery. Pending jobs with no dispatched_at are waiting.
+    priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default='interactive')
+    client_id = models.CharField(max_length=64, blank=True, default='')
+    dispatched_at = models.DateTimeField(blank=True, null=True)
+
+    # Last completed checkpoint; retries resume from here.
+    commit_sha = models.CharField(max_length=64, blank=True, default='')
+    snapshot = models.ForeignKey(RepoSnapshot, on_delete=models.SET_NULL, blank=True, null=True, related_name='jobs')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'lease_expires_at']),
+            models.Index(fields=['repo_url', 'status']),
+            models.Index(fields=['priority', 'status', 'dispatched_at', 'client_id']),
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
     def __str__(self):
         return f"{self.repo_url} - {self.status}"
+
+    @classmethod
+    def claim(cls, job_id: int, worker: str, lease_seconds: int, max_attempts: int | None = None) -> "GenerationJob | None":
+        """
+        Atomically claim a pending job (or one whose lease has expired) for
+        `worker`. Returns the claimed job, or None if it does not exist,
+        another worker holds it or it has already been attempted
+        `max_attempts` times. The claim is a single conditional UPDATE, so
+        two deliveries of the same task cannot both win.
+        """
+        now = timezone.now()
+        claimable = Q(status='pending') | Q(status='processing', lease_expires_at__lt=now)
+        if max_attempts is not None:
+            claimable &= Q(attempts__lt=max_attempts)
+
+        claimed = cls.objects.filter(claimable, id=job_id).update(
+            status='processing',
+            claimed_by=worker,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            attempts=F('attempts') + 1,
+            started_at=now,
+            finished_at=None,
+            stage_timings={},
+            updated_at=now,
+        )
+        if not claimed:
+            return None
+        return cls.objects.defer('result').get(id=job_id)
+
+    def heartbeat(self, lease_seconds: int) -> bool:
+        """
+        Extend this worker's lease. Returns False if the lease was lost.
+        """
+        now = timezone.now()
+        self.lease_expires_at = now + timedelta(seconds=lease_seconds)
+        return bool(
+            GenerationJob.objects.filter(id=self.id, status='processing', claimed_by=self.claimed_by)
+            .update(lease_expires_at=self.lease_expires_at, updated_at=now)
+        )
+
+    def checkpoint(self, **fields) -> bool:
+        """
+        Persist stage output without changing status, as long as this
+        instance's worker still owns the job.
+        """
+        for name, value in fields.items():
+            setattr(self, name, value)
+        return bool(
+            GenerationJob.objects.filter(id=self.id, status='processing', claimed_by=self.claimed_by)
+            .update(updated_at=timezone.now(), **fields)
+        )
+
+    def transition(self, to_status: str, expected: str | tuple, owned: bool = False, **fields) -> bool:
+        """
+        Move to `to_status` with UPDATE ... WHERE status IN expected, writing
+        only status, updated_at and the given fields. With owned=True the row
+        must also still be claimed by this instance's worker. Returns False
+        (and leaves the instance untouched) if the row was not in the expected
+        state.
+        """
+        expected = (expected,) if isinstance(expected, str) else tuple(expected)
+        values = {'status': to_status, 'updated_at': timezone.now(), **fields}
+
+        queryset = GenerationJob.objects.filter(id=self.id, status__in=expected)
+        if owned:
+            queryset = queryset.filter(claimed_by=self.claimed_by)
+        if not queryset.update(**values):
+            return False
+
+        for name, value in values.items():
+            setattr(self, name, value)
+        return True
+
+    @property
+    def queue_seconds(self) -> float | None:
+        if not self.started_at:
+            return None
+        return (self.started_at - self.created_at).total_seconds()
+
+    @property
+    def total_seconds(self) -> float | None:
+        if not self.finished_at:
+            return None
+        return (self.finished_at - self.created_at).total_seconds()
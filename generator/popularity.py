@@ -0,0 +1,78 @@
+import time
+import logging
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from .repos import repo_key
+
+logger = logging.getLogger(__name__)
+
+POPULARITY_KEY = "repo:popularity"
+EPOCH_KEY = "repo:popularity:epoch"
+
+# Rescale once scores grow past this to stay well inside float range.
+MAX_SCORE = 1e100
+
+
+def _weight(now: float, epoch: float) -> float:
+    return 2 ** ((now - epoch) / settings.POPULARITY_HALF_LIFE_SECONDS)
+
+
+def _get_epoch(client, now: float) -> float:
+    epoch = client.get(EPOCH_KEY)
+    if epoch is None:
+        client.set(EPOCH_KEY, now, nx=True)
+        epoch = client.get(EPOCH_KEY)
+    return float(epoch)
+
+
+def record_request(repo_url: str):
+    """
+    Count a request for repo_url in a decaying LFU sorted set, under its
+    repo_key so spellings that differ only in case share one score.
+
+    Forward decay: each hit adds 2^((now - epoch) / half_life), which is the
+    same as every older hit losing half its weight per half-life, without
+    ever rewriting old scores. Never raises.
+    """
+    try:
+        client = get_redis_connection("default")
+        now = time.time()
+        epoch = _get_epoch(client, now)
+
+        pipe = client.pipeline()
+        pipe.zincrby(POPULARITY_KEY, _weight(now, epoch), repo_key(repo_url))
+        # Keep only the most popular entries.
+        pipe.zremrangebyrank(POPULARITY_KEY, 0, -(settings.POPULARITY_MAX_TRACKED + 1))
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not record popularity for {repo_url}: {e}")
+
+
+def top_repos(n: int) -> list[str]:
+    """
+    The n most popular repositories, as repo_key URLs.
+    """
+    client = get_redis_connection("default")
+    return [member.decode() for member in client.zrevrange(POPULARITY_KEY, 0, n - 1)]
+
+
+def rescale():
+    """
+    Move the epoch to now and scale every score down to match, so weights
+    restart from 1. Called periodically; cheap when not needed.
+    """
+    client = get_redis_connection("default")
+    now = time.time()
+    epoch = _get_epoch(client, now)
+    top = client.zrevrange(POPULARITY_KEY, 0, 0, withscores=True)
+    if not top or top[0][1] < MAX_SCORE:
+        return
+
+    factor = 1 / _weight(now, epoch)
+    pipe = client.pipeline()
+    pipe.zunionstore(POPULARITY_KEY, {POPULARITY_KEY: factor})
+    pipe.set(EPOCH_KEY, now)
+    pipe.execute()
+    logger.info(f"Rescaled repo popularity scores by {factor:.3g}")
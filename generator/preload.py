@@ -0,0 +1,41 @@
+import time
+import logging
+
+from git import Git
+
+logger = logging.getLogger(__name__)
+
+
+def import_worker_modules():
+    """
+    Import the heavy modules only workers need. Run once in the Celery
+    parent (worker_init) so prefork children inherit them instead of each
+    importing them on its first job.
+    """
+    import google.genai  # noqa: F401
+
+
+def preload_worker():
+    """
+    Build the per-process clients a job needs before the first job arrives:
+    the Gemini client, the archive HTTP session, and one git invocation so
+    the binary and GitPython's command setup are warm. Run in each child
+    (worker_process_init), since clients must not be shared across fork.
+    Nothing here touches the network: Celery kills a child whose init takes
+    longer than worker_proc_alive_timeout. A client that cannot be built is
+    logged and left to be built (and fail properly) inside the job.
+    """
+    from readme.llm import get_genai_client
+    from .fetchers import get_session
+
+    started = time.perf_counter()
+    for name, load in (
+        ("gemini", get_genai_client),
+        ("http", get_session),
+        ("git", lambda: Git().version_info),
+    ):
+        try:
+            load()
+        except Exception as e:
+            logger.warning(f"Could not preload {name} client: {e}")
+    logger.info(f"Worker clients preloaded in {time.perf_counter() - started:.2f}s")
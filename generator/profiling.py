@@ -0,0 +1,107 @@
+import os
+import re
+import sys
+import glob
+import cProfile
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import GenerationJob
+
+logger = logging.getLogger(__name__)
+
+
+def profile_paths(job_id: int, attempt: int) -> dict:
+    base = os.path.join(settings.PROFILE_ROOT, f"job_{job_id}_attempt{attempt}")
+    return {
+        "pstats": f"{base}.pstats",
+        "collapsed": f"{base}.collapsed",
+    }
+
+
+def profiled_attempts(job_id: int) -> list[int]:
+    """
+    Attempts of the job that left a profile, oldest first.
+    """
+    pattern = re.compile(rf"job_{job_id}_attempt(\d+)\.pstats$")
+    paths = glob.glob(os.path.join(settings.PROFILE_ROOT, f"job_{job_id}_attempt*.pstats"))
+    return sorted(int(match.group(1)) for match in map(pattern.search, paths) if match)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class JobProfiler:
+    """
+    Profile the calling thread for the duration of a `with` block and mark
+    the job's profiled_at once the artifacts exist.
+
+    Two artifacts are written on exit, even if the block raised, named after
+    the attempt so a retry keeps the profiles of earlier attempts:
+    - a cProfile pstats dump (deterministic, for snakeviz / pstats),
+    - a collapsed-stack file sampled every `interval` seconds, one
+      "frame;frame;frame count" line per unique stack, for flamegraph tools.
+
+    Only constructed for jobs submitted with profile=true, so normal jobs
+    never pay for it.
+    """
+
+    def __init__(self, job: GenerationJob, interval: float | None = None):
+        self.job = job
+        self.job_id = job.id
+        self.interval = interval or settings.PROFILE_SAMPLE_INTERVAL
+        self.paths = profile_paths(job.id, job.attempts)
+        self.stacks = Counter()
+        self._profile = cProfile.Profile()
+        self._stop = threading.Event()
+        self._thread_id = None
+        self._sampler = None
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._sample, name=f"profiler-job-{self.job_id}", daemon=True)
+        self._sampler.start()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profile.disable()
+        self._stop.set()
+        self._sampler.join()
+
+        try:
+            self.write()
+        except OSError as e:
+            logger.warning(f"Could not write profile for job {self.job_id}: {e}")
+            return False
+
+        # Set on the instance too so a later full job.save() keeps it.
+        self.job.profiled_at = timezone.now()
+        GenerationJob.objects.filter(id=self.job_id).update(profiled_at=self.job.profiled_at)
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self):
+        os.makedirs(settings.PROFILE_ROOT, exist_ok=True)
+        self._profile.dump_stats(self.paths["pstats"])
+
+        with open(self.paths["collapsed"], "w") as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f"{stack} {count}\n")
+
+        logger.info(f"Wrote profile for job {self.job_id} to {self.paths['pstats']}")
@@ -0,0 +1,171 @@
+import re
+import json
+import asyncio
+import logging
+from collections import defaultdict
+
+import redis.asyncio as aioredis
+from django.conf import settings
+
+from .job_state import CHANNEL_PREFIX, aget_job_state
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed", "deleted")
+WS_JOB_PATH = re.compile(r"^/ws/jobs/(?P<job_id>\d+)/$")
+
+# Seconds between attempts to re-establish a lost subscription.
+RECONNECT_DELAY = 1
+
+
+class JobStatusHub:
+    """
+    Per-process fan-out of job status messages.
+
+    One pattern subscription to jobs:* is shared by every WebSocket in the
+    process, so Redis connections scale with processes, not clients. After
+    every (re)subscribe each listener is sent its job's current state, so
+    transitions published while the subscription was down are not lost.
+    """
+
+    def __init__(self):
+        self.listeners = defaultdict(set)
+        self._reader = None
+        self._ready = asyncio.Event()
+
+    def subscribe(self, job_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        self.listeners[job_id].add(queue)
+        if self._reader is None or self._reader.done():
+            self._ready = asyncio.Event()
+            self._reader = asyncio.create_task(self._read())
+        return queue
+
+    def unsubscribe(self, job_id: int, queue: asyncio.Queue):
+        queues = self.listeners.get(job_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self.listeners[job_id]
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """
+        Wait until the subscription is up. False if it is not within timeout.
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def _forward(self, job_id: int, text: str):
+        for queue in self.listeners.get(job_id, ()):
+            queue.put_nowait(text)
+
+    async def _resync(self):
+        for job_id in list(self.listeners):
+            state = await aget_job_state(job_id) or {"id": job_id, "status": "deleted"}
+            self._forward(job_id, json.dumps(state))
+
+    async def _read(self):
+        while True:
+            client = aioredis.Redis.from_url(settings.REDIS_URL)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                self._ready.set()
+                await self._resync()
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    job_id = int(message["channel"].decode().removeprefix(CHANNEL_PREFIX))
+                    self._forward(job_id, message["data"].decode())
+            except Exception as e:
+                # Any failure (not just RedisError) must not leave listeners
+                # waiting on a dead reader.
+                logger.warning(f"Job status subscription lost, reconnecting: {type(e).__name__}: {e}")
+                await asyncio.sleep(RECONNECT_DELAY)
+            finally:
+                try:
+                    await pubsub.aclose()
+                    await client.aclose()
+                except Exception:
+                    pass
+
+
+hub = JobStatusHub()
+
+
+async def websocket_application(scope, receive, send):
+    """
+    ASGI WebSocket endpoint at /ws/jobs/<id>/.
+
+    Sends the job's current state (from the Redis state cache, or one DB read
+    on a miss), then forwards every published transition until the job
+    completes, fails or is deleted. Closes with 1011 if the Redis
+    subscription is not up within JOB_STATUS_SUBSCRIBE_TIMEOUT.
+    """
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+
+    match = WS_JOB_PATH.match(scope["path"])
+    if not match:
+        await send({"type": "websocket.close", "code": 4404})
+        return
+
+    job_id = int(match.group("job_id"))
+    queue = hub.subscribe(job_id)
+    pending = set()
+
+    try:
+        # Subscribe before reading the state so no transition can slip in between.
+        if not await hub.wait_ready(settings.JOB_STATUS_SUBSCRIBE_TIMEOUT):
+            logger.warning(f"Job status subscription not ready; closing WebSocket for job {job_id}")
+            await send({"type": "websocket.accept"})
+            await send({"type": "websocket.close", "code": 1011})
+            return
+
+        state = await aget_job_state(job_id)
+        if state is None:
+            await send({"type": "websocket.close", "code": 4404})
+            return
+
+        await send({"type": "websocket.accept"})
+        last_text = json.dumps(state)
+        await send({"type": "websocket.send", "text": last_text})
+        job_status = state["status"]
+
+        getter = asyncio.ensure_future(queue.get())
+        receiver = asyncio.ensure_future(receive())
+        pending = {getter, receiver}
+
+        while job_status not in TERMINAL_STATUSES:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            if receiver in done:
+                if receiver.result()["type"] == "websocket.disconnect":
+                    return
+                # Client messages are ignored.
+                pending.discard(receiver)
+                receiver = asyncio.ensure_future(receive())
+                pending.add(receiver)
+
+            if getter in done:
+                text = getter.result()
+                # A resync repeats the state the client already has; skip it.
+                if text != last_text:
+                    await send({"type": "websocket.send", "text": text})
+                    last_text = text
+                    job_status = json.loads(text)["status"]
+                pending.discard(getter)
+                getter = asyncio.ensure_future(queue.get())
+                pending.add(getter)
+
+        await send({"type": "websocket.close", "code": 1000})
+
+    finally:
+        for task in pending:
+            task.cancel()
+        hub.unsubscribe(job_id, queue)
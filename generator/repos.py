@@ -0,0 +1,116 @@
+import os
+import time
+import signal
+import subprocess
+from urllib.parse import urlsplit, urlunsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from git import Git, GitCommandError, Repo
+
+from .scratch import QuotaExceeded, directory_size
+
+# Hosts whose owner/repo paths are case-insensitive.
+CASE_INSENSITIVE_HOSTS = {"github.com", "gitlab.com", "bitbucket.org"}
+
+# How often a quota-limited clone checks its size on disk.
+CLONE_POLL_SECONDS = 0.5
+
+# Never wait on a credentials prompt (private or missing repositories).
+GIT_ENV = {"GIT_TERMINAL_PROMPT": "0"}
+
+
+def normalize_repo_url(repo_url: str) -> str:
+    """
+    Canonical form of a repository URL. The owner/repo casing is kept as
+    submitted (it names the README); compare and key with repo_key.
+    Example: git@github.com:User/Repo.git -> https://github.com/User/Repo
+    """
+    url = repo_url.strip()
+    if url.startswith("git@") and ":" in url:
+        host, path = url[len("git@"):].split(":", 1)
+        url = f"https://{host}/{path}"
+
+    parts = urlsplit(url)
+    if not parts.netloc:
+        return url.rstrip("/")
+
+    host = parts.netloc.lower()
+    path = parts.path.rstrip("/").removesuffix(".git").rstrip("/")
+    return urlunsplit((parts.scheme.lower() or "https", host, path, "", ""))
+
+
+def repo_key(repo_url: str) -> str:
+    """
+    Key under which a normalized repository URL's caches and snapshots are
+    stored, so spellings that differ only in case share them on hosts
+    where owner/repo is case-insensitive.
+    Example: https://github.com/User/Repo -> https://github.com/user/repo
+    """
+    parts = urlsplit(repo_url)
+    if parts.netloc in CASE_INSENSITIVE_HOSTS:
+        return urlunsplit(parts._replace(path=parts.path.lower()))
+    return repo_url
+
+
+def resolve_head(repo_url: str, timeout: float | None = None) -> str:
+    """
+    Resolve the commit the remote's HEAD points to, without cloning.
+    Raises GitCommandError if the remote cannot be reached or does not
+    answer within `timeout` (default REPO_RESOLVE_TIMEOUT) seconds.
+    """
+    timeout = timeout or settings.REPO_RESOLVE_TIMEOUT
+    command = [Git.GIT_PYTHON_GIT_EXECUTABLE or "git", "ls-remote", repo_url, "HEAD"]
+    # git hands the transfer to a git-remote-* helper that keeps the output
+    # pipe open, so killing git alone (GitPython's kill_after_timeout) still
+    # waits for the helper. Run it in its own process group and kill that.
+    proc = subprocess.Popen(
+        command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        env={**os.environ, **GIT_ENV}, start_new_session=True,
+    )
+    try:
+        output, error = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.communicate()
+        raise GitCommandError(command, -signal.SIGKILL, f"no answer within {timeout} seconds")
+    if proc.returncode:
+        raise GitCommandError(command, proc.returncode, error)
+    return output.split()[0] if output.strip() else ""
+
+
+def cached_resolve_head(repo_url: str, timeout: float | None = None) -> str:
+    """
+    resolve_head with a short-lived cache, so hot repositories skip the
+    network round-trip on the request path.
+    """
+    key = f"repo:head:{repo_key(repo_url)}"
+    commit_sha = cache.get(key)
+    if commit_sha is None:
+        commit_sha = resolve_head(repo_url, timeout)
+        cache.set(key, commit_sha, settings.REPO_HEAD_CACHE_TTL)
+    return commit_sha
+
+
+def clone_at(repo_url: str, commit_sha: str, dest: str, max_bytes: int | None = None) -> Repo:
+    """
+    Clone the repository into dest and check out commit_sha (if given).
+    With max_bytes, the clone is killed as soon as dest grows past it
+    (QuotaExceeded) instead of filling the scratch volume first.
+    """
+    if max_bytes is None:
+        repo = Repo.clone_from(repo_url, dest)
+    else:
+        process = Git().clone(repo_url, dest, as_process=True)
+        while process.proc.poll() is None:
+            if directory_size(dest) > max_bytes:
+                process.proc.kill()
+                process.proc.wait()
+                raise QuotaExceeded(f"Repository exceeds the {max_bytes} byte scratch quota")
+            time.sleep(CLONE_POLL_SECONDS)
+        process.wait()  # raises GitCommandError if the clone failed
+        repo = Repo(dest)
+
+    if commit_sha and repo.head.commit.hexsha != commit_sha:
+        repo.git.checkout(commit_sha)
+    return repo
@@ -0,0 +1,207 @@
+import os
+import gzip
+import json
+import logging
+import operator
+from datetime import datetime, timedelta
+from collections import Counter
+from functools import reduce
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import GenerationJob, RepoSnapshot
+from .profiling import profile_paths, profiled_attempts
+from .job_state import clear_job_states
+from .metrics import JOBS_PURGED, JOB_BYTES_PURGED, SNAPSHOTS_PURGED, SNAPSHOT_BYTES_PURGED
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveEncoder(DjangoJSONEncoder):
+    """
+    DjangoJSONEncoder, but with full-precision timestamps (it truncates
+    them to milliseconds), so archived rows keep their exact values.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def expired_jobs(now: datetime | None = None):
+    """
+    Jobs whose status has a retention age in JOB_RETENTION_DAYS and that
+    have not changed for longer than it.
+    """
+    now = now or timezone.now()
+    conditions = [
+        Q(status=status, updated_at__lt=now - timedelta(days=days))
+        for status, days in settings.JOB_RETENTION_DAYS.items()
+    ]
+    if not conditions:
+        return GenerationJob.objects.none()
+    return GenerationJob.objects.filter(reduce(operator.or_, conditions))
+
+
+def orphaned_snapshots(now: datetime | None = None):
+    """
+    Snapshots older than SNAPSHOT_RETENTION_DAYS that no job references,
+    e.g. once retention has purged every job that used them.
+    """
+    now = now or timezone.now()
+    return RepoSnapshot.objects.filter(
+        ~Exists(GenerationJob.objects.filter(snapshot=OuterRef("pk"))),
+        created_at__lt=now - timedelta(days=settings.SNAPSHOT_RETENTION_DAYS),
+    )
+
+
+def archive_path(now: datetime, first_id: int, last_id: int) -> str:
+    return os.path.join(
+        settings.JOB_ARCHIVE_ROOT, f"{now:%Y}", f"{now:%m}",
+        f"jobs-{now:%Y%m%dT%H%M%S}-{first_id}-{last_id}.jsonl.gz",
+    )
+
+
+def write_archive(path: str, lines: list[bytes]) -> int:
+    """
+    Write lines to a gzip file atomically and fsync it, so rows are only
+    deleted once their archive is on disk. Returns the compressed size.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+            f.writelines(lines)
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+def remove_profiles(job_ids: list[int]):
+    for job_id in job_ids:
+        for attempt in profiled_attempts(job_id):
+            for path in profile_paths(job_id, attempt).values():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+def purge_batch(now: datetime) -> dict | None:
+    """
+    Archive and delete up to JOB_RETENTION_BATCH_SIZE expired jobs in one
+    short transaction. Rows another transaction holds (e.g. a retry) are
+    skipped, not waited on. Returns None when nothing is left to purge.
+    """
+    with transaction.atomic():
+        rows = list(
+            expired_jobs(now)
+            .select_for_update(skip_locked=True)
+            .order_by("id")
+            .values()[:settings.JOB_RETENTION_BATCH_SIZE]
+        )
+        if not rows:
+            return None
+
+        lines = [(json.dumps(row, cls=ArchiveEncoder) + "\n").encode() for row in rows]
+        job_ids = [row["id"] for row in rows]
+        archived_bytes = 0
+        if settings.JOB_ARCHIVE_ROOT:
+            # If the delete below fails the file stays; a later run archives
+            # the rows again, so readers should de-duplicate by id.
+            archived_bytes = write_archive(archive_path(now, job_ids[0], job_ids[-1]), lines)
+        GenerationJob.objects.filter(id__in=job_ids).delete()
+
+    clear_job_states(job_ids)
+    remove_profiles([row["id"] for row in rows if row["profiled_at"]])
+
+    by_status = Counter(row["status"] for row in rows)
+    row_bytes = sum(len(line) for line in lines)
+    for status, count in by_status.items():
+        JOBS_PURGED.labels(status=status).inc(count)
+    JOB_BYTES_PURGED.inc(row_bytes)
+    return {"rows": len(rows), "bytes": row_bytes, "archived_bytes": archived_bytes, "by_status": by_status}
+
+
+def purge_snapshot_batch(now: datetime) -> dict | None:
+    """
+    Delete up to JOB_RETENTION_BATCH_SIZE orphaned snapshots in one short
+    transaction. They are not archived: a later job rebuilds any snapshot it
+    needs. Returns None when nothing is left to purge.
+    """
+    with transaction.atomic():
+        rows = list(
+            orphaned_snapshots(now)
+            .select_for_update(skip_locked=True)
+            .order_by("id")
+            .values("id", "analysis", "base_readme")[:settings.JOB_RETENTION_BATCH_SIZE]
+        )
+        if not rows:
+            return None
+        # Re-checked in the DELETE, so a snapshot a job picked up meanwhile stays.
+        deleted, _ = orphaned_snapshots(now).filter(id__in=[row["id"] for row in rows]).delete()
+
+    row_bytes = sum(len(json.dumps(row, cls=DjangoJSONEncoder)) for row in rows)
+    SNAPSHOTS_PURGED.inc(deleted)
+    SNAPSHOT_BYTES_PURGED.inc(row_bytes)
+    return {"rows": len(rows), "deleted": deleted, "bytes": row_bytes}
+
+
+def purge_expired() -> dict:
+    """
+    Apply the retention policy: archive expired jobs to gzip JSONL files
+    under JOB_ARCHIVE_ROOT (one file per batch) and delete them, at most
+    JOB_RETENTION_MAX_BATCHES batches per run.
+
+    Then delete the snapshots no remaining job references
+    (orphaned_snapshots), with the same batch size and limit.
+
+    Returns {"rows", "bytes", "archived_bytes", "files", "by_status",
+    "snapshots", "snapshot_bytes"}; bytes is the serialized size of the
+    deleted rows, a close estimate of what the tables give back once
+    vacuumed.
+    """
+    now = timezone.now()
+    totals = {
+        "rows": 0, "bytes": 0, "archived_bytes": 0, "files": 0, "by_status": Counter(),
+        "snapshots": 0, "snapshot_bytes": 0,
+    }
+
+    for _ in range(settings.JOB_RETENTION_MAX_BATCHES):
+        batch = purge_batch(now)
+        if batch is None:
+            break
+        totals["rows"] += batch["rows"]
+        totals["bytes"] += batch["bytes"]
+        totals["archived_bytes"] += batch["archived_bytes"]
+        totals["files"] += bool(batch["archived_bytes"])
+        totals["by_status"].update(batch["by_status"])
+        if batch["rows"] < settings.JOB_RETENTION_BATCH_SIZE:
+            break
+
+    for _ in range(settings.JOB_RETENTION_MAX_BATCHES):
+        batch = purge_snapshot_batch(now)
+        if batch is None:
+            break
+        totals["snapshots"] += batch["deleted"]
+        totals["snapshot_bytes"] += batch["bytes"]
+        if batch["rows"] < settings.JOB_RETENTION_BATCH_SIZE:
+            break
+
+    totals["by_status"] = dict(totals["by_status"])
+    if totals["rows"]:
+        logger.info(
+            f"Retention purged {totals['rows']} jobs {totals['by_status']}: {totals['bytes']} bytes of rows, "
+            f"{totals['archived_bytes']} bytes archived in {totals['files']} files"
+        )
+    if totals["snapshots"]:
+        logger.info(
+            f"Retention deleted {totals['snapshots']} unreferenced snapshots: {totals['snapshot_bytes']} bytes of rows"
+        )
+    return totals
@@ -0,0 +1,217 @@
+import json
+import heapq
+import hashlib
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, DurationField, ExpressionWrapper, F, Min
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from .models import GenerationJob
+from .job_state import sync_job_states
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("pending", "processing")
+
+# Queue snapshot (see refresh_queue_snapshot): rebuilt at most this often per
+# lane, and dropped if dispatch stops running.
+QUEUE_SNAPSHOT_INTERVAL = 2
+QUEUE_SNAPSHOT_TTL = 300
+
+
+def queue_keys(lane: str) -> tuple[str, str]:
+    return f"queue:{lane}:ranks", f"queue:{lane}:counts"
+
+
+def client_id_for(request) -> str:
+    """
+    Fairness key for a request: the API key if one is sent (hashed, never
+    stored in clear), otherwise the client IP.
+    """
+    api_key = request.headers.get("X-API-Key")
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:32]
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def lane_queue(lane: str) -> str:
+    return settings.JOB_LANES[lane]["queue"]
+
+
+def dispatch_lane(lane: str) -> int:
+    """
+    Hand waiting jobs in a lane to Celery, up to the lane's capacity.
+
+    Each lane has its own Celery queue and a cap on jobs dispatched but not
+    finished; the caps set the weighted share of workers each lane gets.
+    Within a lane, the next slot goes to the client with the fewest jobs in
+    flight (ties: oldest waiting job), so one client bulk-submitting cannot
+    starve the others. Returns the number of jobs dispatched.
+
+    Never waits for the lane lock: if another process is dispatching the
+    lane, this call returns 0 at once (it runs inline in requests and at the
+    end of every task) and dispatch_pending_jobs catches up.
+    """
+    try:
+        lock = cache.lock(f"dispatch:{lane}", timeout=30)
+    except AttributeError:
+        lock = None  # non-Redis cache backends (tests, local dev)
+
+    if lock is not None and not lock.acquire(blocking=False):
+        return 0
+
+    try:
+        dispatched = _dispatch(lane)
+        refresh_queue_snapshot(lane)
+        return dispatched
+
+    finally:
+        if lock is not None:
+            lock.release()
+
+
+def _dispatch(lane: str) -> int:
+    from .tasks import process_repo_task
+
+    in_flight = GenerationJob.objects.filter(
+        priority=lane, status__in=ACTIVE_STATUSES, dispatched_at__isnull=False
+    )
+    free = settings.JOB_LANES[lane]["capacity"] - in_flight.count()
+    if free <= 0:
+        return 0
+
+    running = Counter(in_flight.values_list("client_id", flat=True))
+    waiting = GenerationJob.objects.filter(priority=lane, status="pending", dispatched_at__isnull=True)
+
+    heap = [
+        (running[row["client_id"]], row["oldest"], row["client_id"])
+        for row in waiting.values("client_id").annotate(oldest=Min("created_at"))
+    ]
+    heapq.heapify(heap)
+    backlog = {}
+    dispatched = []
+
+    while heap and len(dispatched) < free:
+        in_flight_count, oldest, client = heapq.heappop(heap)
+        if client not in backlog:
+            backlog[client] = list(
+                waiting.filter(client_id=client).order_by("created_at", "id").values_list("id", "created_at")[:free]
+            )
+        if not backlog[client]:
+            continue
+
+        job_id, _ = backlog[client].pop(0)
+        claimed = GenerationJob.objects.filter(id=job_id, status="pending", dispatched_at__isnull=True).update(
+            dispatched_at=timezone.now()
+        )
+        if claimed:
+            process_repo_task.apply_async((job_id,), queue=lane_queue(lane))
+            dispatched.append(job_id)
+            in_flight_count += 1
+
+        if backlog[client]:
+            heapq.heappush(heap, (in_flight_count, backlog[client][0][1], client))
+
+    # Status polls read dispatched_at from the cached state (queue_estimate).
+    sync_job_states(dispatched, progress="queued")
+    if dispatched:
+        logger.info(f"Dispatched {len(dispatched)} {lane} jobs.")
+    return len(dispatched)
+
+
+def dispatch_all() -> int:
+    return sum(dispatch_lane(lane) for lane in settings.JOB_LANES)
+
+
+def average_job_seconds(lane: str) -> float:
+    """
+    Mean run time of recent completed jobs in the lane (cached briefly).
+    """
+    key = f"lane:avg-seconds:{lane}"
+    average = cache.get(key)
+    if average is None:
+        recent = (
+            GenerationJob.objects.filter(priority=lane, status="completed", started_at__isnull=False)
+            .order_by("-finished_at")
+            .values_list("id", flat=True)[:50]
+        )
+        average = GenerationJob.objects.filter(id__in=list(recent)).aggregate(
+            avg=Avg(ExpressionWrapper(F("finished_at") - F("started_at"), output_field=DurationField()))
+        )["avg"]
+        average = average.total_seconds() if average else settings.JOB_DEFAULT_SECONDS
+        cache.set(key, average, 60)
+    return average
+
+
+def refresh_queue_snapshot(lane: str):
+    """
+    Store each waiting job's rank among its client's waiting jobs, and every
+    client's waiting count, in Redis for queue_estimate. Runs after each
+    dispatch (at most every QUEUE_SNAPSHOT_INTERVAL seconds per lane), so
+    status polls never query the database for their estimate.
+    """
+    if not cache.add(f"queue:{lane}:fresh", 1, QUEUE_SNAPSHOT_INTERVAL):
+        return
+
+    waiting = GenerationJob.objects.filter(priority=lane, status="pending", dispatched_at__isnull=True)
+    ranks, counts = {}, Counter()
+    for client, job_id in waiting.order_by("client_id", "created_at", "id").values_list("client_id", "id").iterator():
+        ranks[job_id] = counts[client]
+        counts[client] += 1
+
+    ranks_key, counts_key = queue_keys(lane)
+    try:
+        pipe = get_redis_connection("default").pipeline(transaction=True)
+        pipe.delete(ranks_key)
+        if ranks:
+            pipe.hset(ranks_key, mapping=ranks)
+            pipe.expire(ranks_key, QUEUE_SNAPSHOT_TTL)
+        pipe.set(counts_key, json.dumps(sorted(counts.values())), ex=QUEUE_SNAPSHOT_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not store the {lane} queue snapshot: {e}")
+
+
+def queue_position(rank: int | None, counts: list[int]) -> int:
+    """
+    Position under the fair-share dispatch order: before a job with rank
+    jobs of its own client ahead of it gets its turn, every client gets up
+    to rank + 1 turns. A job newer than the snapshot (rank None) is taken
+    to be its client's only waiting job.
+    """
+    if rank is None:
+        return len(counts) + 1
+    return sum(min(count, rank + 1) for count in counts)
+
+
+def queue_estimate(state: dict) -> dict:
+    """
+    Position and estimated wait for a pending job, read from the queue
+    snapshot in Redis (one round trip, no SQL). Empty if Redis is
+    unavailable.
+    """
+    lane = state["priority"]
+    capacity = settings.JOB_LANES[lane]["capacity"]
+
+    if state.get("dispatched_at"):
+        return {"queue_position": 0, "estimated_wait_seconds": 0}
+
+    ranks_key, counts_key = queue_keys(lane)
+    try:
+        pipe = get_redis_connection("default").pipeline(transaction=False)
+        pipe.hget(ranks_key, state["id"])
+        pipe.get(counts_key)
+        rank, counts = pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not read the {lane} queue snapshot: {e}")
+        return {}
+
+    position = queue_position(int(rank) if rank is not None else None, json.loads(counts) if counts else [])
+
+    # Slots free up at roughly capacity jobs per average job duration.
+    estimated_wait = round(position / capacity * average_job_seconds(lane), 1)
+    return {"queue_position": position, "estimated_wait_seconds": estimated_wait}
@@ -0,0 +1,189 @@
+import os
+import time
+import uuid
+import fcntl
+import queue
+import shutil
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = "jobs"
+TRASH_DIR = ".trash"
+LOCK_FILE = ".lock"
+
+_reaper = None
+_reap_queue = queue.Queue()
+
+
+class ScratchFull(Exception):
+    """The scratch volume has no room for another job right now; retry later."""
+
+
+class QuotaExceeded(Exception):
+    """A job's checkout grew past SCRATCH_JOB_QUOTA_BYTES."""
+
+
+def _path(*parts) -> str:
+    return os.path.join(settings.SCRATCH_ROOT, *parts)
+
+
+def _ensure_layout():
+    os.makedirs(_path(JOBS_DIR), exist_ok=True)
+    os.makedirs(_path(TRASH_DIR), exist_ok=True)
+
+
+# Hostnames (e.g. Kubernetes pod names) contain dashes but never "~".
+NAME_SEPARATOR = "~"
+
+
+def _dir_name(job_id: int) -> str:
+    # Host and pid let the sweep tell live directories from orphans.
+    return NAME_SEPARATOR.join((f"job{job_id}", socket.gethostname(), str(os.getpid()), uuid.uuid4().hex[:8]))
+
+
+@contextmanager
+def _root_lock():
+    """
+    Serialize reservations across every process sharing SCRATCH_ROOT.
+    """
+    with open(_path(LOCK_FILE), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def allocate(job_id: int) -> str:
+    """
+    Create a scratch directory for the job if the SCRATCH_TOTAL_QUOTA_BYTES
+    budget, counted by what live directories actually use, has room for one
+    more job of SCRATCH_JOB_QUOTA_BYTES. Archive fetches write little, so
+    worker concurrency rather than the budget limits how many run at once.
+    Clones admitted together can still outgrow the budget between them;
+    each is capped at the job quota, and the volume's free space is checked.
+    Raises ScratchFull if the budget or the volume has no room.
+    """
+    _ensure_layout()
+    job_quota = settings.SCRATCH_JOB_QUOTA_BYTES
+
+    with _root_lock():
+        used = directory_size(_path(JOBS_DIR))
+        if used + job_quota > settings.SCRATCH_TOTAL_QUOTA_BYTES:
+            raise ScratchFull(f"Scratch space in use: {used} of {settings.SCRATCH_TOTAL_QUOTA_BYTES} bytes")
+        if shutil.disk_usage(settings.SCRATCH_ROOT).free < job_quota:
+            raise ScratchFull(f"Scratch volume {settings.SCRATCH_ROOT} has less than {job_quota} bytes free")
+
+        path = _path(JOBS_DIR, _dir_name(job_id))
+        os.mkdir(path)
+    return path
+
+
+def release(path: str):
+    """
+    Give a scratch directory back. The directory is renamed into the trash
+    (instant, frees its space in the budget) and deleted by a background thread, so
+    the worker slot never waits on rmtree.
+    """
+    trash_path = _path(TRASH_DIR, os.path.basename(path))
+    try:
+        os.rename(path, trash_path)
+    except FileNotFoundError:
+        return
+    _reap_queue.put(trash_path)
+    _start_reaper()
+
+
+@contextmanager
+def scratch_dir(job_id: int):
+    path = allocate(job_id)
+    try:
+        yield path
+    finally:
+        release(path)
+
+
+def _start_reaper():
+    global _reaper
+    # Threads do not survive fork; a prefork child starts its own.
+    if _reaper is None or not _reaper.is_alive():
+        _reaper = threading.Thread(target=_reap, name="scratch-reaper", daemon=True)
+        _reaper.start()
+
+
+def _reap():
+    while True:
+        path = _reap_queue.get()
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _owner(name: str) -> tuple[str, int] | None:
+    """
+    (host, pid) of the process that allocated a scratch directory, or None
+    if the name is not one _dir_name produced.
+    """
+    try:
+        _, host, pid, _ = name.split(NAME_SEPARATOR)
+        return host, int(pid)
+    except ValueError:
+        return None
+
+
+def _is_orphan(name: str, now: float) -> bool:
+    host, pid = _owner(name) or ("", 0)
+    if host == socket.gethostname() and pid != os.getpid():
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+
+    # Another host's directory, a reused pid or an unknown name: orphaned
+    # once it outlives any job.
+    try:
+        age = now - os.stat(_path(JOBS_DIR, name)).st_mtime
+    except FileNotFoundError:
+        return False
+    return age > settings.SCRATCH_ORPHAN_SECONDS
+
+
+def sweep_orphans() -> int:
+    """
+    Trash scratch directories left by workers that died (SIGKILL, OOM) and
+    anything still in the trash. Runs when a worker starts, whenever a pool
+    process is (re)started, and periodically (generator.tasks.sweep_scratch).
+    """
+    _ensure_layout()
+    now = time.time()
+    swept = 0
+
+    for name in os.listdir(_path(JOBS_DIR)):
+        if _is_orphan(name, now):
+            release(_path(JOBS_DIR, name))
+            swept += 1
+
+    for name in os.listdir(_path(TRASH_DIR)):
+        _reap_queue.put(_path(TRASH_DIR, name))
+    _start_reaper()
+
+    if swept:
+        logger.warning(f"Swept {swept} orphaned scratch directories from {settings.SCRATCH_ROOT}")
+    return swept
@@ -1,7 +1,44 @@
+from django.urls import reverse
 from rest_framework import serializers
 from .models import GenerationJob
 
+# Scheduling and lease bookkeeping: who submitted the job (client IP or API key
+# hash) and which worker host/pid holds it. Never returned by the API.
+INTERNAL_FIELDS = ['client_id', 'claimed_by', 'lease_expires_at', 'attempts']
+
+
 class GenerationJobSerializer(serializers.ModelSerializer):
+    queue_seconds = serializers.FloatField(read_only=True)
+    total_seconds = serializers.FloatField(read_only=True)
+    profile_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GenerationJob
+        exclude = INTERNAL_FIELDS
+
+    def get_profile_url(self, obj) -> str | None:
+        if not obj.profiled_at:
+            return None
+        return reverse("job-profile", args=[obj.id])
+
+
+class JobStateSerializer(GenerationJobSerializer):
+    """
+    Job status without the README body; this is what is cached and pushed.
+    """
+
+    class Meta(GenerationJobSerializer.Meta):
+        exclude = INTERNAL_FIELDS + ['result']
+
+
+class SlowJobSerializer(serializers.ModelSerializer):
+    queue_seconds = serializers.FloatField(read_only=True)
+    total_seconds = serializers.FloatField(read_only=True)
+
     class Meta:
         model = GenerationJob
-        fields = '__all__'
+        fields = [
+            'id', 'repo_url', 'status', 'created_at', 'started_at', 'finished_at',
+            'queue_seconds', 'total_seconds', 'stage_timings', 'files_count',
+            'bytes_fetched', 'prompt_tokens', 'response_tokens', 'cache_hit',
+        ]
@@ -1,15 +1,29 @@
 import os
-import shutil
-import tempfile
+import uuid
+import socket
 import logging
+from datetime import timedelta
+from contextlib import nullcontext
 from celery import shared_task
 from celery.utils.log import get_task_logger
-from git import Repo, GitCommandError
+from git import GitCommandError
+from django.conf import settings
+from django.utils import timezone
 
-from generator.models import GenerationJob
-from analysis.utils import analyze_repo
-from readme.utils import generate_readme_markdown_with_llm
+from generator.models import GenerationJob, RepoSnapshot
+from generator.repos import resolve_head, repo_key
+from generator.fetchers import fetch_repo
+from generator.scratch import scratch_dir, sweep_orphans, ScratchFull, QuotaExceeded
+from generator import popularity, retention
+from generator.scheduling import dispatch_lane, dispatch_all, lane_queue
+from analysis.utils import analyze_repo, list_repo_files
+from readme.utils import generate_readme_markdown, generate_readme_markdown_with_llm
 from readme.exceptions import LLMGenerationError
+from readme.summarize import summarize_sources, is_candidate
+from readme.cache import make_repo_cache_key, get_cached_readme, set_cached_readme
+from generator.metrics import track_stage, JOBS_IN_FLIGHT, TASK_RETRIES
+from generator.profiling import JobProfiler
+from generator.job_state import sync_job_state, sync_job_states
 
 logger = get_task_logger(__name__)
 
@@ -22,86 +36,465 @@ def extract_repo_name(repo_url: str) -> str:
     return repo_url.rstrip("/").split("/")[-1]
 
 
+class LeaseLost(Exception):
+    """Raised when another worker reclaimed the job while this one was running."""
+
+
+# Per-job measurements written together with the terminal transition.
+JOB_STATS_FIELDS = (
+    "stage_timings",
+    "files_count",
+    "bytes_fetched",
+    "cache_hit",
+    "prompt_tokens",
+    "response_tokens",
+    "llm_model",
+    "llm_escalations",
+)
+
+
+def worker_token() -> str:
+    """
+    Identify one execution of the task. Unique per attempt, so a duplicate
+    delivery of the same message never shares a lease with the original.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+
+
+def renew_lease(job: GenerationJob):
+    if not job.heartbeat(settings.JOB_LEASE_SECONDS):
+        raise LeaseLost(f"Lease on job {job.id} was lost")
+
+
+def job_stats(job: GenerationJob) -> dict:
+    return {name: getattr(job, name) for name in JOB_STATS_FIELDS}
+
+
+def fail_job(job: GenerationJob, message: str):
+    if job.transition(
+        "failed",
+        expected="processing",
+        owned=True,
+        result=message,
+        finished_at=timezone.now(),
+        lease_expires_at=None,
+        **job_stats(job),
+    ):
+        sync_job_state(job)
+
+
+def fail_exhausted(job_id: int) -> bool:
+    """
+    Fail a pending job that claim() refused because it has used up
+    JOB_MAX_ATTEMPTS, so it does not wait in its lane forever.
+    """
+    job = GenerationJob.objects.defer("result").filter(
+        id=job_id, status="pending", attempts__gte=settings.JOB_MAX_ATTEMPTS
+    ).first()
+    if job is None or not job.transition(
+        "failed", expected="pending", result=f"Job was attempted {job.attempts} times; giving up.", finished_at=timezone.now()
+    ):
+        return False
+    logger.error(f"Job {job_id} failed after {job.attempts} attempts.")
+    sync_job_state(job)
+    return True
+
+
+def load_or_build_snapshot(job: GenerationJob) -> RepoSnapshot:
+    """
+    Return the clone + analysis + render checkpoint for the job:
+    - resume from the job's own checkpoint (retries, Git backoff retries),
+    - otherwise reuse a snapshot of the same commit made by another job,
+    - otherwise build one and checkpoint it on the job.
+    Deep jobs only use snapshots that include source summaries.
+    """
+    if job.snapshot_id:
+        snapshot = RepoSnapshot.objects.filter(id=job.snapshot_id).first()
+        if snapshot and snapshot_covers(snapshot, job):
+            logger.info(f"Job {job.id} resuming from snapshot {snapshot}.")
+            return snapshot
+
+    with track_stage("resolve", job.stage_timings):
+        commit_sha = resolve_head(job.repo_url)
+
+    snapshot = RepoSnapshot.objects.filter(repo_url=repo_key(job.repo_url), commit_sha=commit_sha).first()
+    if snapshot and snapshot_covers(snapshot, job):
+        logger.info(f"Job {job.id} reusing snapshot {snapshot}.")
+    else:
+        snapshot = build_snapshot(job, commit_sha)
+
+    if not job.checkpoint(
+        snapshot=snapshot,
+        commit_sha=commit_sha,
+        files_count=snapshot.files_count,
+        bytes_fetched=snapshot.bytes_fetched,
+    ):
+        raise LeaseLost(f"Lease on job {job.id} was lost before checkpointing")
+    return snapshot
+
+
+# Analysis keys only deep jobs produce and use.
+DEEP_KEYS = ("source_summaries", "summaries_missing")
+
+
+def snapshot_covers(snapshot: RepoSnapshot, job: GenerationJob) -> bool:
+    """
+    Whether the snapshot has everything the job needs. For deep jobs that
+    means complete source summaries: a snapshot whose summaries partly
+    failed is rebuilt, re-sending only the files that are still missing.
+    """
+    if not job.deep:
+        return True
+    return "source_summaries" in snapshot.analysis and not snapshot.analysis.get("summaries_missing")
+
+
+def prompt_analysis(snapshot: RepoSnapshot, job: GenerationJob) -> dict:
+    """
+    The snapshot's analysis as this job's prompt should see it: named after
+    the job's own URL (snapshots are shared by spellings that differ in
+    case), and without summaries a deep job may have added unless this job
+    is deep too.
+    """
+    analysis = {
+        key: value for key, value in snapshot.analysis.items()
+        if job.deep or key not in DEEP_KEYS
+    }
+    analysis["project_name"] = extract_repo_name(job.repo_url)
+    return analysis
+
+
+def base_readme_for(snapshot: RepoSnapshot, analysis: dict) -> str:
+    if snapshot.analysis.get("project_name") == analysis["project_name"]:
+        return snapshot.base_readme
+    return generate_readme_markdown(analysis)
+
+
+def build_snapshot(job: GenerationJob, commit_sha: str) -> RepoSnapshot:
+    with scratch_dir(job.id) as work_dir:
+        sync_job_state(job, progress="cloning")
+        logger.info(f"Fetching repo {job.repo_url}@{commit_sha} into {work_dir}")
+        with track_stage("clone", job.stage_timings):
+            fetched = fetch_repo(
+                job.repo_url,
+                commit_sha,
+                work_dir,
+                max_bytes=settings.SCRATCH_JOB_QUOTA_BYTES,
+                extract=is_candidate if job.deep else None,
+            )
+        logger.info(f"Fetched {fetched['files']} files ({fetched['bytes']} bytes) by {fetched['mode']}")
+
+        renew_lease(job)
+        sync_job_state(job, progress="analyzing")
+
+        with track_stage("analysis", job.stage_timings):
+            analysis_data = analyze_repo(work_dir, file_paths=fetched["paths"])
+        analysis_data["project_name"] = extract_repo_name(job.repo_url)
+
+        with track_stage("render", job.stage_timings):
+            base_readme = generate_readme_markdown(analysis_data)
+
+        if job.deep:
+            renew_lease(job)
+            sync_job_state(job, progress="summarizing")
+            with track_stage("summarize", job.stage_timings):
+                summarized = summarize_sources(
+                    work_dir,
+                    fetched["paths"] or list_repo_files(work_dir),
+                    request_id=f"job-{job.id}",
+                )
+            analysis_data["source_summaries"] = summarized["summaries"]
+            if summarized["missing"]:
+                analysis_data["summaries_missing"] = summarized["missing"]
+
+    snapshot, created = RepoSnapshot.objects.get_or_create(
+        repo_url=repo_key(job.repo_url),
+        commit_sha=commit_sha,
+        defaults={
+            "analysis": analysis_data,
+            "base_readme": base_readme,
+            "files_count": fetched["files"],
+            "bytes_fetched": fetched["bytes"],
+        },
+    )
+    if not created and not snapshot_covers(snapshot, job):
+        # Add the summaries to the snapshot a normal job (or a deep job whose
+        # summaries partly failed) built earlier.
+        snapshot.analysis = analysis_data
+        snapshot.save(update_fields=["analysis"])
+    return snapshot
+
+
 @shared_task(bind=True, max_retries=5, soft_time_limit=300)
 def process_repo_task(self, job_id: int):
     """
     Process a README generation job with retries, caching, and idempotency.
 
     Steps:
-    1. Skip if job is already 'processing' or 'completed'.
-    2. Clone the repo into a temporary directory.
-    3. Analyze the repository structure and dependencies.
+    1. Atomically claim the job (pending, or processing with an expired lease).
+       Skip if another worker holds it or it is already finished.
+    2. Resolve HEAD and fetch the repo into a temporary directory (archive
+       stream with only manifests extracted, or a git clone as fallback).
+    3. Analyze the repository structure and dependencies, render the base README
+       (deep jobs: also summarize high-signal source files) and checkpoint them
+       as a RepoSnapshot. Retries resume from the checkpoint.
     4. Generate a README using local generator + Gemini LLM.
-    5. Save result to job and mark as 'completed'.
-    6. Retry Git errors with exponential backoff.
-    7. Fail gracefully on other errors.
+       Steps 2-4 run under JobProfiler when the job was submitted with profile=true.
+       The lease is renewed between stages.
+    5. Save result and timing breakdown to job and mark as 'completed'.
+    6. Retry Git errors with exponential backoff, releasing the claim
+       meanwhile. A full scratch volume requeues the job after
+       SCRATCH_FULL_RETRY_SECONDS without counting a retry or an attempt.
+    7. Fail repositories over the scratch quota, and gracefully on other errors.
+
+    Every state change is a conditional UPDATE of only the changed columns.
     """
 
-    tmp_dir = None
+    job = GenerationJob.claim(
+        job_id, worker=worker_token(), lease_seconds=settings.JOB_LEASE_SECONDS, max_attempts=settings.JOB_MAX_ATTEMPTS
+    )
+    if job is None:
+        if not fail_exhausted(job_id):
+            logger.info(f"Job {job_id} does not exist or is not claimable, skipping.")
+        return
+
+    sync_job_state(job, progress="resolving")
+    JOBS_IN_FLIGHT.inc()
+    logger.info(f"Job {job_id} claimed by {job.claimed_by} (attempt {job.attempts}).")
 
     try:
-        job = GenerationJob.objects.get(id=job_id)
+        profiler = JobProfiler(job) if job.profile else nullcontext()
+        with profiler:
+            snapshot = load_or_build_snapshot(job)
+
+            renew_lease(job)
+            sync_job_state(job, progress="generating")
+            llm_stats = {"timings": job.stage_timings}
+            analysis = prompt_analysis(snapshot, job)
+            try:
+                readme_md = generate_readme_markdown_with_llm(
+                    analysis,
+                    repo_url=job.repo_url,
+                    stats=llm_stats,
+                    base_readme=base_readme_for(snapshot, analysis),
+                    files_count=snapshot.files_count,
+                )
+            except LLMGenerationError as e:
+                llm_error = e
+            else:
+                llm_error = None
 
-        if job.status in ("processing", "completed"):
-            logger.info(f"Job {job_id} already {job.status}, skipping.")
+        job.cache_hit = llm_stats.get("cache_hit")
+        job.prompt_tokens = llm_stats.get("prompt_tokens")
+        job.response_tokens = llm_stats.get("response_tokens")
+        job.llm_model = llm_stats.get("model", "")
+        job.llm_escalations = llm_stats.get("escalations")
+
+        if llm_error:
+            logger.error(f"LLM generation failed for job {job_id}: {llm_error}")
+            fail_job(job, f"LLM generation failed: {str(llm_error)}")
             return
 
-    
-        job.status = "processing"
-        job.save()
-        logger.info(f"Job {job_id} marked as processing.")
+        # Persist timing is only observed in metrics; it ends after the row is written.
+        with track_stage("persist"):
+            completed = job.transition(
+                "completed",
+                expected="processing",
+                owned=True,
+                result=readme_md,
+                finished_at=timezone.now(),
+                lease_expires_at=None,
+                **job_stats(job),
+            )
+        if not completed:
+            raise LeaseLost(f"Lease on job {job_id} was lost before completion")
+        sync_job_state(job)
+        # A README written from partial summaries is not cached under the deep
+        # key; the next deep job rebuilds the summaries instead.
+        if job.commit_sha and snapshot_covers(snapshot, job):
+            set_cached_readme(
+                make_repo_cache_key(job.repo_url, job.commit_sha, deep=job.deep),
+                readme_md,
+                settings.REPO_README_CACHE_TTL,
+            )
+        logger.info(f"Job {job_id} completed successfully.")
 
-       
-        tmp_dir = tempfile.mkdtemp()
-        logger.info(f"Cloning repo {job.repo_url} into {tmp_dir}")
-        Repo.clone_from(job.repo_url, tmp_dir)
+    except LeaseLost as e:
+        logger.warning(f"{e}; leaving the job to its new owner.")
 
-      
-        repo_name = extract_repo_name(job.repo_url)
-        analysis_data = analyze_repo(tmp_dir)
-        analysis_data["project_name"] = repo_name
+    except QuotaExceeded as e:
+        logger.warning(f"Job {job_id} aborted: {e}")
+        fail_job(job, str(e))
 
-        try:
-            readme_md = generate_readme_markdown_with_llm(
-                analysis_data,
-                repo_url=job.repo_url
+    except ScratchFull as e:
+        # Busy host, not a broken job: requeue it without spending an attempt
+        # or a Celery retry. It keeps its lane slot (dispatched_at restarts the
+        # undelivered-dispatch timeout) and waits as long as it takes.
+        logger.warning(f"No scratch space for job {job_id}, requeueing in {settings.SCRATCH_FULL_RETRY_SECONDS}s: {e}")
+        if job.transition(
+            "pending",
+            expected="processing",
+            owned=True,
+            claimed_by="",
+            lease_expires_at=None,
+            attempts=job.attempts - 1,
+            dispatched_at=timezone.now(),
+        ):
+            sync_job_state(job, progress="retrying")
+            TASK_RETRIES.labels(reason="scratch_full").inc()
+            process_repo_task.apply_async(
+                (job_id,), queue=lane_queue(job.priority), countdown=settings.SCRATCH_FULL_RETRY_SECONDS
             )
-        except LLMGenerationError as e:
-            logger.error(f"LLM generation failed for job {job_id}: {e}")
-            job.status = "failed"
-            job.result = f"LLM generation failed: {str(e)}"
-            job.save()
-            return
-
-   
-        job.result = readme_md
-        job.status = "completed"
-        job.save()
-        logger.info(f"Job {job_id} completed successfully.")
 
     except GitCommandError as e:
         logger.warning(f"Git error for job {job_id}: {e}")
-        try:
-            countdown = 2 ** self.request.retries
-            self.retry(exc=e, countdown=countdown)
-        except self.MaxRetriesExceededError:
-            job.status = "failed"
-            job.result = f"Git error after max retries: {str(e)}"
-            job.save()
+        if self.request.retries >= self.max_retries or job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            fail_job(job, f"Git error after max retries: {str(e)}")
             logger.error(f"Job {job_id} failed after max retries.")
+            return
 
-    except GenerationJob.DoesNotExist:
-        logger.error(f"Job {job_id} does not exist.")
+        # Release the claim so the retried delivery can claim it again. The
+        # retry is already on its way: restart the undelivered-dispatch clock.
+        if job.transition(
+            "pending", expected="processing", owned=True, claimed_by="", lease_expires_at=None, dispatched_at=timezone.now()
+        ):
+            sync_job_state(job, progress="retrying")
+        countdown = 2 ** self.request.retries
+        TASK_RETRIES.labels(reason="git").inc()
+        raise self.retry(exc=e, countdown=countdown)
 
     except Exception as e:
         logger.exception(f"Unexpected error processing job {job_id}: {e}")
-        if 'job' in locals():
-            job.status = "failed"
-            job.result = str(e)
-            job.save()
+        fail_job(job, str(e))
 
     finally:
-   
-        if tmp_dir and os.path.exists(tmp_dir):
-            shutil.rmtree(tmp_dir)
-            logger.info(f"Cleaned up temporary directory {tmp_dir}")
+        JOBS_IN_FLIGHT.dec()
+        # This job's lane slot may have freed up.
+        dispatch_lane(job.priority)
+
+
+@shared_task
+def reclaim_stale_jobs():
+    """
+    Periodic task: recover jobs left 'processing' by workers that died
+    (their lease expired without a heartbeat). Each is reset to 'pending' and
+    re-dispatched, or failed once it has used up JOB_MAX_ATTEMPTS.
+
+    Pending jobs dispatched more than JOB_DISPATCH_TIMEOUT seconds ago but
+    never claimed (their Celery message was lost) are handed back to the
+    scheduler too; otherwise they hold lane capacity forever. If the old
+    message is delivered after all, claim() lets only one copy run.
+    """
+    # owned=True makes each reset conditional on the dead worker still holding
+    # the claim, so a job reclaimed by a live worker in the meantime is untouched.
+    now = timezone.now()
+    stale = GenerationJob.objects.filter(status="processing", lease_expires_at__lt=now)
+    reclaimed = failed = 0
+
+    for job in stale.defer("result").iterator():
+        if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            ok = job.transition(
+                "failed",
+                expected="processing",
+                owned=True,
+                lease_expires_at=None,
+                finished_at=now,
+                result=f"Worker lost the job {job.attempts} times; giving up.",
+            )
+            failed += ok
+        else:
+            ok = job.transition(
+                "pending", expected="processing", owned=True, claimed_by="", lease_expires_at=None, dispatched_at=None
+            )
+            reclaimed += ok
+
+        if ok:
+            sync_job_state(job, progress=None if job.status == "failed" else "queued")
+
+    lost = GenerationJob.objects.filter(
+        status="pending", dispatched_at__lt=now - timedelta(seconds=settings.JOB_DISPATCH_TIMEOUT)
+    )
+    lost_ids = list(lost.values_list("id", flat=True))
+    undelivered = lost.filter(id__in=lost_ids).update(dispatched_at=None, updated_at=now)
+    sync_job_states(lost_ids, progress="queued")
+
+    if reclaimed or failed or undelivered:
+        logger.warning(f"Reclaimed {reclaimed} stale jobs, failed {failed}, redispatching {undelivered} undelivered.")
+        dispatch_all()
+    return {"reclaimed": reclaimed, "failed": failed, "undelivered": undelivered}
+
+
+def enqueue_refresh(repo_url: str, commit_sha: str, reason: str) -> GenerationJob | None:
+    """
+    Queue a warmup-lane regeneration of repo_url at commit_sha unless its
+    README is already cached or a job for the repo is already in flight.
+    """
+    if get_cached_readme(make_repo_cache_key(repo_url, commit_sha)):
+        return None
+    if GenerationJob.objects.filter(repo_url__iexact=repo_url, status__in=("pending", "processing")).exists():
+        return None
+
+    job = GenerationJob.objects.create(repo_url=repo_url, priority="warmup", client_id=f"system:{reason}")
+    sync_job_state(job, progress="queued")
+    dispatch_lane("warmup")
+    logger.info(f"Queued {reason} refresh job {job.id} for {repo_url}@{commit_sha[:12]}")
+    return job
+
+
+@shared_task
+def warm_popular_repos():
+    """
+    Periodic task: regenerate the top-N most requested repositories whose
+    HEAD has moved since their README was cached. Repositories whose last
+    job failed are skipped: warming would most likely fail again.
+    """
+    popularity.rescale()
+    queued = 0
+
+    for key in popularity.top_repos(settings.WARMUP_TOP_N):
+        last_job = (
+            GenerationJob.objects.filter(repo_url__iexact=key).only("repo_url", "status").order_by("-created_at").first()
+        )
+        if last_job and last_job.status == "failed":
+            logger.info(f"Not warming {key}: its last job failed.")
+            continue
+        # Regenerate under the spelling users asked for; the key is lowercased.
+        repo_url = last_job.repo_url if last_job else key
+
+        try:
+            commit_sha = resolve_head(repo_url)
+        except GitCommandError as e:
+            logger.warning(f"Could not resolve HEAD for {repo_url}: {e}")
+            continue
+
+        if commit_sha and enqueue_refresh(repo_url, commit_sha, reason="warmup"):
+            queued += 1
+
+    logger.info(f"Cache warming queued {queued} jobs.")
+    return {"queued": queued}
+
+
+@shared_task
+def dispatch_pending_jobs():
+    """
+    Periodic safety net for the scheduler: fill any free lane capacity.
+    Dispatch also runs on job creation and whenever a job finishes.
+    """
+    return {"dispatched": dispatch_all()}
+
+
+@shared_task
+def sweep_scratch():
+    """
+    Periodic task: trash orphaned scratch directories, including those of
+    hosts that went away and never restarted a worker.
+    """
+    return sweep_orphans()
+
+
+@shared_task
+def purge_expired_jobs():
+    """
+    Periodic task: archive and delete jobs past their retention age
+    (generator.retention), reporting rows and bytes reclaimed.
+    """
+    return retention.purge_expired()
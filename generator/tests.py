@@ -1,3 +1,1190 @@
-from django.test import TestCase
+import io
+import os
+import time
+import socket
+import sys
+import asyncio
+import hmac
+import gzip
+import json
+import shutil
+import hashlib
+import tarfile
+import tempfile
+import threading
+import subprocess
+from functools import partial
+from contextlib import nullcontext
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from git import GitCommandError
+from prometheus_client.parser import text_string_to_metric_families
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from readme.exceptions import LLMGenerationError
+from readme.summarize import summarize_sources
+from .models import GenerationJob, RepoSnapshot
+from .fetchers import fetch_archive, fetch_repo
+from .repos import normalize_repo_url, repo_key, resolve_head
+from .scratch import QuotaExceeded, ScratchFull, allocate, sweep_orphans
+from .tasks import extract_repo_name, reclaim_stale_jobs, snapshot_covers
+
+
+class JobLeaseTests(TestCase):
+    def setUp(self):
+        self.job = GenerationJob.objects.create(repo_url="https://github.com/foo/bar")
+
+    def expire_lease(self):
+        GenerationJob.objects.filter(id=self.job.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_second_claim_loses(self):
+        self.assertIsNotNone(GenerationJob.claim(self.job.id, "w1", 60))
+        self.assertIsNone(GenerationJob.claim(self.job.id, "w2", 60))
+
+        job = GenerationJob.objects.get(id=self.job.id)
+        self.assertEqual((job.status, job.claimed_by, job.attempts), ("processing", "w1", 1))
+
+    def test_expired_lease_can_be_claimed(self):
+        GenerationJob.claim(self.job.id, "w1", 60)
+        self.expire_lease()
+
+        job = GenerationJob.claim(self.job.id, "w2", 60)
+        self.assertEqual((job.claimed_by, job.attempts), ("w2", 2))
+
+    def test_finished_job_cannot_be_claimed(self):
+        GenerationJob.objects.filter(id=self.job.id).update(status="completed")
+        self.assertIsNone(GenerationJob.claim(self.job.id, "w1", 60))
+
+    def test_worker_that_lost_its_lease_cannot_write(self):
+        stale = GenerationJob.claim(self.job.id, "w1", 60)
+        self.expire_lease()
+        GenerationJob.claim(self.job.id, "w2", 60)
+
+        self.assertFalse(stale.heartbeat(60))
+        self.assertFalse(stale.checkpoint(commit_sha="abc"))
+        self.assertFalse(stale.transition("completed", expected="processing", owned=True, result="stale"))
+        self.assertEqual(stale.status, "processing")
+
+        job = GenerationJob.objects.get(id=self.job.id)
+        self.assertEqual((job.status, job.claimed_by, job.commit_sha, job.result), ("processing", "w2", "", None))
+
+    def test_claim_stops_at_max_attempts(self):
+        GenerationJob.objects.filter(id=self.job.id).update(attempts=3)
+        self.assertIsNone(GenerationJob.claim(self.job.id, "w1", 60, max_attempts=3))
+        self.assertEqual(GenerationJob.claim(self.job.id, "w1", 60, max_attempts=4).attempts, 4)
+
+    def test_transition_checks_expected_status(self):
+        self.assertFalse(self.job.transition("completed", expected="processing"))
+        self.assertTrue(self.job.transition("failed", expected="pending", result="boom"))
+        self.assertEqual(GenerationJob.objects.get(id=self.job.id).status, "failed")
+
+
+@mock.patch("generator.tasks.sync_job_states")
+@mock.patch("generator.tasks.dispatch_all")
+@mock.patch("generator.tasks.sync_job_state")
+class ReclaimStaleJobsTests(TestCase):
+    def claimed_job(self, attempts: int, lease_seconds: int) -> GenerationJob:
+        job = GenerationJob.objects.create(repo_url="https://github.com/foo/bar")
+        GenerationJob.objects.filter(id=job.id).update(
+            status="processing",
+            claimed_by="dead-worker",
+            attempts=attempts,
+            lease_expires_at=timezone.now() + timedelta(seconds=lease_seconds),
+        )
+        return job
+
+    def test_expired_job_is_requeued(self, sync_job_state, dispatch_all, sync_job_states):
+        job = self.claimed_job(attempts=1, lease_seconds=-1)
+
+        self.assertEqual(reclaim_stale_jobs(), {"reclaimed": 1, "failed": 0, "undelivered": 0})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.claimed_by, job.lease_expires_at), ("pending", "", None))
+        dispatch_all.assert_called_once()
+
+    def test_job_out_of_attempts_is_failed(self, sync_job_state, dispatch_all, sync_job_states):
+        with self.settings(JOB_MAX_ATTEMPTS=3):
+            job = self.claimed_job(attempts=3, lease_seconds=-1)
+            self.assertEqual(reclaim_stale_jobs(), {"reclaimed": 0, "failed": 1, "undelivered": 0})
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIsNotNone(job.finished_at)
+
+    def test_live_lease_is_left_alone(self, sync_job_state, dispatch_all, sync_job_states):
+        job = self.claimed_job(attempts=1, lease_seconds=60)
+
+        self.assertEqual(reclaim_stale_jobs(), {"reclaimed": 0, "failed": 0, "undelivered": 0})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.claimed_by), ("processing", "dead-worker"))
+        dispatch_all.assert_not_called()
+
+    def test_undelivered_dispatch_is_released(self, sync_job_state, dispatch_all, sync_job_states):
+        lost = GenerationJob.objects.create(repo_url="https://github.com/foo/bar")
+        queued = GenerationJob.objects.create(repo_url="https://github.com/foo/baz")
+        GenerationJob.objects.filter(id=lost.id).update(dispatched_at=timezone.now() - timedelta(hours=1))
+        GenerationJob.objects.filter(id=queued.id).update(dispatched_at=timezone.now())
+
+        with self.settings(JOB_DISPATCH_TIMEOUT=600):
+            self.assertEqual(reclaim_stale_jobs(), {"reclaimed": 0, "failed": 0, "undelivered": 1})
+        lost.refresh_from_db()
+        queued.refresh_from_db()
+        self.assertIsNone(lost.dispatched_at)
+        self.assertIsNotNone(queued.dispatched_at)
+        sync_job_states.assert_called_once_with([lost.id], progress="queued")
+        dispatch_all.assert_called_once()
+
+
+class RepoUrlTests(TestCase):
+    def test_normalize_keeps_owner_and_repo_casing(self):
+        for url in ("https://github.com/Foo/Bar.git", "git@github.com:Foo/Bar.git", "HTTPS://GitHub.com/Foo/Bar/"):
+            self.assertEqual(normalize_repo_url(url), "https://github.com/Foo/Bar")
+        self.assertEqual(extract_repo_name(normalize_repo_url("https://github.com/Foo/Bar.git")), "Bar")
+
+    def test_repo_key_folds_case_on_case_insensitive_hosts(self):
+        self.assertEqual(repo_key("https://github.com/Foo/Bar"), "https://github.com/foo/bar")
+        self.assertEqual(repo_key("https://example.org/Foo/Bar"), "https://example.org/Foo/Bar")
+
+
+class GenerateReadmeViewTests(TestCase):
+    @mock.patch("generator.views.GenerateReadmeView.complete_from_cache")
+    def test_invalid_priority_is_rejected_before_the_cache(self, complete_from_cache):
+        response = self.client.post(
+            "/api/generate/",
+            {"repo_url": "https://github.com/foo/bar", "priority": "urgent"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        complete_from_cache.assert_not_called()
+
+    @mock.patch("generator.views.GenerateReadmeView.complete_from_cache")
+    def test_non_string_url_is_rejected(self, complete_from_cache):
+        response = self.client.post(
+            "/api/generate/", {"repo_url": ["https://github.com/foo/bar"]}, content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        complete_from_cache.assert_not_called()
+
+    @override_settings(REPO_RESOLVE_INLINE_TIMEOUT=0.5)
+    @mock.patch("generator.views.dispatch_lane")
+    @mock.patch("generator.views.sync_job_state")
+    @mock.patch("generator.views.cached_resolve_head", side_effect=GitCommandError("ls-remote", -9))
+    def test_slow_head_lookup_queues_the_job(self, cached_resolve_head, sync_job_state, dispatch_lane):
+        response = self.client.post(
+            "/api/generate/", {"repo_url": "https://github.com/foo/bar"}, content_type="application/json",
+        )
+        self.assertEqual(response.json()["status"], "pending")
+        cached_resolve_head.assert_called_once_with("https://github.com/foo/bar", timeout=0.5)
+        dispatch_lane.assert_called_once_with("interactive")
+
+
+class ResolveHeadTests(TestCase):
+    def test_local_repository(self):
+        repo = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, repo)
+        git = ["git", "-C", repo, "-c", "user.name=test", "-c", "user.email=test@example.com"]
+        subprocess.run([*git, "init", "-q"], check=True)
+        subprocess.run([*git, "commit", "-q", "--allow-empty", "-m", "init"], check=True)
+
+        head = subprocess.check_output([*git, "rev-parse", "HEAD"], text=True).strip()
+        self.assertEqual(resolve_head(repo), head)
+
+    def test_stalled_remote_times_out(self):
+        # Accepts the connection but never answers, like a hung host.
+        server = socket.socket()
+        self.addCleanup(server.close)
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+
+        started = time.monotonic()
+        with self.assertRaises(GitCommandError):
+            resolve_head(f"http://127.0.0.1:{server.getsockname()[1]}/foo/bar.git", timeout=0.5)
+        self.assertLess(time.monotonic() - started, 5)
+
+
+@override_settings(GITHUB_WEBHOOK_SECRET="s3cret")
+@mock.patch("generator.tasks.dispatch_lane")
+@mock.patch("generator.tasks.sync_job_state")
+@mock.patch("generator.tasks.get_cached_readme", return_value=None)
+class GitHubWebhookTests(TestCase):
+    def push(self, ref="refs/heads/main", after="a" * 40, secret="s3cret"):
+        body = json.dumps({
+            "ref": ref,
+            "after": after,
+            "repository": {"html_url": "https://github.com/Foo/Bar", "default_branch": "main"},
+        }).encode()
+        signature = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        return self.client.post(
+            "/api/webhooks/github/",
+            body,
+            content_type="application/json",
+            headers={"X-GitHub-Event": "push", "X-Hub-Signature-256": signature},
+        )
+
+    def test_signed_push_queues_a_warmup_job(self, get_cached_readme, sync_job_state, dispatch_lane):
+        response = self.push()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], "queued")
+        job = GenerationJob.objects.get(id=response.json()["job_id"])
+        self.assertEqual((job.repo_url, job.priority, job.client_id), ("https://github.com/Foo/Bar", "warmup", "system:webhook"))
+        dispatch_lane.assert_called_once_with("warmup")
+
+    def test_bad_signature_is_rejected(self, get_cached_readme, sync_job_state, dispatch_lane):
+        response = self.push(secret="wrong")
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(GenerationJob.objects.exists())
+
+    def test_push_to_other_branch_is_ignored(self, get_cached_readme, sync_job_state, dispatch_lane):
+        response = self.push(ref="refs/heads/feature")
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], "ignored")
+        self.assertFalse(GenerationJob.objects.exists())
+
+    def test_duplicate_push_queues_one_job(self, get_cached_readme, sync_job_state, dispatch_lane):
+        first = self.push()
+        second = self.push()
+
+        self.assertEqual(first.json()["status"], "queued")
+        self.assertEqual(second.json(), {"status": "up-to-date", "job_id": None})
+        self.assertEqual(GenerationJob.objects.count(), 1)
+
+    @override_settings(GITHUB_WEBHOOK_SECRET="")
+    def test_unconfigured_secret_rejects_everything(self, get_cached_readme, sync_job_state, dispatch_lane):
+        response = self.push(secret="")
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(GenerationJob.objects.exists())
+
+
+@mock.patch("generator.tasks.dispatch_lane")
+@mock.patch("generator.tasks.sync_job_state")
+@mock.patch("generator.tasks.get_cached_readme", return_value=None)
+@mock.patch("generator.tasks.resolve_head", return_value="a" * 40)
+@mock.patch("generator.popularity.rescale")
+class WarmPopularReposTests(TestCase):
+    @mock.patch("generator.popularity.get_redis_connection")
+    def test_popularity_is_keyed_case_insensitively(self, get_redis_connection, *_):
+        from .popularity import record_request
+
+        client = get_redis_connection.return_value
+        client.get.return_value = str(time.time()).encode()
+        record_request("https://github.com/Foo/Bar")
+
+        self.assertEqual(client.pipeline.return_value.zincrby.call_args.args[2], "https://github.com/foo/bar")
+
+    @mock.patch("generator.popularity.top_repos")
+    def test_failed_repos_are_skipped(self, top_repos, rescale, resolve_head, *_):
+        from .tasks import warm_popular_repos
+
+        top_repos.return_value = ["https://github.com/foo/bar", "https://github.com/foo/broken", "https://github.com/foo/new"]
+        GenerationJob.objects.create(repo_url="https://github.com/Foo/Bar", status="completed")
+        GenerationJob.objects.create(repo_url="https://github.com/foo/broken", status="completed")
+        GenerationJob.objects.create(repo_url="https://github.com/foo/broken", status="failed")
+
+        self.assertEqual(warm_popular_repos(), {"queued": 2})
+        self.assertEqual(
+            [call.args[0] for call in resolve_head.call_args_list],
+            ["https://github.com/Foo/Bar", "https://github.com/foo/new"],
+        )
+        self.assertEqual(
+            set(GenerationJob.objects.filter(priority="warmup").values_list("repo_url", flat=True)),
+            {"https://github.com/Foo/Bar", "https://github.com/foo/new"},
+        )
+
+
+class JobSerializationTests(TestCase):
+    def test_internal_fields_are_not_exposed(self):
+        from .job_state import build_job_state
+        from .serializers import GenerationJobSerializer
+
+        job = GenerationJob.objects.create(repo_url="https://github.com/foo/bar", client_id="ip:127.0.0.1")
+        GenerationJob.claim(job.id, "host:123", 60)
+        job.refresh_from_db()
+
+        for data in (GenerationJobSerializer(job).data, build_job_state(job)):
+            for field in ("client_id", "claimed_by", "lease_expires_at", "attempts"):
+                self.assertNotIn(field, data)
+        self.assertNotIn("result", build_job_state(job))
+        self.assertIn("result", GenerationJobSerializer(job).data)
+
+
+class DictRedis:
+    """
+    The few Redis commands job_state uses, backed by a dict.
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def publish(self, channel, message):
+        return 0
+
+
+class QueueEstimateTests(TestCase):
+    def test_position_follows_fair_share_order(self):
+        from .scheduling import queue_position
+
+        counts = [1, 2, 5]
+        self.assertEqual([queue_position(rank, counts) for rank in range(5)], [3, 5, 6, 7, 8])
+        self.assertEqual(queue_position(None, counts), 4)
+
+    @mock.patch("generator.scheduling.average_job_seconds", return_value=60)
+    @mock.patch("generator.scheduling.get_redis_connection")
+    def test_estimate_reads_the_snapshot_without_sql(self, get_redis_connection, average_job_seconds):
+        from .scheduling import queue_estimate
+
+        get_redis_connection.return_value.pipeline.return_value.execute.return_value = [b"1", b"[1, 2, 5]"]
+        with self.assertNumQueries(0):
+            estimate = queue_estimate({"id": 7, "priority": "bulk", "dispatched_at": None})
+        self.assertEqual(estimate, {"queue_position": 5, "estimated_wait_seconds": 75.0})
+
+    @mock.patch("generator.scheduling.refresh_queue_snapshot")
+    @mock.patch("generator.tasks.process_repo_task.apply_async")
+    def test_dispatched_job_reports_no_wait(self, apply_async, refresh_queue_snapshot):
+        from .job_state import get_job_state, sync_job_state
+        from .scheduling import dispatch_lane, queue_estimate
+
+        with mock.patch("generator.job_state.get_redis", return_value=DictRedis()):
+            job = GenerationJob.objects.create(repo_url="https://github.com/foo/bar")
+            sync_job_state(job, progress="queued")
+            self.assertEqual(dispatch_lane("interactive"), 1)
+
+            state = get_job_state(job.id)
+        self.assertIsNotNone(state["dispatched_at"])
+        self.assertEqual(queue_estimate(state), {"queue_position": 0, "estimated_wait_seconds": 0})
+        apply_async.assert_called_once_with((job.id,), queue="interactive")
+
+    @mock.patch("generator.scheduling._dispatch")
+    def test_busy_lane_lock_is_not_waited_for(self, _dispatch):
+        from .scheduling import dispatch_lane
+
+        lock = mock.Mock(**{"acquire.return_value": False})
+        with mock.patch("generator.scheduling.cache.lock", create=True, return_value=lock):
+            self.assertEqual(dispatch_lane("bulk"), 0)
+        lock.acquire.assert_called_once_with(blocking=False)
+        _dispatch.assert_not_called()
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def make_archive(path: str, members: dict[str, bytes]):
+    with tarfile.open(path, "w:gz") as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+class FetchRepoTests(TestCase):
+    """
+    Archive fetching against a local HTTP server. Archives live under
+    archives/<owner>/<repo>.tar.gz; the same server exposes bare git repos
+    over dumb HTTP at /<owner>/<repo> for the clone fallback.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.root, "archives", "foo"))
+        make_archive(os.path.join(cls.root, "archives", "foo", "bar.tar.gz"), {
+            "bar-main/README.md": b"# bar\n",
+            "bar-main/requirements.txt": b"django\n",
+            "bar-main/src/app.py": b"print('hi')\n",
+        })
+        make_archive(os.path.join(cls.root, "archives", "foo", "evil.tar.gz"), {
+            "evil-main/../../escaped.txt": b"x",
+            "evil-main/sub/../../requirements.txt": b"x",
+            "evil-main//etc/requirements.txt": b"x",
+            "evil-main/ok.txt": b"ok",
+        })
+
+        source = os.path.join(cls.root, "source")
+        git = partial(subprocess.run, check=True, capture_output=True, cwd=source)
+        os.makedirs(source)
+        git(["git", "init", "-q"])
+        with open(os.path.join(source, "requirements.txt"), "w") as f:
+            f.write("flask\n")
+        git(["git", "add", "."])
+        git(["git", "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init"])
+        bare = os.path.join(cls.root, "foo", "cloned")
+        subprocess.run(["git", "clone", "-q", "--bare", source, bare], check=True, capture_output=True)
+        subprocess.run(["git", "update-server-info"], check=True, capture_output=True, cwd=bare)
+
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=cls.root))
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.host = f"127.0.0.1:{cls.server.server_port}"
+        cls.enterClassContext(override_settings(
+            REPO_FETCH_MODE="archive",
+            REPO_ARCHIVE_URLS={cls.host: f"http://{cls.host}/archives/{{path}}.tar.gz"},
+        ))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(cls.root)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.dest = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dest, ignore_errors=True)
+
+    def url(self, path: str) -> str:
+        return f"http://{self.host}/{path}"
+
+    def test_archive_lists_paths_and_extracts_manifests(self):
+        fetched = fetch_repo(self.url("foo/bar"), "", self.dest)
+
+        self.assertEqual(fetched["mode"], "archive")
+        self.assertEqual(sorted(fetched["paths"]), ["README.md", "requirements.txt", "src/app.py"])
+        self.assertGreater(fetched["bytes"], 0)
+        self.assertEqual(os.listdir(self.dest), ["requirements.txt"])
+
+    def test_missing_archive_falls_back_to_clone(self):
+        fetched = fetch_repo(self.url("foo/cloned"), "", self.dest)
+
+        self.assertEqual(fetched["mode"], "clone")
+        self.assertIsNone(fetched["paths"])
+        with open(os.path.join(self.dest, "requirements.txt")) as f:
+            self.assertEqual(f.read(), "flask\n")
+
+    def test_unsafe_members_are_skipped(self):
+        fetched = fetch_archive(self.url("foo/evil"), "", self.dest)
+
+        self.assertEqual(fetched["paths"], ["ok.txt"])
+        self.assertEqual(os.listdir(self.dest), [])
+        self.assertFalse(os.path.exists(os.path.join(self.root, "escaped.txt")))
+
+    def test_oversized_archive_exceeds_quota(self):
+        with self.assertRaises(QuotaExceeded):
+            fetch_repo(self.url("foo/bar"), "", self.dest, max_bytes=10)
+
+
+class ScratchAllocateTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        self.enterContext(override_settings(SCRATCH_ROOT=root, SCRATCH_JOB_QUOTA_BYTES=100, SCRATCH_TOTAL_QUOTA_BYTES=250))
+
+    def test_small_checkouts_do_not_exhaust_the_budget(self):
+        for job_id in range(10):
+            allocate(job_id)
+
+    def test_full_budget_raises(self):
+        with open(os.path.join(allocate(1), "big.bin"), "wb") as f:
+            f.write(b"x" * 200)
+
+        with self.assertRaises(ScratchFull):
+            allocate(2)
+
+
+@mock.patch("generator.tasks.dispatch_lane")
+@mock.patch("generator.tasks.sync_job_state")
+class ScratchFullRequeueTests(TestCase):
+    @mock.patch("generator.tasks.load_or_build_snapshot", side_effect=ScratchFull("no room"))
+    def test_job_is_requeued_without_spending_an_attempt(self, load_or_build_snapshot, sync_job_state, dispatch_lane):
+        from .tasks import process_repo_task
+
+        job = GenerationJob.objects.create(repo_url="https://github.com/foo/bar", priority="bulk")
+        with self.settings(SCRATCH_FULL_RETRY_SECONDS=30), mock.patch.object(process_repo_task, "apply_async") as apply_async:
+            for _ in range(settings.JOB_MAX_ATTEMPTS + 1):
+                process_repo_task(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.claimed_by), ("pending", 0, ""))
+        self.assertIsNotNone(job.dispatched_at)
+        apply_async.assert_called_with((job.id,), queue="bulk", countdown=30)
+
+
+@mock.patch("generator.tasks.dispatch_lane")
+@mock.patch("generator.tasks.sync_job_state")
+@mock.patch("generator.tasks.generate_readme_markdown_with_llm", return_value="# bar")
+@mock.patch("generator.tasks.analyze_repo", return_value={"languages": ["Python"]})
+@mock.patch(
+    "generator.tasks.fetch_repo",
+    return_value={"files": 1, "bytes": 10, "mode": "archive", "paths": ["main.py"]},
+)
+@mock.patch("generator.tasks.resolve_head", return_value="abc")
+class RetryFromSnapshotTests(TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        patcher = mock.patch("generator.tasks.scratch_dir", side_effect=lambda job_id: nullcontext(self.work_dir))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def retried_job(self, analysis: dict, **fields) -> GenerationJob:
+        snapshot = RepoSnapshot.objects.create(
+            repo_url="https://github.com/foo/bar", commit_sha="abc", analysis=analysis, base_readme="# bar",
+        )
+        return GenerationJob.objects.create(
+            repo_url="https://github.com/foo/bar", snapshot=snapshot, commit_sha="abc", attempts=1, **fields
+        )
+
+    def test_retry_goes_straight_to_the_llm(self, resolve_head, fetch_repo, analyze_repo, generate, *_):
+        from .tasks import process_repo_task
+
+        job = self.retried_job({"languages": ["Python"]})
+        process_repo_task(job.id)
+
+        resolve_head.assert_not_called()
+        fetch_repo.assert_not_called()
+        analyze_repo.assert_not_called()
+        generate.assert_called_once()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.attempts), ("completed", "# bar", 2))
+
+    @mock.patch("generator.tasks.summarize_sources", return_value={"summaries": [{"path": "main.py", "summary": "s"}], "missing": []})
+    def test_partial_snapshot_is_rebuilt(self, summarize, resolve_head, fetch_repo, analyze_repo, generate, *_):
+        from .tasks import process_repo_task
+
+        job = self.retried_job({"source_summaries": [], "summaries_missing": ["main.py"]}, deep=True)
+        process_repo_task(job.id)
+
+        fetch_repo.assert_called_once()
+        summarize.assert_called_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, "completed")
+        self.assertEqual(job.snapshot.analysis["source_summaries"], [{"path": "main.py", "summary": "s"}])
+        self.assertNotIn("summaries_missing", job.snapshot.analysis)
+
+    def test_exhausted_job_is_failed_instead_of_claimed(self, resolve_head, fetch_repo, analyze_repo, generate, *_):
+        from .tasks import process_repo_task
+
+        job = self.retried_job({"languages": ["Python"]})
+        GenerationJob.objects.filter(id=job.id).update(attempts=settings.JOB_MAX_ATTEMPTS)
+        process_repo_task(job.id)
+
+        generate.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("failed", settings.JOB_MAX_ATTEMPTS))
+
+    def test_git_retry_restarts_the_dispatch_clock(self, resolve_head, fetch_repo, analyze_repo, generate, *_):
+        from .tasks import process_repo_task
+
+        job = self.retried_job({"languages": ["Python"]})
+        GenerationJob.objects.filter(id=job.id).update(
+            attempts=0, dispatched_at=timezone.now() - timedelta(hours=1), snapshot=None,
+        )
+        resolve_head.side_effect = GitCommandError("ls-remote", 128)
+
+        with self.assertRaises(GitCommandError):
+            process_repo_task(job.id)  # called directly, retry() re-raises
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.claimed_by), ("pending", ""))
+        self.assertGreater(job.dispatched_at, timezone.now() - timedelta(minutes=1))
+
+
+    @mock.patch("generator.views.dispatch_lane")
+    @mock.patch("generator.views.sync_job_state")
+    def test_manual_retry_resets_attempts_and_dispatch(self, view_sync_job_state, view_dispatch_lane, *_):
+        job = self.retried_job({"languages": ["Python"]})
+        GenerationJob.objects.filter(id=job.id).update(
+            status="failed", attempts=settings.JOB_MAX_ATTEMPTS, dispatched_at=timezone.now(),
+        )
+
+        response = self.client.post(f"/api/jobs/{job.id}/retry/")
+        self.assertEqual(response.status_code, 200)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.dispatched_at), ("pending", 0, None))
+        view_dispatch_lane.assert_called_once_with(job.priority)
+
+
+@override_settings(CELERY_BROKER_URL="redis://broker:6379/0", METRICS_CELERY_QUEUES=["interactive", "bulk"])
+@mock.patch("generator.metrics.redis.Redis.from_url")
+@mock.patch("generator.tasks.dispatch_lane")
+@mock.patch("generator.tasks.sync_job_state")
+class MetricsTests(TestCase):
+    def scrape(self) -> dict:
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        return {
+            (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+            for family in text_string_to_metric_families(response.content.decode())
+            for sample in family.samples
+        }
+
+    def test_scrape_after_a_job(self, sync_job_state, dispatch_lane, from_url):
+        from .metrics import JOBS_IN_FLIGHT
+        from .tasks import process_repo_task
+
+        from_url.return_value.llen.side_effect = {"interactive": 3, "bulk": 0}.get
+        snapshot = RepoSnapshot.objects.create(
+            repo_url="https://github.com/foo/bar", commit_sha="abc", analysis={}, base_readme="# bar",
+        )
+        job = GenerationJob.objects.create(repo_url="https://github.com/foo/bar", snapshot=snapshot)
+        in_flight = []
+
+        def generate(*args, **kwargs):
+            in_flight.append(JOBS_IN_FLIGHT._value.get())
+            return "# bar"
+
+        persisted = ("readme_stage_duration_seconds_count", (("stage", "persist"),))
+        before = self.scrape()
+        with mock.patch("generator.tasks.generate_readme_markdown_with_llm", side_effect=generate):
+            process_repo_task(job.id)
+        after = self.scrape()
+
+        self.assertEqual(GenerationJob.objects.get(id=job.id).status, "completed")
+        self.assertEqual(after[persisted] - before.get(persisted, 0), 1)
+        self.assertEqual((in_flight, after[("readme_jobs_in_flight", ())]), ([1], 0))
+        self.assertEqual(after[("readme_celery_queue_depth", (("queue", "interactive"),))], 3)
+        self.assertEqual(after[("readme_celery_queue_depth", (("queue", "bulk"),))], 0)
+
+    @mock.patch("generator.tasks.load_or_build_snapshot", side_effect=ScratchFull("no room"))
+    def test_retries_are_counted_by_reason(self, load_or_build_snapshot, *_):
+        from .tasks import process_repo_task
+
+        retries = ("readme_task_retries_total", (("reason", "scratch_full"),))
+        job = GenerationJob.objects.create(repo_url="https://github.com/foo/bar")
+        before = self.scrape()
+        with mock.patch.object(process_repo_task, "apply_async"):
+            process_repo_task(job.id)
+
+        self.assertEqual(self.scrape()[retries] - before.get(retries, 0), 1)
+
+    def test_multiprocess_registry_aggregates_processes(self, *_):
+        # The mode is fixed when prometheus_client is imported: use a fresh interpreter.
+        script = """
+import multiprocessing
+import django
+django.setup()
+from prometheus_client import generate_latest
+from generator import metrics
+
+def work(n):
+    metrics.TASK_RETRIES.labels(reason="git").inc(n)
+    metrics.STAGE_DURATION.labels(stage="clone").observe(n)
+    metrics.JOBS_IN_FLIGHT.inc()
+
+children = [multiprocessing.Process(target=work, args=(n,)) for n in (1, 2)]
+for child in children:
+    child.start()
+for child in children:
+    child.join()
+print(generate_latest(metrics.build_registry()).decode())
+for child in children:
+    metrics.mark_process_dead(child.pid)
+print("---")
+print(generate_latest(metrics.build_registry()).decode())
+"""
+        multiproc_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, multiproc_dir)
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            env={**os.environ, "PROMETHEUS_MULTIPROC_DIR": multiproc_dir},
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout
+        live, after_exit = (
+            {
+                (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+                for family in text_string_to_metric_families(text)
+                for sample in family.samples
+            }
+            for text in output.split("---")
+        )
+
+        self.assertEqual(live[("readme_task_retries_total", (("reason", "git"),))], 3)
+        self.assertEqual(live[("readme_stage_duration_seconds_count", (("stage", "clone"),))], 2)
+        self.assertEqual(live[("readme_stage_duration_seconds_sum", (("stage", "clone"),))], 3)
+        self.assertEqual(live[("readme_jobs_in_flight", ())], 2)
+        self.assertEqual(after_exit[("readme_jobs_in_flight", ())], 0)
+        self.assertEqual(after_exit[("readme_task_retries_total", (("reason", "git"),))], 3)
+
+
+class ScratchSweepTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        self.enterContext(override_settings(SCRATCH_ROOT=root, SCRATCH_ORPHAN_SECONDS=3600))
+        self.jobs_dir = os.path.join(root, "jobs")
+
+    def make_dir(self, name: str) -> str:
+        os.makedirs(os.path.join(self.jobs_dir, name))
+        return name
+
+    def dead_pid(self) -> int:
+        process = subprocess.Popen(["true"])
+        process.wait()
+        return process.pid
+
+    @mock.patch("generator.scratch.socket.gethostname", return_value="readme-worker-7d9f-x2k4")
+    def test_dashed_hostname_is_parsed(self, gethostname):
+        live = os.path.basename(allocate(1))
+        self.make_dir(f"job2~readme-worker-7d9f-x2k4~{self.dead_pid()}~abcd1234")
+        other_host = self.make_dir(f"job3~readme-worker-other~{self.dead_pid()}~abcd1234")
+
+        self.assertEqual(sweep_orphans(), 1)
+        self.assertEqual(sorted(os.listdir(self.jobs_dir)), sorted([live, other_host]))
+
+
+def fake_summaries(prompt: str, request_id=None) -> str:
+    if "app.py" in prompt:
+        raise LLMGenerationError("quota exhausted")
+    paths = [line[len("=== FILE: "):-len(" ===")] for line in prompt.splitlines() if line.startswith("=== FILE: ")]
+    return json.dumps({path: f"summary of {path}" for path in paths})
+
+
+@override_settings(DEEP_SUMMARY_CHUNK_BYTES=1)
+@mock.patch("readme.summarize.GeminiClient")
+class SummarizeSourcesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.repo = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.repo)
+        for name in ("main.py", "app.py"):
+            with open(os.path.join(self.repo, name), "w") as f:
+                f.write(f"# {name}\n")
+
+    def test_failed_chunks_are_reported_and_retried_alone(self, GeminiClient):
+        generate = GeminiClient.return_value.generate
+        generate.side_effect = fake_summaries
+
+        result = summarize_sources(self.repo, ["main.py", "app.py"])
+        self.assertEqual(result, {"summaries": [{"path": "main.py", "summary": "summary of main.py"}], "missing": ["app.py"]})
+
+        generate.reset_mock()
+        summarize_sources(self.repo, ["main.py", "app.py"])
+        self.assertEqual(generate.call_count, 1)
+        self.assertIn("app.py", generate.call_args.args[0])
+
+    def test_partial_summaries_do_not_cover_deep_jobs(self, GeminiClient):
+        deep = GenerationJob(repo_url="https://github.com/foo/bar", deep=True)
+        partial = RepoSnapshot(analysis={"source_summaries": [], "summaries_missing": ["app.py"]})
+        complete = RepoSnapshot(analysis={"source_summaries": []})
+
+        self.assertFalse(snapshot_covers(partial, deep))
+        self.assertTrue(snapshot_covers(complete, deep))
+        self.assertTrue(snapshot_covers(partial, GenerationJob(repo_url=deep.repo_url)))
+
+
+class JobStatusViewTests(TestCase):
+    @mock.patch("generator.job_state.get_redis")
+    def test_repeated_polls_outside_asgi(self, get_redis):
+        # The sync test client runs async views like WSGI: a new loop per request.
+        get_redis.return_value.get.return_value = None
+        job = GenerationJob.objects.create(repo_url="https://github.com/foo/bar", status="completed")
+
+        for _ in range(2):
+            response = self.client.get(f"/api/jobs/{job.id}/")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["status"], "completed")
+
+    @override_settings(REDIS_URL="redis://127.0.0.1:6379/0")
+    def test_async_redis_client_is_per_loop(self):
+        from .job_state import get_async_redis
+
+        async def clients():
+            return get_async_redis(), get_async_redis()
+
+        first, again = asyncio.run(clients())
+        second, _ = asyncio.run(clients())
+        self.assertIs(first, again)
+        self.assertIsNot(first, second)
+
+
+class JobStateCacheTests(TestCase):
+    def setUp(self):
+        self.redis = DictRedis()
+        patcher = mock.patch("generator.job_state.get_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.job = GenerationJob.objects.create(repo_url="https://github.com/foo/bar", status="completed", result="# bar")
+
+    def test_cached_state_is_read_without_sql(self):
+        from .job_state import get_job_state, sync_job_state
+
+        sync_job_state(self.job, progress="done")
+        with self.assertNumQueries(0):
+            state = get_job_state(self.job.id)
+        self.assertEqual((state["status"], state["progress"]), ("completed", "done"))
+        self.assertNotIn("result", state)
+
+    def test_miss_falls_back_to_the_database_and_repopulates(self):
+        from .job_state import get_job_state, job_state_key
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_job_state(self.job.id)["status"], "completed")
+        self.assertIn(job_state_key(self.job.id), self.redis.data)
+        with self.assertNumQueries(0):
+            get_job_state(self.job.id)
+        self.assertIsNone(get_job_state(self.job.id + 1))
+
+    def test_result_is_only_returned_on_request(self):
+        state = self.client.get(f"/api/jobs/{self.job.id}/").json()
+        self.assertNotIn("result", state)
+
+        state = self.client.get(f"/api/jobs/{self.job.id}/?include_result=true").json()
+        self.assertEqual(state["result"], "# bar")
+
+    @mock.patch("generator.tasks.dispatch_all")
+    def test_released_dispatch_is_written_through(self, dispatch_all):
+        from .job_state import get_job_state, sync_job_state
+
+        lost = GenerationJob.objects.create(repo_url="https://github.com/foo/baz")
+        GenerationJob.objects.filter(id=lost.id).update(dispatched_at=timezone.now() - timedelta(hours=1))
+        sync_job_state(lost, progress="dispatched")
+
+        with self.settings(JOB_DISPATCH_TIMEOUT=600):
+            reclaim_stale_jobs()
+        self.assertEqual(get_job_state(lost.id)["progress"], "queued")
+
+
+def busy_loop(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        profile_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, profile_root)
+        override = self.settings(PROFILE_ROOT=profile_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.job = GenerationJob.objects.create(repo_url="https://github.com/foo/bar", profile=True)
+
+    def profile_attempt(self, attempt: int):
+        from .profiling import JobProfiler
+
+        self.job.attempts = attempt
+        with JobProfiler(self.job, interval=0.005):
+            busy_loop(0.1)
+
+    def test_artifacts_are_written_per_attempt(self):
+        import pstats
+        from .profiling import profile_paths, profiled_attempts
+
+        self.profile_attempt(1)
+        self.profile_attempt(2)
+
+        self.assertEqual(profiled_attempts(self.job.id), [1, 2])
+        self.assertIsNotNone(GenerationJob.objects.get(id=self.job.id).profiled_at)
+        paths = profile_paths(self.job.id, 1)
+        functions = {name for _, _, name in pstats.Stats(paths["pstats"]).stats}
+        self.assertIn("busy_loop", functions)
+        with open(paths["collapsed"]) as f:
+            lines = f.read().splitlines()
+        stacks = dict(line.rsplit(" ", 1) for line in lines)
+        self.assertTrue(all(int(count) > 0 for count in stacks.values()))
+        self.assertTrue(any(stack.split(";")[-1].startswith("busy_loop (tests.py:") for stack in stacks))
+
+    def test_download_defaults_to_the_latest_attempt(self):
+        self.profile_attempt(1)
+        self.profile_attempt(2)
+
+        response = self.client.get(f"/api/jobs/{self.job.id}/profile/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f"job_{self.job.id}_attempt2.pstats", response["Content-Disposition"])
+
+        response = self.client.get(f"/api/jobs/{self.job.id}/profile/?attempt=1&artifact=collapsed")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"busy_loop", b"".join(response.streaming_content))
+
+    def test_download_without_a_profile_is_not_found(self):
+        self.assertEqual(self.client.get(f"/api/jobs/{self.job.id}/profile/").status_code, 404)
+
+        self.profile_attempt(1)
+        self.assertEqual(self.client.get(f"/api/jobs/{self.job.id}/profile/?attempt=2").status_code, 404)
+        self.assertEqual(self.client.get(f"/api/jobs/{self.job.id}/profile/?attempt=x").status_code, 400)
+
+    def test_retention_removes_every_attempt(self):
+        from .profiling import profiled_attempts
+        from .retention import remove_profiles
+
+        self.profile_attempt(1)
+        self.profile_attempt(2)
+        remove_profiles([self.job.id])
+
+        self.assertEqual(profiled_attempts(self.job.id), [])
+        self.assertEqual(os.listdir(settings.PROFILE_ROOT), [])
+
+
+class JobTimingTests(TestCase):
+    def finished_job(self, hours_ago: float, total_seconds: float, **stage_durations) -> GenerationJob:
+        finished_at = timezone.now() - timedelta(hours=hours_ago)
+        job = GenerationJob.objects.create(repo_url="https://github.com/foo/bar", status="completed")
+        GenerationJob.objects.filter(id=job.id).update(
+            created_at=finished_at - timedelta(seconds=total_seconds),
+            started_at=finished_at - timedelta(seconds=total_seconds - 1),
+            finished_at=finished_at,
+            stage_timings={stage: {"duration": duration} for stage, duration in stage_durations.items()},
+        )
+        return job
+
+    def test_nearest_rank_percentile(self):
+        from .timings import percentile
+
+        values = [float(n) for n in range(1, 11)]
+        self.assertEqual([percentile(values, pct) for pct in (1, 50, 90, 99, 100)], [1, 5, 9, 10, 10])
+        self.assertEqual(percentile([4.0], 99), 4)
+        self.assertIsNone(percentile([], 50))
+
+    def test_summary_covers_only_the_window(self):
+        for n in range(1, 5):
+            self.finished_job(hours_ago=1, total_seconds=10 * n, llm=float(n))
+        self.finished_job(hours_ago=30, total_seconds=100, llm=100.0)
+
+        stages = self.client.get("/api/jobs/stats/").json()["stages"]
+        self.assertEqual(stages["llm"], {"count": 4, "p50": 2.0, "p90": 4.0, "p99": 4.0})
+        self.assertEqual(stages["queue"]["p50"], 1.0)
+        self.assertEqual((stages["total"]["count"], stages["total"]["p99"]), (4, 40.0))
+
+        stages = self.client.get("/api/jobs/stats/?hours=48").json()["stages"]
+        self.assertEqual((stages["llm"]["count"], stages["llm"]["p99"]), (5, 100.0))
+
+    def test_slowest_jobs_come_first(self):
+        fast = self.finished_job(hours_ago=1, total_seconds=5)
+        slow = self.finished_job(hours_ago=2, total_seconds=50)
+        medium = self.finished_job(hours_ago=3, total_seconds=20)
+
+        slowest = self.client.get("/api/jobs/stats/?limit=2").json()["slowest_jobs"]
+        self.assertEqual([job["id"] for job in slowest], [slow.id, medium.id])
+        self.assertEqual(slowest[0]["total_seconds"], 50)
+        self.assertNotIn(fast.id, [job["id"] for job in slowest])
+
+    def test_invalid_window_is_rejected(self):
+        for query in ("hours=-1", "hours=0", "hours=abc", "hours=1.5", "hours=99999999999", "limit=-1"):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f"/api/jobs/stats/?{query}").status_code, 400)
+
+
+@override_settings(JOB_ARCHIVE_ROOT="", JOB_RETENTION_DAYS={"completed": 30}, SNAPSHOT_RETENTION_DAYS=7)
+@mock.patch("generator.retention.clear_job_states")
+class RetentionTests(TestCase):
+    def snapshot(self, commit_sha: str, age_days: int) -> RepoSnapshot:
+        snapshot = RepoSnapshot.objects.create(
+            repo_url="https://github.com/foo/bar", commit_sha=commit_sha, analysis={}, base_readme="# bar",
+        )
+        RepoSnapshot.objects.filter(id=snapshot.id).update(created_at=timezone.now() - timedelta(days=age_days))
+        return snapshot
+
+    def test_unreferenced_snapshots_are_purged_with_their_jobs(self, clear_job_states):
+        from .retention import purge_expired
+
+        orphaned = self.snapshot("a", age_days=60)
+        expired_job = GenerationJob.objects.create(repo_url="https://github.com/foo/bar", status="completed", snapshot=orphaned)
+        GenerationJob.objects.filter(id=expired_job.id).update(updated_at=timezone.now() - timedelta(days=31))
+        in_use = self.snapshot("b", age_days=60)
+        GenerationJob.objects.create(repo_url="https://github.com/foo/bar", status="completed", snapshot=in_use)
+        recent = self.snapshot("c", age_days=1)
+
+        totals = purge_expired()
+
+        self.assertEqual((totals["rows"], totals["snapshots"]), (1, 1))
+        self.assertGreater(totals["snapshot_bytes"], 0)
+        self.assertEqual(set(RepoSnapshot.objects.values_list("id", flat=True)), {in_use.id, recent.id})
+
+
+    def test_purged_rows_round_trip_through_the_archive(self, clear_job_states):
+        from .retention import purge_expired
+
+        archive_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_root)
+        expired = [
+            GenerationJob.objects.create(repo_url=f"https://github.com/foo/repo{i}", status="completed", result=f"# repo{i}")
+            for i in range(3)
+        ]
+        GenerationJob.objects.filter(id__in=[job.id for job in expired]).update(updated_at=timezone.now() - timedelta(days=31))
+        kept = GenerationJob.objects.create(repo_url="https://github.com/foo/recent", status="completed")
+        originals = {row["id"]: row for row in GenerationJob.objects.filter(id__in=[job.id for job in expired]).values()}
+
+        with self.settings(JOB_ARCHIVE_ROOT=archive_root, JOB_RETENTION_BATCH_SIZE=2):
+            totals = purge_expired()
+
+        archives = sorted(
+            os.path.join(root, name) for root, _, names in os.walk(archive_root) for name in names
+        )
+        self.assertEqual((totals["rows"], totals["files"], len(archives)), (3, 2, 2))
+        self.assertTrue(all(path.endswith(".jsonl.gz") for path in archives))
+        self.assertEqual(totals["archived_bytes"], sum(os.path.getsize(path) for path in archives))
+
+        archived = {}
+        for path in archives:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    row = json.loads(line)
+                    archived[row["id"]] = row
+        self.assertEqual(set(archived), set(originals))
+        for job_id, row in archived.items():
+            original = originals[job_id]
+            self.assertEqual(
+                (row["repo_url"], row["status"], row["result"]),
+                (original["repo_url"], original["status"], original["result"]),
+            )
+            self.assertEqual(datetime.fromisoformat(row["created_at"]), original["created_at"])
+        self.assertEqual(list(GenerationJob.objects.values_list("id", flat=True)), [kept.id])
+        clear_job_states.assert_called_with([expired[2].id])
+
+
+class ColdStartImportTests(SimpleTestCase):
+    # Imports are per interpreter, so each check runs in a fresh one.
+    WORKER_ONLY = ("google.genai", "markdown2", "generator.tasks")
+
+    def loaded_after(self, script: str) -> dict:
+        prelude = "import sys, json, django\ndjango.setup()\n"
+        report = "\nprint(json.dumps({name: name in sys.modules for name in %r}))" % (self.WORKER_ONLY,)
+        output = subprocess.run(
+            [sys.executable, "-c", prelude + script + report],
+            env={**os.environ, "GEMINI_API_KEY": "test-key"},
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout
+        return json.loads(output.splitlines()[-1])
+
+    def test_web_tier_does_not_import_worker_modules(self):
+        loaded = self.loaded_after("import config.wsgi, config.asgi, config.urls")
+        self.assertEqual(loaded, dict.fromkeys(self.WORKER_ONLY, False))
+
+    def test_worker_signals_preload_them(self):
+        loaded = self.loaded_after(
+            "from config import celery\n"
+            "celery.import_worker_modules()\n"
+            "import readme.llm, generator.fetchers\n"
+            "assert 'google.genai' in sys.modules and readme.llm._genai_client is None\n"
+            "celery.preload_worker_clients()\n"
+            "assert readme.llm._genai_client is not None and generator.fetchers._session is not None\n"
+        )
+        self.assertTrue(loaded["google.genai"])
+
+
+class FakePubSub:
+    """
+    redis.asyncio PubSub stand-in: psubscribe fails with `error` if given,
+    listen() yields what the test puts on `messages`.
+    """
+
+    def __init__(self, messages: asyncio.Queue, error: Exception | None = None):
+        self.messages = messages
+        self.error = error
+
+    async def psubscribe(self, pattern):
+        if self.error:
+            raise self.error
+
+    async def listen(self):
+        while True:
+            message = await self.messages.get()
+            if isinstance(message, Exception):
+                raise message
+            yield message
+
+    async def aclose(self):
+        pass
+
+
+def pmessage(state: dict) -> dict:
+    return {"type": "pmessage", "channel": f"jobs:{state['id']}".encode(), "data": json.dumps(state).encode()}
+
+
+@override_settings(REDIS_URL="redis://127.0.0.1:6379/0", JOB_STATUS_SUBSCRIBE_TIMEOUT=0.2)
+class JobStatusWebSocketTests(SimpleTestCase):
+    """
+    Drive the ASGI WebSocket endpoint with in-memory receive/send queues and a
+    fake pub/sub; job state reads are patched out.
+    """
+
+    def setUp(self):
+        from . import realtime
+
+        self.messages = asyncio.Queue()
+        self.pubsubs = [FakePubSub(self.messages)]
+        client = mock.Mock(aclose=mock.AsyncMock())
+        client.pubsub.side_effect = lambda: self.pubsubs.pop(0) if len(self.pubsubs) > 1 else self.pubsubs[0]
+
+        # The event loop (and the hub's reader task) ends with each test.
+        self.hub = realtime.JobStatusHub()
+        self.states = {1: {"id": 1, "status": "pending"}}
+        for patcher in (
+            mock.patch.object(realtime, "hub", self.hub),
+            mock.patch.object(realtime, "RECONNECT_DELAY", 0),
+            mock.patch.object(realtime.aioredis.Redis, "from_url", return_value=client),
+            mock.patch.object(realtime, "aget_job_state", side_effect=self.get_state),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def get_state(self, job_id):
+        return dict(self.states[job_id]) if job_id in self.states else None
+
+    async def connect(self, path="/ws/jobs/1/"):
+        from .realtime import websocket_application
+
+        self.inbox, self.outbox = asyncio.Queue(), asyncio.Queue()
+        await self.inbox.put({"type": "websocket.connect"})
+        return asyncio.create_task(websocket_application({"type": "websocket", "path": path}, self.inbox.get, self.outbox.put))
+
+    async def sent(self) -> dict:
+        return await asyncio.wait_for(self.outbox.get(), 1)
+
+    async def test_initial_state_is_sent_on_connect(self):
+        app = await self.connect()
+
+        self.assertEqual(await self.sent(), {"type": "websocket.accept"})
+        self.assertEqual(json.loads((await self.sent())["text"]), {"id": 1, "status": "pending"})
+
+        await self.inbox.put({"type": "websocket.disconnect"})
+        await asyncio.wait_for(app, 1)
+
+    async def test_transitions_are_forwarded_until_terminal(self):
+        app = await self.connect()
+        await self.sent()
+        await self.sent()
+
+        await self.messages.put(pmessage({"id": 2, "status": "processing"}))
+        await self.messages.put(pmessage({"id": 1, "status": "processing"}))
+        await self.messages.put(pmessage({"id": 1, "status": "completed"}))
+
+        self.assertEqual(json.loads((await self.sent())["text"])["status"], "processing")
+        self.assertEqual(json.loads((await self.sent())["text"])["status"], "completed")
+        self.assertEqual(await self.sent(), {"type": "websocket.close", "code": 1000})
+        await asyncio.wait_for(app, 1)
+        self.assertNotIn(1, self.hub.listeners)
+
+    async def test_state_is_resent_after_reconnect(self):
+        self.pubsubs.insert(0, FakePubSub(self.messages))
+        app = await self.connect()
+        await self.sent()
+        await self.sent()
+
+        # The job finishes while the subscription is down; the resync delivers it.
+        self.states[1] = {"id": 1, "status": "completed"}
+        with self.assertLogs("generator.realtime", "WARNING"):
+            await self.messages.put(ConnectionError("connection reset"))
+
+            self.assertEqual(json.loads((await self.sent())["text"])["status"], "completed")
+            self.assertEqual(await self.sent(), {"type": "websocket.close", "code": 1000})
+            await asyncio.wait_for(app, 1)
+
+    async def test_unreachable_redis_closes_with_error(self):
+        import redis
+
+        self.pubsubs[0] = FakePubSub(self.messages, error=redis.ConnectionError("refused"))
+        with self.assertLogs("generator.realtime", "WARNING") as logs, mock.patch("generator.realtime.RECONNECT_DELAY", 0.05):
+            app = await self.connect()
+
+            self.assertEqual(await self.sent(), {"type": "websocket.accept"})
+            self.assertEqual(await self.sent(), {"type": "websocket.close", "code": 1011})
+            await asyncio.wait_for(app, 1)
+        self.assertIn("refused", logs.output[0])
@@ -0,0 +1,81 @@
+import math
+from collections import defaultdict
+
+from django.db.models import DurationField, ExpressionWrapper, F
+
+from .models import GenerationJob
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values: list[float], pct: int) -> float | None:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+def stage_percentiles(since) -> dict:
+    """
+    Percentiles of each recorded stage (plus queue wait and end-to-end time)
+    for jobs that finished since the given datetime.
+    """
+    durations = defaultdict(list)
+
+    jobs = GenerationJob.objects.filter(finished_at__gte=since).values_list(
+        "created_at", "started_at", "finished_at", "stage_timings"
+    )
+    for created_at, started_at, finished_at, stage_timings in jobs.iterator():
+        if started_at:
+            durations["queue"].append((started_at - created_at).total_seconds())
+        durations["total"].append((finished_at - created_at).total_seconds())
+        for stage, timing in (stage_timings or {}).items():
+            durations[stage].append(timing["duration"])
+
+    summary = {}
+    for stage, values in durations.items():
+        values.sort()
+        summary[stage] = {"count": len(values)}
+        for pct in PERCENTILES:
+            summary[stage][f"p{pct}"] = percentile(values, pct)
+    return summary
+
+
+def model_summary(since) -> dict:
+    """
+    Per LLM model: jobs it finished, share of those that escalated to it
+    from a cheaper tier, and LLM stage percentiles (all attempts included).
+    """
+    durations = defaultdict(list)
+    escalated = defaultdict(int)
+
+    jobs = GenerationJob.objects.filter(finished_at__gte=since).exclude(llm_model="").values_list(
+        "llm_model", "llm_escalations", "stage_timings"
+    )
+    for llm_model, escalations, stage_timings in jobs.iterator():
+        escalated[llm_model] += bool(escalations)
+        llm_timing = (stage_timings or {}).get("llm")
+        durations[llm_model].append(llm_timing["duration"] if llm_timing else None)
+
+    summary = {}
+    for llm_model, values in durations.items():
+        timed = sorted(value for value in values if value is not None)
+        summary[llm_model] = {
+            "count": len(values),
+            "escalated_rate": round(escalated[llm_model] / len(values), 3),
+        }
+        for pct in PERCENTILES:
+            summary[llm_model][f"llm_p{pct}"] = percentile(timed, pct)
+    return summary
+
+
+def slowest_jobs(since, limit: int = 10):
+    return (
+        GenerationJob.objects.filter(finished_at__gte=since)
+        .annotate(duration=ExpressionWrapper(F("finished_at") - F("created_at"), output_field=DurationField()))
+        .order_by("-duration")
+        .defer("result")[:limit]
+    )
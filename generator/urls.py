@@ -1,25 +1,28 @@
 from django.urls import path
 from .views import (
     GenerateReadmeView,
-    JobStatusView,
-    DownloadReadmeView,
-    HealthCheckView,
+    JobTimingSummaryView,
     ListJobsView,
     LLMHealthCheckView,
-    PreviewReadmeHTMLView,
     RetryJobView,
-    DeleteJobView
+    DownloadProfileView,
+    DeleteJobView,
+    GitHubWebhookView,
 )
+from . import async_views
 
 urlpatterns = [
-    path("health/", HealthCheckView.as_view()),
+    path("health/", async_views.health),
     path("generate/", GenerateReadmeView.as_view()),
     path("jobs/", ListJobsView.as_view()),
-    path("jobs/<int:job_id>/", JobStatusView.as_view()),
-    path("jobs/<int:job_id>/download/", DownloadReadmeView.as_view()),
-    path("jobs/<int:job_id>/preview/", PreviewReadmeHTMLView.as_view()),
+    path("jobs/stats/", JobTimingSummaryView.as_view()),
+    path("jobs/<int:job_id>/", async_views.job_status),
+    path("jobs/<int:job_id>/download/", async_views.download_readme),
+    path("jobs/<int:job_id>/preview/", async_views.preview_readme),
+    path("jobs/<int:job_id>/profile/", DownloadProfileView.as_view(), name="job-profile"),
     path("jobs/<int:job_id>/retry/", RetryJobView.as_view()),
     path("jobs/<int:job_id>/delete/", DeleteJobView.as_view()),
     path("health/llm/", LLMHealthCheckView.as_view()),
+    path("webhooks/github/", GitHubWebhookView.as_view()),
 ]
 
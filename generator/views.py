@@ -2,12 +2,26 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .models import GenerationJob
-from .serializers import GenerationJobSerializer
-from .tasks import process_repo_task
+from .serializers import GenerationJobSerializer, SlowJobSerializer
+from .timings import model_summary, slowest_jobs, stage_percentiles
+from .scheduling import client_id_for, dispatch_lane
+from .popularity import record_request
+from .metrics import render_metrics, CACHE_REQUESTS
+from .repos import normalize_repo_url, cached_resolve_head
+from .profiling import profile_paths, profiled_attempts
+from .job_state import sync_job_state, clear_job_state
 from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter, OpenApiResponse
-import markdown2
-from django.http import HttpResponse
+from git import GitCommandError
+from readme.cache import make_repo_cache_key, get_cached_readme
+from django.http import HttpResponse, FileResponse
+from django.utils import timezone
+from datetime import timedelta
+from prometheus_client import CONTENT_TYPE_LATEST
+import hmac
+import json
+import hashlib
 import logging
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
@@ -17,12 +31,21 @@ class GenerateReadmeView(APIView):
         request={
             'application/json': {
                 'type': 'object',
-                'properties': {'repo_url': {'type': 'string', 'description': 'Public GitHub repository URL'}},
+                'properties': {
+                    'repo_url': {'type': 'string', 'description': 'Public GitHub repository URL'},
+                    'profile': {'type': 'boolean', 'description': 'Capture a profile of the job for slow-job investigations'},
+                    'priority': {'type': 'string', 'enum': ['interactive', 'bulk'], 'description': 'Scheduling lane (default interactive)'},
+                    'deep': {'type': 'boolean', 'description': 'Summarize key source files for a more detailed README (slower)'},
+                },
                 'required': ['repo_url']
             }
         },
         responses={
-            200: {'type': 'object', 'properties': {'job_id': {'type': 'integer'}, 'status': {'type': 'string'}}},
+            200: {'type': 'object', 'properties': {
+                'job_id': {'type': 'integer'},
+                'status': {'type': 'string'},
+                'result': {'type': 'string', 'description': 'README, only when served from cache (status completed)'},
+            }},
             400: {'type': 'object', 'properties': {'error': {'type': 'string'}}}
         },
         examples=[OpenApiExample(
@@ -30,35 +53,175 @@ class GenerateReadmeView(APIView):
             summary='Generate README for a repo',
             value={"repo_url": "https://github.com/josseycodes1/Backend-Wallet-Services"}
         )],
-        description="Create a job to generate a README for a given public GitHub repository."
+        description=(
+            "Create a job to generate a README for a given public GitHub repository. "
+            "If the README for the repository's current HEAD is cached, the job is returned "
+            "already completed with the README inline."
+        )
     )
     def post(self, request):
         repo_url = request.data.get('repo_url')
         if not repo_url:
             return Response({"error": "Repository URL is required"}, status=status.HTTP_400_BAD_REQUEST)
-
-        job = GenerationJob.objects.create(repo_url=repo_url)
-        process_repo_task.delay(job.id)
-        logger.info(f"Created README generation job {job.id} for repo {repo_url}")
+        if not isinstance(repo_url, str):
+            return Response({"error": "repo_url must be a string"}, status=status.HTTP_400_BAD_REQUEST)
+
+        priority = request.data.get('priority', 'interactive')
+        if priority not in ('interactive', 'bulk'):
+            return Response({"error": "priority must be 'interactive' or 'bulk'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        repo_url = normalize_repo_url(repo_url)
+        record_request(repo_url)
+        profile = str(request.data.get('profile', request.query_params.get('profile', ''))).lower() in ('1', 'true', 'yes')
+        deep = str(request.data.get('deep', '')).lower() in ('1', 'true', 'yes')
+
+        if not profile:
+            job = self.complete_from_cache(repo_url, deep)
+            if job:
+                logger.info(f"Served README job {job.id} for repo {repo_url} from cache")
+                return Response({"job_id": job.id, "status": job.status, "result": job.result})
+
+        job = GenerationJob.objects.create(
+            repo_url=repo_url,
+            profile=profile,
+            deep=deep,
+            priority=priority,
+            client_id=client_id_for(request),
+        )
+        sync_job_state(job, progress="queued")
+        dispatch_lane(job.priority)
+        logger.info(f"Created {priority} README generation job {job.id} for repo {repo_url}")
         return Response({"job_id": job.id, "status": job.status})
 
+    def complete_from_cache(self, repo_url: str, deep: bool = False) -> GenerationJob | None:
+        """
+        Fast path: if the README for the repo's current HEAD is cached, record
+        the job as already completed without touching Celery.
+        Any failure to resolve HEAD within REPO_RESOLVE_INLINE_TIMEOUT falls
+        back to the normal queued path.
+        """
+        try:
+            commit_sha = cached_resolve_head(repo_url, timeout=settings.REPO_RESOLVE_INLINE_TIMEOUT)
+        except GitCommandError as e:
+            logger.info(f"Could not resolve HEAD for {repo_url}, queueing instead: {e}")
+            return None
+
+        cached = get_cached_readme(make_repo_cache_key(repo_url, commit_sha, deep=deep)) if commit_sha else None
+        CACHE_REQUESTS.labels(cache="repo", result="hit" if cached else "miss").inc()
+        if not cached:
+            return None
+
+        now = timezone.now()
+        job = GenerationJob.objects.create(
+            repo_url=repo_url,
+            status="completed",
+            result=cached,
+            commit_sha=commit_sha,
+            deep=deep,
+            cache_hit=True,
+            started_at=now,
+            finished_at=now,
+        )
+        sync_job_state(job)
+        return job
+
+
+class GitHubWebhookView(APIView):
+    """
+    Receive GitHub push webhooks and queue a low-priority README refresh when
+    a repository's default branch moves.
+    """
+
+    authentication_classes = []
+    permission_classes = []
 
-class JobStatusView(APIView):
     @extend_schema(
+        request={'application/json': {'type': 'object'}},
         responses={
-            200: GenerationJobSerializer,
-            404: {'type': 'object', 'properties': {'error': {'type': 'string'}}}
+            202: {'type': 'object', 'properties': {'status': {'type': 'string'}, 'job_id': {'type': 'integer'}}},
+            400: {'type': 'object', 'properties': {'error': {'type': 'string'}}},
+            403: {'type': 'object', 'properties': {'error': {'type': 'string'}}},
         },
-        description="Retrieve the status and result of a README generation job using its ID."
+        description=(
+            "GitHub push webhook. Verifies X-Hub-Signature-256 against GITHUB_WEBHOOK_SECRET "
+            "(every request is rejected while it is unset) and refreshes the README for pushes "
+            "to the default branch."
+        )
     )
-    def get(self, request, job_id):
+    def post(self, request):
+        body = request.body
+
+        # Unsigned requests could make anyone queue jobs; refuse them all.
+        if not settings.GITHUB_WEBHOOK_SECRET:
+            return Response({"error": "Webhook secret is not configured"}, status=status.HTTP_403_FORBIDDEN)
+
+        expected = "sha256=" + hmac.new(settings.GITHUB_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, request.headers.get("X-Hub-Signature-256", "")):
+            return Response({"error": "Invalid signature"}, status=status.HTTP_403_FORBIDDEN)
+
+        event = request.headers.get("X-GitHub-Event", "push")
+        if event == "ping":
+            return Response({"status": "pong"})
+        if event != "push":
+            return Response({"status": "ignored"}, status=status.HTTP_202_ACCEPTED)
+
         try:
-            job = GenerationJob.objects.get(id=job_id)
-        except GenerationJob.DoesNotExist:
-            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+            payload = json.loads(body)
+            repository = payload["repository"]
+            repo_url = normalize_repo_url(repository["html_url"])
+            ref = payload["ref"]
+            commit_sha = payload["after"]
+        except (ValueError, KeyError, TypeError):
+            return Response({"error": "Malformed push payload"}, status=status.HTTP_400_BAD_REQUEST)
+
+        default_branch = repository.get("default_branch")
+        if ref != f"refs/heads/{default_branch}" or payload.get("deleted") or not commit_sha.strip("0"):
+            return Response({"status": "ignored"}, status=status.HTTP_202_ACCEPTED)
+
+        # Imported here so the web tier does not load the worker pipeline at startup.
+        from .tasks import enqueue_refresh
+
+        job = enqueue_refresh(repo_url, commit_sha, reason="webhook")
+        logger.info(f"Push webhook for {repo_url}@{commit_sha[:12]}: {'queued job ' + str(job.id) if job else 'nothing to do'}")
+        return Response(
+            {"status": "queued" if job else "up-to-date", "job_id": job.id if job else None},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class JobTimingSummaryView(APIView):
+    """
+    Summarize where time goes across recent jobs: slowest jobs, stage percentiles
+    and LLM model tiers.
+    """
 
-        serializer = GenerationJobSerializer(job)
-        return Response(serializer.data)
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name="hours", description="Time window in hours (default 24)", required=False, type=int),
+            OpenApiParameter(name="limit", description="Number of slowest jobs to return (default 10)", required=False, type=int),
+        ],
+        responses={200: {"type": "object"}},
+        description=(
+            "Slowest jobs, per-stage duration percentiles and per-model escalation rates "
+            "for jobs finished in the time window."
+        )
+    )
+    def get(self, request):
+        try:
+            hours = int(request.query_params.get("hours", 24))
+            limit = int(request.query_params.get("limit", 10))
+            if hours < 1 or limit < 1:
+                raise ValueError
+            since = timezone.now() - timedelta(hours=hours)
+        except (ValueError, OverflowError):
+            return Response({"error": "hours and limit must be positive integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "since": since,
+            "stages": stage_percentiles(since),
+            "models": model_summary(since),
+            "slowest_jobs": SlowJobSerializer(slowest_jobs(since, limit), many=True).data,
+        })
 
 
 class RetryJobView(APIView):
@@ -76,17 +239,15 @@ class RetryJobView(APIView):
     )
     def post(self, request, job_id):
         try:
-            job = GenerationJob.objects.get(id=job_id)
+            job = GenerationJob.objects.defer("result").get(id=job_id)
         except GenerationJob.DoesNotExist:
             return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        if job.status != "failed":
+        if not job.transition("pending", expected="failed", result=None, finished_at=None, attempts=0, dispatched_at=None):
             return Response({"error": f"Job {job_id} is not failed and cannot be retried."}, status=status.HTTP_400_BAD_REQUEST)
 
-        job.status = "pending"
-        job.result = None
-        job.save()
-        process_repo_task.delay(job.id)
+        sync_job_state(job, progress="queued")
+        dispatch_lane(job.priority)
         logger.info(f"Retrying job {job.id}")
         return Response({"job_id": job.id, "status": job.status})
 
@@ -110,31 +271,62 @@ class DeleteJobView(APIView):
             return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
 
         job.delete()
+        clear_job_state(job_id)
         logger.info(f"Deleted job {job_id}")
         return Response({"message": f"Job {job_id} deleted successfully"})
 
 
-class DownloadReadmeView(APIView):
+class DownloadProfileView(APIView):
     """
-    Download the generated README.md file for a completed generation job.
+    Download the profile captured for a job submitted with profile=true.
     """
 
     @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="artifact",
+                description="Artifact to download: 'pstats' (default) or 'collapsed' (flamegraph stacks)",
+                required=False,
+                type=str,
+            ),
+            OpenApiParameter(
+                name="attempt",
+                description="Attempt whose profile to download (default: the latest profiled attempt)",
+                required=False,
+                type=int,
+            ),
+        ],
         responses={
-            200: OpenApiResponse(description="Successfully generated README.md file returned as a download"),
-            404: OpenApiResponse(description="Job not found or README not yet generated"),
+            200: OpenApiResponse(description="Profile artifact returned as a download"),
+            404: OpenApiResponse(description="Job not found or not profiled"),
         },
-        description="Download the generated README.md file for a completed job."
+        description="Download the pstats or collapsed-stack profile of one attempt of a profiled job."
     )
     def get(self, request, job_id):
+        artifact = request.query_params.get("artifact", "pstats")
+        if artifact not in ("pstats", "collapsed"):
+            return Response({"error": "artifact must be 'pstats' or 'collapsed'"}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            job = GenerationJob.objects.get(id=job_id, status="completed")
-        except GenerationJob.DoesNotExist:
-            return Response({"error": "README not available"}, status=status.HTTP_404_NOT_FOUND)
+            attempt = int(request.query_params["attempt"]) if "attempt" in request.query_params else None
+        except ValueError:
+            return Response({"error": "attempt must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not GenerationJob.objects.filter(id=job_id, profiled_at__isnull=False).exists():
+            return Response({"error": "Profile not available"}, status=status.HTTP_404_NOT_FOUND)
+
+        attempts = profiled_attempts(job_id)
+        if attempt is None and attempts:
+            attempt = attempts[-1]
+        if attempt not in attempts:
+            return Response({"error": "Profile not available"}, status=status.HTTP_404_NOT_FOUND)
 
-        response = HttpResponse(job.result, content_type="text/markdown")
-        response["Content-Disposition"] = f'attachment; filename="README_{job_id}.md"'
-        return response
+        path = profile_paths(job_id, attempt)[artifact]
+        try:
+            fh = open(path, "rb")
+        except FileNotFoundError:
+            return Response({"error": "Profile not available"}, status=status.HTTP_404_NOT_FOUND)
+
+        return FileResponse(fh, as_attachment=True, filename=f"job_{job_id}_attempt{attempt}.{artifact}")
 
 
 class ListJobsView(APIView):
@@ -161,38 +353,6 @@ class ListJobsView(APIView):
         return Response(serializer.data)
 
 
-class PreviewReadmeHTMLView(APIView):
-    """
-    Render generated README.md as HTML for preview purposes.
-    """
-
-    @extend_schema(
-        responses={200: OpenApiResponse(description="Rendered HTML preview")},
-        description="Render the generated README as HTML for preview."
-    )
-    def get(self, request, job_id):
-        try:
-            job = GenerationJob.objects.get(id=job_id, status="completed")
-        except GenerationJob.DoesNotExist:
-            return Response({"error": "README not available"}, status=status.HTTP_404_NOT_FOUND)
-
-        html = markdown2.markdown(job.result, extensions=["fenced_code", "tables", "toc"])
-        return HttpResponse(html, content_type="text/html")
-
-
-class HealthCheckView(APIView):
-    """
-    Simple health check endpoint.
-    """
-
-    @extend_schema(
-        responses={200: {"type": "object"}},
-        description="Health check endpoint to confirm API is running."
-    )
-    def get(self, request):
-        return Response({"status": "ok"}, status=status.HTTP_200_OK)
-
-
 class LLMHealthCheckView(APIView):
     """
     Health check for Gemini LLM connectivity.
@@ -210,3 +370,13 @@ class LLMHealthCheckView(APIView):
             return Response({"status": "ok"}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"status": "error", "detail": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class MetricsView(APIView):
+    """
+    Prometheus scrape endpoint for pipeline timings, cache, LLM and queue metrics.
+    """
+
+    @extend_schema(exclude=True)
+    def get(self, request):
+        return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
@@ -1,6 +1,9 @@
 import hashlib
+from django.conf import settings
 from django.core.cache import cache
 
+from generator.repos import repo_key
+
 
 def make_cache_key(repo_url: str, analysis_data: dict) -> str:
     """
@@ -12,9 +15,34 @@ def make_cache_key(repo_url: str, analysis_data: dict) -> str:
     return f"readme:llm:{digest}"
 
 
+def make_repo_cache_key(repo_url: str, commit_sha: str, deep: bool = False) -> str:
+    """
+    Cache key for the final README of a repository at a given commit.
+    repo_url should already be normalized. Deep-mode READMEs are cached apart.
+    """
+    digest = hashlib.sha256(f"{repo_key(repo_url)}@{commit_sha}".encode()).hexdigest()
+    return f"readme:repo:{digest}:deep" if deep else f"readme:repo:{digest}"
+
+
+def make_summary_cache_key(blob_sha: str, version: int) -> str:
+    """
+    Cache key for the summary of one source file, by its git blob hash.
+    """
+    return f"readme:summary:v{version}:{blob_sha}"
+
+
 def get_cached_readme(cache_key: str) -> str | None:
     return cache.get(cache_key)
 
 
 def set_cached_readme(cache_key: str, value: str, ttl: int = 60 * 60 * 24):
     cache.set(cache_key, value, ttl)
+
+
+def get_cached_summaries(cache_keys: list[str]) -> dict:
+    return cache.get_many(cache_keys) if cache_keys else {}
+
+
+def set_cached_summaries(summaries: dict):
+    if summaries:
+        cache.set_many(summaries, settings.SUMMARY_CACHE_TTL)
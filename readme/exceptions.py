@@ -21,3 +21,6 @@ class LLMGenerationError(Exception):
     """Raised when the LLM fails to generate or enhance README content."""
     pass
 
+
+class LLMEmptyResponseError(LLMGenerationError):
+    """Raised when the LLM returns no text; a stronger model may do better."""
@@ -1,23 +1,77 @@
-def generate_readme(data: dict) -> str:
-    sections = []
+import io
+from typing import Iterable, Iterator, TextIO
+
+from django.conf import settings
+
+
+def iter_readme(data: dict, max_dir_entries: int | None = None) -> Iterator[str]:
+    """
+    Render the deterministic README as a stream of small chunks.
+
+    Sections are separated by a blank line and empty sections are skipped.
+    Nothing is joined up front, so rendering adds no memory proportional to
+    the file tree (the tree list itself, from build_file_tree, is already in
+    memory). max_dir_entries defaults to README_TREE_MAX_DIR_ENTRIES.
+    """
+    if max_dir_entries is None:
+        max_dir_entries = settings.README_TREE_MAX_DIR_ENTRIES
+
+    sections = (
+        render_title(data),
+        render_description(data),
+        render_languages(data),
+        render_dependencies(data),
+        render_file_structure(data, max_dir_entries),
+        render_docker(data),
+    )
+
+    first = True
+    for section in sections:
+        started = False
+        for chunk in section:
+            if not started:
+                if not first:
+                    yield "\n\n"
+                first = False
+                started = True
+            yield chunk
+
+
+def render_readme(data: dict, out: TextIO, max_dir_entries: int | None = None):
+    """
+    Write the README to a text stream (file, HTTP response, StringIO).
+    """
+    for chunk in iter_readme(data, max_dir_entries):
+        out.write(chunk)
+
+
+def generate_readme_markdown(data: dict, max_dir_entries: int | None = None) -> str:
+    buffer = io.StringIO()
+    render_readme(data, buffer, max_dir_entries)
+    return buffer.getvalue()
+
 
-    sections.append(render_title(data))
-    sections.append(render_description(data))
-    sections.append(render_languages(data))
-    sections.append(render_dependencies(data))
-    sections.append(render_file_structure(data))
-    sections.append(render_docker(data))
+# Older name for the same renderer.
+generate_readme = generate_readme_markdown
 
-    return "\n\n".join(section for section in sections if section)
 
+# analyze_repo nests languages under llm_context and the tree under
+# readme_assets; top-level keys (older callers, tests) take precedence.
+def _languages(data: dict) -> list[str]:
+    return data.get("languages") or data.get("llm_context", {}).get("languages", [])
 
-def render_title(data: dict) -> str:
-    return f"# {data['project_name']}"
 
+def _file_tree(data: dict) -> Iterable[str]:
+    return data.get("file_tree") or data.get("readme_assets", {}).get("file_tree", [])
 
-def render_description(data: dict) -> str:
-    languages = ", ".join(data.get("languages", []))
-    return (
+
+def render_title(data: dict) -> Iterator[str]:
+    yield f"# {data['project_name']}"
+
+
+def render_description(data: dict) -> Iterator[str]:
+    languages = ", ".join(_languages(data))
+    yield (
         "## Project Overview\n\n"
         f"This project is built using {languages}. "
         "This README was automatically generated by analyzing the repository "
@@ -25,56 +79,120 @@ def render_description(data: dict) -> str:
     )
 
 
-def render_languages(data: dict) -> str:
-    lines = ["## Languages & Frameworks", ""]
-    for lang in data.get("languages", []):
-        lines.append(f"- {lang}")
-    return "\n".join(lines)
+def render_languages(data: dict) -> Iterator[str]:
+    yield "## Languages & Frameworks\n"
+    for lang in _languages(data):
+        yield f"\n- {lang}"
 
 
-def render_dependencies(data: dict) -> str:
+def render_dependencies(data: dict) -> Iterator[str]:
     deps = data.get("dependencies", {})
-    lines = ["## Dependencies", ""]
+    yield "## Dependencies\n"
 
     if "python" in deps and deps["python"]:
-        lines.append("### Python")
+        yield "\n### Python"
         for dep in deps["python"]:
-            lines.append(f"- {dep}")
+            yield f"\n- {dep}"
 
     if "node" in deps and deps["node"]:
-        lines.append("\n### Node.js")
+        yield "\n\n### Node.js"
         for dep in deps["node"]:
-            lines.append(f"- {dep}")
-
-    return "\n".join(lines)
+            yield f"\n- {dep}"
 
 
-def render_file_structure(data: dict) -> str:
-    lines = [
-        "## File Structure",
-        "",
-        "```text",
-    ]
+def render_file_structure(data: dict, max_dir_entries: int = 0) -> Iterator[str]:
+    yield "## File Structure\n\n```text"
+    for line in iter_tree(_file_tree(data), max_dir_entries):
+        yield f"\n{line}"
+    yield "\n```"
 
-    for path in data.get("file_tree", []):
-        lines.append(path)
 
-    lines.append("```")
-    return "\n".join(lines)
-
-
-def render_docker(data: dict) -> str:
+def render_docker(data: dict) -> Iterator[str]:
     docker = data.get("docker", {})
 
     if not docker or not any(docker.values()):
-        return ""
+        return
 
-    lines = ["## Docker Support", ""]
+    yield "## Docker Support\n"
 
     if docker.get("dockerfile"):
-        lines.append("- Dockerfile detected")
+        yield "\n- Dockerfile detected"
 
     if docker.get("docker_compose"):
-        lines.append("- docker-compose.yml detected")
-
-    return "\n".join(lines)
+        yield "\n- docker-compose.yml detected"
+
+
+def _with_lookahead(iterable: Iterable[str]) -> Iterator[tuple[str, str | None]]:
+    iterator = iter(iterable)
+    current = next(iterator, None)
+    while current is not None:
+        following = next(iterator, None)
+        yield current, following
+        current = following
+
+
+def iter_tree(paths: Iterable[str], max_dir_entries: int = 0) -> Iterator[str]:
+    """
+    Indented tree lines for "/"-separated paths in tree order (each
+    directory's entries directly after it, as build_file_tree produces).
+    Directories end in "/"; missing parent directories are filled in.
+    Input out of tree order loses nothing, but a directory revisited later
+    is shown (and counted) again.
+
+    With max_dir_entries, a directory shows only its first entries and then
+    one "... (N more)" line; hidden subdirectories count as one entry.
+    Only one counter per open directory is kept, so this pass needs memory
+    for the tree depth, not its size; paths can be any iterable.
+    """
+    # One frame per open directory level: [name, shown, hidden, collapsed].
+    stack = [["", 0, 0, False]]
+
+    def close_to(depth: int) -> Iterator[str]:
+        while len(stack) > depth + 1:
+            _, _, hidden, collapsed = stack.pop()
+            if hidden and not collapsed:
+                yield f"{'  ' * (len(stack))}... ({hidden} more)"
+        # The root frame is closed by the caller.
+
+    def entry(name: str, is_dir: bool) -> str | None:
+        parent = stack[-1]
+        collapsed = parent[3]
+        line = None
+        if not collapsed and max_dir_entries and parent[1] >= max_dir_entries:
+            parent[2] += 1
+            collapsed = True
+        elif not collapsed:
+            parent[1] += 1
+            line = f"{'  ' * (len(stack) - 1)}{name}{'/' if is_dir else ''}"
+        if is_dir:
+            stack.append([name, 0, 0, collapsed])
+        return line
+
+    for path, following in _with_lookahead(paths):
+        is_dir = path.endswith("/")
+        path = path.rstrip("/")
+        parts = path.split("/")
+        is_dir = is_dir or (following is not None and following.startswith(f"{path}/"))
+
+        # Keep the open directories this path shares, close the rest.
+        depth = 0
+        while (
+            depth < len(parts) - 1
+            and depth + 1 < len(stack)
+            and stack[depth + 1][0] == parts[depth]
+        ):
+            depth += 1
+        if len(stack) > depth + 1:
+            yield from close_to(depth)
+
+        for name in parts[depth:-1]:
+            line = entry(name, True)
+            if line is not None:
+                yield line
+        line = entry(parts[-1], is_dir)
+        if line is not None:
+            yield line
+
+    yield from close_to(0)
+    if stack[0][2]:
+        yield f"... ({stack[0][2]} more)"
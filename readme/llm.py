@@ -1,18 +1,40 @@
 import logging
 from django.conf import settings
-from .exceptions import LLMGenerationError
-import google.genai as genai
+from .exceptions import LLMGenerationError, LLMEmptyResponseError
+from generator.metrics import LLM_ERRORS
 
 logger = logging.getLogger(__name__)
 
+# Default model; readme.routing picks per-request models from LLM_MODEL_TIERS.
 MODEL_NAME = "gemini-2.5-flash-lite"
 
+_genai_client = None
+
+
+def get_genai_client():
+    """
+    One google.genai client per process, shared by every GeminiClient.
+
+    The SDK is imported here rather than at module level: it is the single
+    most expensive import in the project, and the web tier imports this
+    module without ever calling the model. Celery workers build the client
+    up front in worker_process_init (config/celery.py).
+    """
+    global _genai_client
+    if _genai_client is None:
+        import google.genai as genai
+        _genai_client = genai.Client(api_key=settings.GEMINI_API_KEY)
+    return _genai_client
+
+
 class GeminiClient:
     def __init__(self):
         logger.info("Initializing GeminiClient")
-        self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        self.client = get_genai_client()
+        self.last_usage = {}
 
-    def generate(self, prompt: str, request_id: str | None = None) -> str:
+    def generate(self, prompt: str, request_id: str | None = None, model: str | None = None) -> str:
+        model = model or MODEL_NAME
         try:
             logger.info(
                 "Sending prompt to Gemini",
@@ -20,14 +42,20 @@ class GeminiClient:
             )
 
             response = self.client.models.generate_content(
-                model=MODEL_NAME,
+                model=model,
                 contents=prompt,
             )
 
             text = response.text
+            usage = response.usage_metadata
+            self.last_usage = {
+                "prompt_tokens": getattr(usage, "prompt_token_count", None),
+                "response_tokens": getattr(usage, "candidates_token_count", None),
+                "model": model,
+            }
 
-            if not text:
-                raise LLMGenerationError("Empty response from Gemini")
+            if not text or not text.strip():
+                raise LLMEmptyResponseError(f"Empty response from {model}")
 
             logger.info(
                 "Gemini response received",
@@ -37,8 +65,11 @@ class GeminiClient:
             return text.strip()
 
         except Exception as e:
+            LLM_ERRORS.labels(error=type(e).__name__).inc()
             logger.exception(
                 "Gemini generation failed",
                 extra={"request_id": request_id},
             )
+            if isinstance(e, LLMGenerationError):
+                raise
             raise LLMGenerationError(str(e))
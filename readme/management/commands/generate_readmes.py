@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis.utils import analyze_repo, list_repo_files
+from readme.utils import generate_readme_markdown
+from generator.timings import percentile
+
+# Seconds between progress lines.
+PROGRESS_INTERVAL = 2.0
+
+
+def init_worker():
+    # No-op under fork; needed when the pool uses spawn or forkserver.
+    django.setup()
+
+
+def analyze_path(path: str) -> dict:
+    """
+    Pool worker: analyze one checkout and render its base README.
+    """
+    started = time.perf_counter()
+    try:
+        file_paths = list_repo_files(path)
+        analysis_data = analyze_repo(path, file_paths=file_paths)
+        analysis_data["project_name"] = os.path.basename(path)
+        readme = generate_readme_markdown(analysis_data)
+    except Exception as e:
+        return {"path": path, "error": f"analysis: {type(e).__name__}: {e}"}
+
+    return {
+        "path": path,
+        "project_name": analysis_data["project_name"],
+        "files": len(file_paths),
+        "analysis": analysis_data,
+        "readme": readme,
+        "analysis_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def enhance_with_llm(result: dict) -> dict:
+    """
+    Replace the base README with the LLM version (cached and model-routed
+    like the Celery path). Runs in a dispatcher thread.
+    """
+    from readme.utils import generate_readme_markdown_with_llm
+
+    stats = {}
+    started = time.perf_counter()
+    try:
+        result["readme"] = generate_readme_markdown_with_llm(
+            result["analysis"],
+            repo_url=f"file://{result['path']}",
+            stats=stats,
+            base_readme=result["readme"],
+            files_count=result["files"],
+        )
+    except Exception as e:
+        # One repository's failure (network, bad response) must not end the run.
+        result["error"] = f"llm: {type(e).__name__}: {e}"
+    result["llm_seconds"] = round(time.perf_counter() - started, 3)
+    result["model"] = stats.get("model", "")
+    result["cache_hit"] = stats.get("cache_hit")
+    return result
+
+
+class JsonlWriter:
+    """
+    One JSON object per line, flushed per record. Paths already written
+    without an error count as done when resuming; failed paths are retried
+    and appended again, so the last line for a path wins.
+    """
+
+    def __init__(self, output: str, resume: bool):
+        self.output = output
+        self.done = self._load_done() if resume else set()
+        self.file = open(output, "a" if resume else "w", encoding="utf-8")
+        if self.file.tell() and not self._ends_with_newline():
+            self.file.write("\n")  # start after a torn last line, not on it
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.output, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _load_done(self) -> set:
+        done = set()
+        if not os.path.exists(self.output):
+            return done
+        with open(self.output, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from an interrupted run
+                if not record.get("error"):
+                    done.add(record["path"])
+        return done
+
+    def write(self, record: dict):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class MarkdownWriter:
+    """
+    One README.md-style file per repository in the output directory, written
+    atomically so an interrupted run never leaves a half file that counts
+    as done. Failures go to errors.jsonl next to them.
+    """
+
+    def __init__(self, output: str, resume: bool):
+        self.output = output
+        os.makedirs(output, exist_ok=True)
+        self.resume = resume
+        self.errors = open(os.path.join(output, "errors.jsonl"), "a" if resume else "w", encoding="utf-8")
+
+    def target(self, path: str) -> str:
+        digest = hashlib.sha1(path.encode()).hexdigest()[:8]
+        return os.path.join(self.output, f"{os.path.basename(path)}-{digest}.md")
+
+    def is_done(self, path: str) -> bool:
+        return self.resume and os.path.exists(self.target(path))
+
+    def write(self, record: dict):
+        if record.get("error"):
+            self.errors.write(json.dumps({"path": record["path"], "error": record["error"]}) + "\n")
+            self.errors.flush()
+            return
+
+        target = self.target(record["path"])
+        tmp_path = f"{target}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(record["readme"])
+        os.replace(tmp_path, target)
+
+    def close(self):
+        self.errors.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate READMEs for local checkouts without the API or Celery. Analysis runs in a "
+        "process pool; the optional LLM step goes through a concurrent async dispatcher."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Repository directories")
+        parser.add_argument(
+            "--children", action="store_true",
+            help="Treat each path as a parent directory and process its subdirectories",
+        )
+        parser.add_argument("--output", required=True, help="JSONL file, or directory for --format md")
+        parser.add_argument("--format", choices=("jsonl", "md"), default="jsonl")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Analysis processes")
+        parser.add_argument("--llm", action="store_true", help="Enhance each README with the LLM")
+        parser.add_argument("--llm-concurrency", type=int, default=8, help="LLM requests in flight")
+        parser.add_argument("--resume", action="store_true", help="Skip repositories already in the output")
+
+    def handle(self, *args, **options):
+        paths = self.collect_paths(options["paths"], options["children"])
+        if not paths:
+            raise CommandError("No repository directories found")
+
+        if options["format"] == "jsonl":
+            writer = JsonlWriter(options["output"], options["resume"])
+            pending = [path for path in paths if path not in writer.done]
+        else:
+            writer = MarkdownWriter(options["output"], options["resume"])
+            pending = [path for path in paths if not writer.is_done(path)]
+
+        skipped = len(paths) - len(pending)
+        self.stdout.write(f"{len(pending)} repositories to process ({skipped} already done)")
+
+        try:
+            stats = asyncio.run(self.run(pending, writer, options))
+        finally:
+            writer.close()
+
+        self.report(stats, skipped)
+
+    def collect_paths(self, paths: list[str], children: bool) -> list[str]:
+        collected = []
+        for path in paths:
+            path = os.path.abspath(path)
+            if not os.path.isdir(path):
+                raise CommandError(f"Not a directory: {path}")
+            if children:
+                collected.extend(
+                    os.path.join(path, name) for name in sorted(os.listdir(path))
+                    if os.path.isdir(os.path.join(path, name)) and not name.startswith(".")
+                )
+            else:
+                collected.append(path)
+        return list(dict.fromkeys(collected))
+
+    async def run(self, paths: list[str], writer, options) -> dict:
+        loop = asyncio.get_running_loop()
+        workers = max(1, options["workers"])
+        llm_concurrency = max(1, options["llm_concurrency"])
+        # A repository holds its slot from analysis until its record is
+        # written, so thousands of analysis results never pile up in memory
+        # behind the LLM stage: enough slots to keep both stages busy.
+        slots = asyncio.Semaphore(workers * 2 + (llm_concurrency if options["llm"] else 0))
+        llm_slots = asyncio.Semaphore(llm_concurrency)
+        stats = {"ok": 0, "errors": 0, "analysis_seconds": [], "llm_seconds": [], "started": time.monotonic()}
+        last_report = [stats["started"]]
+
+        async def process(path: str):
+            async with slots:
+                result = await loop.run_in_executor(pool, analyze_path, path)
+
+                if options["llm"] and not result.get("error"):
+                    async with llm_slots:
+                        result = await loop.run_in_executor(llm_pool, enhance_with_llm, result)
+
+                result.pop("analysis", None)
+                writer.write(result)
+                self.record(stats, result, len(paths), last_report)
+
+        with (
+            ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool,
+            ThreadPoolExecutor(max_workers=llm_concurrency, thread_name_prefix="llm") as llm_pool,
+        ):
+            await asyncio.gather(*(process(path) for path in paths))
+
+        stats["elapsed"] = time.monotonic() - stats["started"]
+        return stats
+
+    def record(self, stats: dict, result: dict, total: int, last_report: list):
+        if result.get("error"):
+            stats["errors"] += 1
+            self.stderr.write(f"{result['path']}: {result['error']}")
+        else:
+            stats["ok"] += 1
+        if "analysis_seconds" in result:
+            stats["analysis_seconds"].append(result["analysis_seconds"])
+        if "llm_seconds" in result:
+            stats["llm_seconds"].append(result["llm_seconds"])
+
+        now = time.monotonic()
+        done = stats["ok"] + stats["errors"]
+        if now - last_report[0] >= PROGRESS_INTERVAL or done == total:
+            last_report[0] = now
+            rate = done / max(now - stats["started"], 1e-9)
+            self.stdout.write(f"{done}/{total} done, {stats['errors']} errors, {rate:.1f} repos/s")
+
+    def report(self, stats: dict, skipped: int):
+        elapsed = stats.get("elapsed", 0)
+        processed = stats["ok"] + stats["errors"]
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {stats['ok']} READMEs, {stats['errors']} errors, {skipped} skipped "
+            f"in {elapsed:.1f}s ({processed / max(elapsed, 1e-9):.1f} repos/s)"
+        ))
+        for stage in ("analysis", "llm"):
+            values = sorted(stats[f"{stage}_seconds"])
+            if values:
+                self.stdout.write(
+                    f"{stage}: p50={percentile(values, 50):.3f}s p95={percentile(values, 95):.3f}s "
+                    f"max={max(values):.3f}s"
+                )
@@ -1,4 +1,18 @@
 
+# Also used by readme.routing to validate the model's output.
+REQUIRED_SECTIONS = [
+    "Project Purpose",
+    "Functionality",
+    "How to Use",
+    "File Structure",
+    "Visuals",
+    "Demo Links",
+    "Tech Stack",
+    "Contribution Guidelines",
+    "License",
+]
+SUGGEST_ONLY_SECTIONS = {"Visuals", "Demo Links"}
+
 
 def build_readme_prompt(analysis_data: dict, base_readme: str) -> str:
     tone_hint = infer_project_tone(analysis_data)
@@ -24,25 +38,39 @@ Languages: {analysis_data.get("languages")}
 Dependencies: {analysis_data.get("dependencies")}
 Docker support: {analysis_data.get("docker")}
 File tree: {analysis_data.get("file_tree")}
-
+{render_source_summaries(analysis_data)}
 EXISTING README (AUTO-GENERATED):
 {base_readme}
 
 REQUIRED SECTIONS:
-- Project Purpose
-- Functionality
-- How to Use
-- File Structure
-- Visuals (suggest only)
-- Demo Links (suggest only)
-- Tech Stack
-- Contribution Guidelines
-- License
+{render_required_sections()}
 
 Return ONLY valid Markdown.
 """
 
 
+def render_required_sections() -> str:
+    return "\n".join(
+        f"- {section} (suggest only)" if section in SUGGEST_ONLY_SECTIONS else f"- {section}"
+        for section in REQUIRED_SECTIONS
+    )
+
+
+def render_source_summaries(analysis_data: dict) -> str:
+    """
+    Condensed per-file summaries from deep mode; empty otherwise, so normal
+    prompts are unchanged.
+    """
+    summaries = analysis_data.get("source_summaries")
+    if not summaries:
+        return ""
+
+    lines = ["", "SOURCE SUMMARIES (from the most important files):"]
+    for item in summaries:
+        lines.append(f"- {item['path']}: {item['summary']}")
+    return "\n".join(lines) + "\n"
+
+
 def infer_project_tone(analysis_data: dict) -> str:
     languages = analysis_data.get("languages", [])
     deps = analysis_data.get("dependencies", {})
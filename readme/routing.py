@@ -0,0 +1,124 @@
+import re
+import time
+import logging
+
+from django.conf import settings
+
+from .exceptions import LLMEmptyResponseError
+from .prompts import REQUIRED_SECTIONS, SUGGEST_ONLY_SECTIONS
+from generator.metrics import LLM_TIER_LATENCY, LLM_TIER_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Rough Gemini tokenization for English and code; only used to pick a tier.
+CHARS_PER_TOKEN = 4
+
+HEADING = re.compile(r"^\s{0,3}#{1,6}\s+(.+?)\s*#*\s*$", re.MULTILINE)
+
+
+def route_features(analysis_data: dict, prompt: str, files_count: int | None = None) -> dict:
+    """
+    The request features tiers are chosen by.
+    """
+    languages = analysis_data.get("languages") or analysis_data.get("llm_context", {}).get("languages", [])
+    return {
+        "files": files_count or 0,
+        "prompt_tokens": len(prompt) // CHARS_PER_TOKEN,
+        "languages": len(languages),
+    }
+
+
+def starting_tier(features: dict) -> int:
+    """
+    Index of the cheapest tier in LLM_MODEL_TIERS whose limits fit the
+    request. Limits left out of a tier are unbounded; the last tier takes
+    everything.
+    """
+    tiers = settings.LLM_MODEL_TIERS
+    for index, tier in enumerate(tiers):
+        if (
+            features["files"] <= tier.get("max_files", float("inf"))
+            and features["prompt_tokens"] <= tier.get("max_prompt_tokens", float("inf"))
+            and features["languages"] <= tier.get("max_languages", float("inf"))
+        ):
+            return index
+    return len(tiers) - 1
+
+
+def missing_sections(markdown: str) -> list[str]:
+    """
+    Required sections with no matching heading. Suggest-only sections
+    (visuals, demo links) may rightly be left out, so they never count.
+    """
+    headings = [heading.lower() for heading in HEADING.findall(markdown)]
+    return [
+        section for section in REQUIRED_SECTIONS
+        if section not in SUGGEST_ONLY_SECTIONS
+        and not any(section.lower() in heading for heading in headings)
+    ]
+
+
+def validation_problems(markdown: str) -> list[str]:
+    """
+    Reasons to reject a README and try a stronger tier; empty if it passes.
+    """
+    if not markdown.strip():
+        return ["empty"]
+
+    missing = missing_sections(markdown)
+    if len(missing) > settings.LLM_MAX_MISSING_SECTIONS:
+        return [f"missing sections: {', '.join(missing)}"]
+    return []
+
+
+def generate_with_cascade(llm, prompt: str, features: dict, request_id: str | None = None) -> tuple[str, dict]:
+    """
+    Generate with the cheapest suitable tier and escalate to the next one
+    only when the output fails validation (or comes back empty).
+
+    Returns the README and {"model", "tier", "escalations", "prompt_tokens",
+    "response_tokens"}, tokens summed over every attempt. The last tier's
+    output is returned even if it fails validation. Other LLM errors are
+    raised as before.
+    """
+    tiers = settings.LLM_MODEL_TIERS
+    index = starting_tier(features)
+    escalations = 0
+    tokens = {"prompt_tokens": 0, "response_tokens": 0}
+
+    while True:
+        tier = tiers[index]
+        is_last = index == len(tiers) - 1
+        llm.last_usage = {}
+        start = time.perf_counter()
+        try:
+            text = llm.generate(prompt, request_id=request_id, model=tier["model"])
+        except LLMEmptyResponseError:
+            if is_last:
+                LLM_TIER_REQUESTS.labels(tier=tier["name"], outcome="failed").inc()
+                raise
+            problems = ["empty"]
+        else:
+            problems = validation_problems(text)
+        finally:
+            LLM_TIER_LATENCY.labels(tier=tier["name"]).observe(time.perf_counter() - start)
+            for key in tokens:
+                tokens[key] += llm.last_usage.get(key) or 0
+
+        if not problems or is_last:
+            outcome = "accepted" if not problems else "accepted_invalid"
+            LLM_TIER_REQUESTS.labels(tier=tier["name"], outcome=outcome).inc()
+            if problems:
+                logger.warning(
+                    f"Top tier {tier['name']} output failed validation ({'; '.join(problems)}); using it anyway",
+                    extra={"request_id": request_id},
+                )
+            return text, {"model": tier["model"], "tier": tier["name"], "escalations": escalations, **tokens}
+
+        LLM_TIER_REQUESTS.labels(tier=tier["name"], outcome="escalated").inc()
+        logger.info(
+            f"Escalating from tier {tier['name']}: {'; '.join(problems)}",
+            extra={"request_id": request_id},
+        )
+        index += 1
+        escalations += 1
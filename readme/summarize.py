@@ -0,0 +1,207 @@
+import os
+import json
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .llm import GeminiClient, LLMGenerationError
+from .cache import make_summary_cache_key, get_cached_summaries, set_cached_summaries
+from generator.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+SOURCE_EXTENSIONS = {
+    ".py", ".js", ".jsx", ".ts", ".tsx", ".go", ".rs", ".java", ".kt",
+    ".rb", ".php", ".cs", ".c", ".cc", ".cpp", ".swift", ".scala",
+}
+
+# Entry points and launchers say the most about what a project does.
+HIGH_SIGNAL_NAMES = {
+    "manage.py": 10,
+    "main.py": 9, "__main__.py": 9, "app.py": 9, "cli.py": 8, "server.py": 8,
+    "main.go": 9, "main.rs": 9, "lib.rs": 7, "Main.java": 8, "Program.cs": 8,
+    "index.js": 8, "index.ts": 8, "main.js": 8, "main.ts": 8, "server.js": 8, "app.js": 8,
+    "urls.py": 7, "routes.py": 7, "router.py": 7, "api.py": 6,
+    "models.py": 5, "views.py": 5, "tasks.py": 4, "settings.py": 3,
+    "wsgi.py": 2, "asgi.py": 2, "setup.py": 2,
+}
+
+LOW_SIGNAL_NAMES = {"__init__.py", "tests.py", "conftest.py", "admin.py", "apps.py"}
+TEST_SUFFIXES = ("_test.py", "_test.go", ".test.js", ".test.ts", ".spec.js", ".spec.ts")
+
+LOW_SIGNAL_DIRS = {"tests", "test", "__tests__", "migrations", "docs", "examples", "vendor", "third_party", "dist", "build"}
+
+# Bump when the summary prompt changes so old summaries are not reused.
+SUMMARY_PROMPT_VERSION = 1
+
+
+def score_path(path: str) -> int:
+    """
+    How useful a file is for describing the project; 0 means never summarize.
+    Shallow files outrank the same name deeper in the tree.
+    """
+    parts = path.split("/")
+    name = parts[-1]
+    if os.path.splitext(name)[1] not in SOURCE_EXTENSIONS:
+        return 0
+    if any(part in LOW_SIGNAL_DIRS or part.startswith(".") for part in parts[:-1]):
+        return 0
+    if name in LOW_SIGNAL_NAMES or name.startswith("test_") or name.endswith(TEST_SUFFIXES):
+        return 0
+
+    score = HIGH_SIGNAL_NAMES.get(name, 0)
+    if score:
+        return max(score * 10 - 5 * (len(parts) - 1), 1)
+    # Other top-level modules only fill whatever budget is left.
+    return 1 if len(parts) <= 2 else 0
+
+
+def is_candidate(path: str) -> bool:
+    return score_path(path) > 0
+
+
+def select_files(repo_path: str, paths: list[str], budget: int) -> list[str]:
+    """
+    Highest-signal candidate files under repo_path whose (truncated) sizes
+    fit in budget bytes.
+    """
+    max_file_bytes = settings.DEEP_SUMMARY_MAX_FILE_BYTES
+    ranked = sorted((-score_path(path), path) for path in paths if is_candidate(path))
+    selected = []
+
+    for _, path in ranked:
+        try:
+            size = min(os.path.getsize(os.path.join(repo_path, *path.split("/"))), max_file_bytes)
+        except OSError:
+            continue  # not extracted (e.g. over the extraction size cap)
+        if size == 0 or size > budget:
+            continue
+        selected.append(path)
+        budget -= size
+
+    return selected
+
+
+def blob_sha(data: bytes) -> str:
+    """Git's blob hash, so the cache key matches the file's object ID."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def read_source(repo_path: str, path: str) -> tuple[str, str]:
+    with open(os.path.join(repo_path, *path.split("/")), "rb") as f:
+        data = f.read()
+    text = data[:settings.DEEP_SUMMARY_MAX_FILE_BYTES].decode("utf-8", errors="replace")
+    return blob_sha(data), text
+
+
+def chunk_files(files: list[dict], chunk_bytes: int) -> list[list[dict]]:
+    chunks, current, size = [], [], 0
+    for file in files:
+        if current and size + len(file["text"]) > chunk_bytes:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(file)
+        size += len(file["text"])
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_summary_prompt(chunk: list[dict]) -> str:
+    sources = "\n\n".join(f"=== FILE: {file['path']} ===\n{file['text']}" for file in chunk)
+    return f"""
+Summarize what each source file below does, for someone writing the project's README.
+For each file, give 2-4 sentences: its role, the main commands, endpoints, classes or
+functions it exposes, and any configuration it reads. Do NOT speculate beyond the code.
+
+Return ONLY a JSON object mapping each file path to its summary.
+
+{sources}
+"""
+
+
+def parse_summaries(text: str, chunk: list[dict]) -> dict:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    paths = {file["path"] for file in chunk}
+    return {path: str(summary).strip() for path, summary in parsed.items() if path in paths and summary}
+
+
+def summarize_chunk(chunk: list[dict], request_id: str) -> dict:
+    try:
+        text = GeminiClient().generate(build_summary_prompt(chunk), request_id=request_id)
+    except LLMGenerationError as e:
+        logger.warning(f"Summarizing {len(chunk)} files failed: {e}", extra={"request_id": request_id})
+        return {}
+
+    summaries = parse_summaries(text, chunk)
+    if len(summaries) < len(chunk):
+        logger.warning(
+            f"Summary response covered {len(summaries)} of {len(chunk)} files",
+            extra={"request_id": request_id},
+        )
+    return summaries
+
+
+def summarize_sources(repo_path: str, paths: list[str], request_id: str | None = None) -> dict:
+    """
+    Map-reduce step of deep mode: pick high-signal files within
+    DEEP_SUMMARY_BUDGET_BYTES and summarize them.
+
+    Summaries are cached by git blob hash, so a file that did not change
+    since any earlier generation (of any repository) is never re-sent.
+    Misses are grouped into chunks of DEEP_SUMMARY_CHUNK_BYTES and
+    summarized in parallel.
+
+    Returns {"summaries": [{"path", "summary"}], "missing": [path]}; missing
+    lists selected files whose summary failed, so callers can tell a
+    partial result from a complete one. A later run re-sends only those.
+    """
+    selected = select_files(repo_path, paths, settings.DEEP_SUMMARY_BUDGET_BYTES)
+    files = []
+    for path in selected:
+        sha, text = read_source(repo_path, path)
+        files.append({"path": path, "blob": sha, "text": text})
+
+    cached = get_cached_summaries([make_summary_cache_key(file["blob"], SUMMARY_PROMPT_VERSION) for file in files])
+    summaries = {}
+    missing = []
+    for file in files:
+        summary = cached.get(make_summary_cache_key(file["blob"], SUMMARY_PROMPT_VERSION))
+        if summary:
+            summaries[file["path"]] = summary
+        else:
+            missing.append(file)
+
+    CACHE_REQUESTS.labels(cache="summary", result="hit").inc(len(summaries))
+    CACHE_REQUESTS.labels(cache="summary", result="miss").inc(len(missing))
+
+    if missing:
+        chunks = chunk_files(missing, settings.DEEP_SUMMARY_CHUNK_BYTES)
+        with ThreadPoolExecutor(max_workers=min(settings.DEEP_SUMMARY_CONCURRENCY, len(chunks))) as pool:
+            results = pool.map(lambda chunk: summarize_chunk(chunk, request_id), chunks)
+            fresh = {path: summary for result in results for path, summary in result.items()}
+
+        blobs = {file["path"]: file["blob"] for file in missing}
+        set_cached_summaries({
+            make_summary_cache_key(blobs[path], SUMMARY_PROMPT_VERSION): summary for path, summary in fresh.items()
+        })
+        summaries.update(fresh)
+
+    logger.info(
+        f"Summarized {len(summaries)} of {len(selected)} selected files ({len(missing)} not cached)",
+        extra={"request_id": request_id},
+    )
+    return {
+        "summaries": [{"path": path, "summary": summaries[path]} for path in selected if path in summaries],
+        "missing": [path for path in selected if path not in summaries],
+    }
@@ -1,3 +1,199 @@
-from django.test import TestCase
+import io
+import os
+import json
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .generator import iter_tree, render_readme
+from .prompts import REQUIRED_SECTIONS, SUGGEST_ONLY_SECTIONS
+from .routing import missing_sections
+from .utils import generate_readme_markdown
+
+
+class MissingSectionsTests(TestCase):
+    def test_suggest_only_sections_are_optional(self):
+        markdown = "\n".join(
+            f"## {section}" for section in REQUIRED_SECTIONS if section not in SUGGEST_ONLY_SECTIONS
+        )
+        self.assertEqual(missing_sections(markdown), [])
+
+    def test_required_sections_are_reported(self):
+        self.assertEqual(missing_sections("# Project Purpose\n## Visuals\n")[:2], ["Functionality", "How to Use"])
+
+
+class IterTreeTests(TestCase):
+    def test_nesting(self):
+        paths = ["README.md", "src/", "src/app/", "src/app/main.py", "src/util.py", "z/deep/file.txt"]
+        self.assertEqual(list(iter_tree(paths)), [
+            "README.md",
+            "src/",
+            "  app/",
+            "    main.py",
+            "  util.py",
+            "z/",
+            "  deep/",
+            "    file.txt",
+        ])
+
+    def test_empty_directory_keeps_its_slash(self):
+        self.assertEqual(list(iter_tree(["docs/", "setup.py"])), ["docs/", "setup.py"])
+
+    def test_large_directories_collapse(self):
+        paths = ["a/", *(f"a/{i}.py" for i in range(5)), "b/", "b/sub/", "b/sub/x.py", "c.py", "d.py"]
+        self.assertEqual(list(iter_tree(paths, max_dir_entries=2)), [
+            "a/",
+            "  0.py",
+            "  1.py",
+            "  ... (3 more)",
+            "b/",
+            "  sub/",
+            "    x.py",
+            "... (2 more)",
+        ])
+
+    def test_hidden_subdirectory_counts_once(self):
+        paths = ["a.py", "b.py", "lib/", "lib/x.py", "lib/y.py"]
+        self.assertEqual(list(iter_tree(paths, max_dir_entries=2)), ["a.py", "b.py", "... (1 more)"])
+
+    def test_input_out_of_tree_order_loses_nothing(self):
+        self.assertEqual(list(iter_tree(["b/x", "a/y", "b/z"])), ["b/", "  x", "a/", "  y", "b/", "  z"])
+
+    def test_paths_can_be_a_generator(self):
+        paths = (f"pkg/{i:03}.py" for i in range(1000))
+        lines = list(iter_tree(paths, max_dir_entries=10))
+        self.assertEqual((lines[0], lines[-1], len(lines)), ("pkg/", "  ... (990 more)", 12))
+
+
+class RenderReadmeTests(TestCase):
+    DATA = {
+        "project_name": "demo",
+        "languages": ["Python"],
+        "dependencies": {"python": ["django"], "node": []},
+        "file_tree": ["manage.py", "demo/", "demo/settings.py"],
+        "docker": {"dockerfile": True},
+    }
+
+    def test_stream_and_string_match(self):
+        out = io.StringIO()
+        render_readme(self.DATA, out)
+        self.assertEqual(out.getvalue(), generate_readme_markdown(self.DATA))
+
+    def test_sections(self):
+        self.assertEqual(generate_readme_markdown(self.DATA, max_dir_entries=0), "\n\n".join([
+            "# demo",
+            "## Project Overview\n\nThis project is built using Python. This README was automatically "
+            "generated by analyzing the repository structure and configuration files.",
+            "## Languages & Frameworks\n\n- Python",
+            "## Dependencies\n\n### Python\n- django",
+            "## File Structure\n\n```text\nmanage.py\ndemo/\n  settings.py\n```",
+            "## Docker Support\n\n- Dockerfile detected",
+        ]))
+
+    @override_settings(README_TREE_MAX_DIR_ENTRIES=1)
+    def test_collapse_defaults_to_the_setting(self):
+        self.assertIn("manage.py\n... (1 more)\n```", generate_readme_markdown(self.DATA))
+
+    def test_analyze_repo_layout_is_read(self):
+        nested = {
+            "project_name": "demo",
+            "llm_context": {"languages": ["Python"]},
+            "readme_assets": {"file_tree": ["manage.py", "demo/", "demo/settings.py"]},
+        }
+        flat = {"project_name": "demo", "languages": ["Python"], "file_tree": nested["readme_assets"]["file_tree"]}
+        self.assertEqual(generate_readme_markdown(nested), generate_readme_markdown(flat))
+
+
+class GenerateReadmesCommandTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.repos = os.path.join(self.root, "repos")
+        for name in ("alpha", "beta"):
+            os.makedirs(os.path.join(self.repos, name))
+            with open(os.path.join(self.repos, name, "requirements.txt"), "w") as f:
+                f.write("django\n")
+        self.alpha, self.beta = (os.path.join(self.repos, name) for name in ("alpha", "beta"))
+
+    def generate(self, output: str, *args):
+        call_command(
+            "generate_readmes", self.repos, "--children", "--workers", "1", "--output", output, *args,
+            stdout=io.StringIO(), stderr=io.StringIO(),
+        )
+
+    def records(self, path: str) -> list[dict]:
+        records = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass
+        return records
+
+    def test_jsonl_output(self):
+        output = os.path.join(self.root, "out.jsonl")
+        self.generate(output)
+
+        records = {record["path"]: record for record in self.records(output)}
+        self.assertEqual(set(records), {self.alpha, self.beta})
+        self.assertTrue(records[self.alpha]["readme"].startswith("# alpha"))
+        self.assertNotIn("analysis", records[self.alpha])
+
+    def test_markdown_output(self):
+        output = os.path.join(self.root, "out")
+        self.generate(output, "--format", "md")
+
+        names = sorted(os.listdir(output))
+        self.assertEqual([name.split("-")[0] for name in names], ["alpha", "beta", "errors.jsonl"])
+        with open(os.path.join(output, names[1]), encoding="utf-8") as f:
+            self.assertTrue(f.read().startswith("# beta"))
+        self.assertEqual(os.path.getsize(os.path.join(output, "errors.jsonl")), 0)
+
+    @mock.patch("readme.utils.generate_readme_markdown_with_llm")
+    def test_llm_failure_is_recorded_per_repository(self, generate_readme_markdown_with_llm):
+        def enhance(analysis, repo_url, stats, base_readme, files_count):
+            if analysis["project_name"] == "beta":
+                raise RuntimeError("quota")
+            stats["model"] = "test-model"
+            return base_readme + "\nEnhanced."
+
+        generate_readme_markdown_with_llm.side_effect = enhance
+        output = os.path.join(self.root, "out.jsonl")
+        self.generate(output, "--llm")
+
+        records = {record["path"]: record for record in self.records(output)}
+        self.assertTrue(records[self.alpha]["readme"].endswith("Enhanced."))
+        self.assertEqual(records[self.alpha]["model"], "test-model")
+        self.assertEqual(records[self.beta]["error"], "llm: RuntimeError: quota")
+
+    def test_resume_skips_finished_and_retries_failed(self):
+        output = os.path.join(self.root, "out.jsonl")
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"path": self.alpha, "readme": "# done"}) + "\n")
+            f.write(json.dumps({"path": self.beta, "error": "llm: RuntimeError: quota"}) + "\n")
+            f.write('{"path": "torn')
+
+        self.generate(output, "--resume")
+
+        records = self.records(output)
+        self.assertEqual([record["path"] for record in records], [self.alpha, self.beta, self.beta])
+        self.assertTrue(records[-1]["readme"].startswith("# beta"))
+        self.assertNotIn("error", records[-1])
+
+    @mock.patch("readme.utils.generate_readme_markdown_with_llm", side_effect=RuntimeError("quota"))
+    def test_markdown_resume_skips_written_files(self, generate_readme_markdown_with_llm):
+        output = os.path.join(self.root, "out")
+        self.generate(output, "--format", "md")
+        os.remove(os.path.join(output, next(name for name in os.listdir(output) if name.startswith("beta-"))))
+
+        self.generate(output, "--format", "md", "--resume", "--llm")
+
+        generate_readme_markdown_with_llm.assert_called_once()
+        self.assertEqual(generate_readme_markdown_with_llm.call_args.kwargs["repo_url"], f"file://{self.beta}")
+        with open(os.path.join(output, "errors.jsonl"), encoding="utf-8") as f:
+            self.assertEqual(json.loads(f.read()), {"path": self.beta, "error": "llm: RuntimeError: quota"})
+        self.assertEqual([name.split("-")[0] for name in sorted(os.listdir(output))], ["alpha", "errors.jsonl"])